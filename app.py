@@ -9,10 +9,9 @@ from fastapi import FastAPI, Request, Response, Query, Body
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
-# Import Safe Campus Agent
-from safe_campus_agent import SafeCampusAgent
+from singleflight import SingleFlight
 
 app = FastAPI()
 
@@ -23,8 +22,23 @@ SCRAPING_ENABLED = False
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-# Initialize the Safe Campus Agent
-safe_campus_agent = SafeCampusAgent()
+# The Safe Campus Agent is created on first use to keep worker cold starts fast
+_safe_campus_agent = None
+
+def get_safe_campus_agent():
+    """Get or initialize the Safe Campus Agent."""
+    global _safe_campus_agent
+    if _safe_campus_agent is None:
+        from safe_campus_agent import SafeCampusAgent
+        _safe_campus_agent = SafeCampusAgent()
+    return _safe_campus_agent
+
+# Live call sessions, created with the agent on first use
+_live_calls = None
+
+# Set SAFE_CAMPUS_WARMUP=1 to load the agent and its datasets during startup
+# instead of on the first request
+WARMUP_ON_STARTUP = os.environ.get("SAFE_CAMPUS_WARMUP", "").lower() in ("1", "true", "yes")
 
 # Data file and directories
 DATA_FILE = "ucsd_alerts_geocoded.json"
@@ -36,6 +50,9 @@ GEOCODE_BACKUPS_DIR = os.path.join(BACKUP_DIR, "geocode_backups")
 GEOCODE_SERVICES_DIR = "geocode_services"
 GEOCODE_GEOJSON_DIR = "geocode_geojson"
 
+# Coalesces concurrent identical /api/crimes requests
+_crimes_flight = SingleFlight()
+
 # Perform startup checks
 @app.on_event("startup")
 async def startup_event():
@@ -58,6 +75,13 @@ async def startup_event():
         if not os.path.exists(directory):
             os.makedirs(directory)
             print(f"Created directory: {directory}")
+    
+    # Optional warm-up so the first request does not pay for initialization
+    if WARMUP_ON_STARTUP:
+        from geocoding.geocode import warm_up as warm_up_geocoding
+        get_safe_campus_agent().warm_up()
+        warm_up_geocoding()
+        print("Safe Campus Agent warmed up.")
 
 # Main index page
 @app.get("/", response_class=HTMLResponse)
@@ -78,7 +102,7 @@ async def process_call(data: Dict[str, Any] = Body(...)):
         return JSONResponse({"error": "No transcript provided"}, status_code=400)
     
     try:
-        result = safe_campus_agent.process_emergency_call(transcript)
+        result = get_safe_campus_agent().process_emergency_call(transcript)
         return result
     except Exception as e:
         return JSONResponse({"error": f"Error processing call: {str(e)}"}, status_code=500)
@@ -99,11 +123,112 @@ async def process_report(data: Dict[str, Any] = Body(...)):
         return JSONResponse({"error": "No report provided"}, status_code=400)
     
     try:
-        result = safe_campus_agent.process_incident_report(report)
+        result = get_safe_campus_agent().process_incident_report(report)
         return result
     except Exception as e:
         return JSONResponse({"error": f"Error processing report: {str(e)}"}, status_code=500)
 
+def get_live_calls():
+    """Get or initialize the live call manager."""
+    global _live_calls
+    if _live_calls is None:
+        from live_calls import LiveCallManager
+        _live_calls = LiveCallManager(get_safe_campus_agent())
+    return _live_calls
+
+@app.post("/api/live_calls", response_class=JSONResponse)
+async def start_live_call(data: Dict[str, Any] = Body(default={})):
+    """Start a live call; transcript chunks are then posted to /api/live_calls/{call_id}/chunks."""
+    try:
+        session = get_live_calls().start(data.get("call_id"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return {"call_id": session.call_id}
+
+@app.post("/api/live_calls/{call_id}/chunks", response_class=JSONResponse)
+async def add_live_call_chunk(call_id: str, data: Dict[str, Any] = Body(...)):
+    """
+    Process the next chunk of a live call transcript.
+
+    Args:
+        call_id: Live call ID
+        data: Dictionary with 'text' key
+
+    Returns:
+        Partial EIDO update, with notification results once the call alerts
+    """
+    text = data.get("text", "")
+    if not text:
+        return JSONResponse({"error": "No text provided"}, status_code=400)
+
+    session = get_live_calls().get(call_id)
+    if session is None:
+        return JSONResponse({"error": f"Live call {call_id} not found"}, status_code=404)
+
+    try:
+        return session.feed(text)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    except Exception as e:
+        return JSONResponse({"error": f"Error processing chunk: {str(e)}"}, status_code=500)
+
+@app.post("/api/live_calls/{call_id}/finish", response_class=JSONResponse)
+async def finish_live_call(call_id: str):
+    """End a live call and return its final results."""
+    try:
+        result = get_live_calls().finish(call_id)
+    except Exception as e:
+        return JSONResponse({"error": f"Error finishing call: {str(e)}"}, status_code=500)
+    if result is None:
+        return JSONResponse({"error": f"Live call {call_id} not found"}, status_code=404)
+    return result
+
+@app.get("/api/incidents", response_class=JSONResponse)
+async def list_incidents(
+    status: Optional[str] = None,
+    incident_type: Optional[str] = None,
+    priority: Optional[int] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """
+    List stored incidents, newest first.
+
+    Query parameters:
+    - status, incident_type, priority: Exact-match filters
+    - created_from / created_to: Creation time range (ISO format)
+    - limit / offset: Paging
+    """
+    store = get_safe_campus_agent().incident_store
+    incidents = store.list_incidents(
+        status=status,
+        incident_type=incident_type,
+        priority=priority,
+        created_from=created_from,
+        created_to=created_to,
+        limit=limit,
+        offset=offset
+    )
+    return {"incidents": incidents, "count": len(incidents)}
+
+@app.get("/api/incidents/{incident_id}", response_class=JSONResponse)
+async def get_incident(incident_id: str):
+    """Return the current EIDO of an incident."""
+    eido = get_safe_campus_agent().incident_store.get(incident_id)
+    if eido is None:
+        return JSONResponse({"error": f"Incident {incident_id} not found"}, status_code=404)
+    return eido
+
+@app.get("/api/incidents/{incident_id}/history", response_class=JSONResponse)
+async def get_incident_history(incident_id: str):
+    """Return every stored EIDO version of an incident, oldest first."""
+    history = get_safe_campus_agent().incident_store.get_history(incident_id)
+    if not history:
+        return JSONResponse({"error": f"Incident {incident_id} not found"}, status_code=404)
+    return {"incident_id": incident_id, "versions": history}
+
 # Original API Routes
 @app.get("/api/crimes", response_class=JSONResponse)
 async def get_crimes(
@@ -120,12 +245,57 @@ async def get_crimes(
     - crime_types: List of crime types to include
     - date_from: Filter alerts from this date (MM/DD/YYYY)
     - date_to: Filter alerts to this date (MM/DD/YYYY)
+    
+    Concurrent requests with the same filters against the same version of the
+    data file share a single computation.
     """
+    alert_types = _normalize_filter_values(alert_types)
+    crime_types = _normalize_filter_values(crime_types)
+    date_from = date_from.strip() if date_from else None
+    date_to = date_to.strip() if date_to else None
+    
+    key = (
+        "/api/crimes",
+        tuple(alert_types or ()),
+        tuple(crime_types or ()),
+        date_from,
+        date_to,
+        _dataset_version()
+    )
+    
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
+        return await _crimes_flight.do(key, _build_crimes_geojson, alert_types, crime_types, date_from, date_to)
+    except (OSError, ValueError) as e:
         return JSONResponse({"error": f"Data file not found or invalid: {e}"}, status_code=500)
+
+def _normalize_filter_values(values: Optional[List[str]]) -> Optional[List[str]]:
+    """Normalize a multi-valued filter so equivalent queries share a key."""
+    if not values:
+        return None
+    return sorted(set(values))
+
+def _dataset_version() -> Optional[Tuple[int, int]]:
+    """Identify the current version of the data file by modification time and size."""
+    try:
+        stat = os.stat(DATA_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _build_crimes_geojson(
+    alert_types: Optional[List[str]],
+    crime_types: Optional[List[str]],
+    date_from: Optional[str],
+    date_to: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Load the data file and build the filtered GeoJSON FeatureCollection.
+    
+    Raises:
+        OSError, ValueError: If the data file is missing or invalid
+    """
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
     
     # Apply filters if provided
     if alert_types or crime_types or date_from or date_to:
@@ -339,6 +509,8 @@ async def favicon():
 async def health_check():
     """Return basic health information about the application."""
     import os
+    from eido.tiering import get_tier_metrics
+    from llm.cache import get_llm_cache
     
     # Get basic stats about the data file
     data_stats = {"count": 0, "file_size_kb": 0}
@@ -351,13 +523,16 @@ async def health_check():
     except Exception as e:
         data_stats["error"] = str(e)
     
+    llm_cache = get_llm_cache()
     return {
         "status": "ok",
         "timestamp": datetime.datetime.now().isoformat(),
         "version": "1.0.0",
         "data_file": DATA_FILE,
         "data_stats": data_stats,
-        "safe_campus_agent": "active"
+        "safe_campus_agent": "active" if _safe_campus_agent is not None else "not_loaded",
+        "classification_tiers": get_tier_metrics().snapshot(),
+        "llm_cache": llm_cache.summary() if llm_cache is not None else {"mode": "off"}
     }
 
 if __name__ == "__main__":
@@ -5,8 +5,12 @@ Defines the Emergency Incident Data Object (EIDO) format and provides validation
 Based on NENA (National Emergency Number Association) standards.
 """
 
+import copy
 import json
-from typing import Dict, Any, List, Optional, Union
+import secrets
+import threading
+import time
+from typing import Dict, Any, List, Optional, Union, get_args, get_origin
 from datetime import datetime
 import re
 
@@ -100,25 +104,33 @@ def _validate_object(obj: Any, schema: Any, path: str = "") -> None:
     if schema is None:
         return
     
+    origin = get_origin(schema)
+    
     # Handle Optional types
-    if isinstance(schema, type) and schema.__module__ == "typing" and hasattr(schema, "__origin__"):
-        if schema.__origin__ is Union and type(None) in schema.__args__:
-            # This is an Optional[...] type
-            if obj is None:
-                return
-            # Extract the actual type from Optional
-            actual_type = next(arg for arg in schema.__args__ if arg is not type(None))
-            _validate_object(obj, actual_type, path)
+    if origin is Union and type(None) in get_args(schema):
+        # This is an Optional[...] type
+        if obj is None:
             return
+        # Extract the actual type from Optional
+        actual_type = next(arg for arg in get_args(schema) if arg is not type(None))
+        _validate_object(obj, actual_type, path)
+        return
     
     # Handle List types
-    if isinstance(schema, type) and schema.__module__ == "typing" and schema.__origin__ is list:
+    if origin is list:
         if not isinstance(obj, list):
             raise EIDOValidationError(f"{path} should be a list")
         # Validate each item in the list
-        item_type = schema.__args__[0]
-        for i, item in enumerate(obj):
-            _validate_object(item, item_type, f"{path}[{i}]")
+        item_types = get_args(schema)
+        if item_types:
+            for i, item in enumerate(obj):
+                _validate_object(item, item_types[0], f"{path}[{i}]")
+        return
+    
+    # Handle unstructured Dict types
+    if origin is dict:
+        if not isinstance(obj, dict):
+            raise EIDOValidationError(f"{path} should be a dictionary")
         return
     
     # Handle Dict types with structure
@@ -224,15 +236,47 @@ def create_empty_eido() -> Dict[str, Any]:
         }
     }
 
+# Crockford's base32, as used by ULIDs
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ulid_lock = threading.Lock()
+_last_ulid = (0, 0)
+
+def generate_ulid() -> str:
+    """
+    Generate a ULID: a 26-character, lexicographically time-sortable ID.
+    
+    The first 10 characters encode the millisecond timestamp and the last 16
+    encode 80 random bits. IDs generated within the same millisecond
+    increment the random part, so they stay unique and in creation order.
+    """
+    global _last_ulid
+    with _ulid_lock:
+        timestamp = int(time.time() * 1000)
+        last_timestamp, last_random = _last_ulid
+        if timestamp <= last_timestamp:
+            timestamp = last_timestamp
+            randomness = last_random + 1
+            if randomness >= 1 << 80:
+                timestamp += 1
+                randomness = secrets.randbits(80)
+        else:
+            randomness = secrets.randbits(80)
+        _last_ulid = (timestamp, randomness)
+    
+    value = (timestamp << 80) | randomness
+    chars = []
+    for _ in range(26):
+        chars.append(_ULID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
 def generate_eido_id() -> str:
-    """Generate a unique EIDO ID."""
-    time_component = datetime.now().strftime("%Y%m%d%H%M%S")
-    return f"EIDO-{time_component}-{generate_random_string(6)}"
+    """Generate a unique, time-sortable EIDO ID."""
+    return f"EIDO-{generate_ulid()}"
 
 def generate_incident_id() -> str:
-    """Generate a unique incident ID."""
-    time_component = datetime.now().strftime("%Y%m%d%H%M%S")
-    return f"INC-{time_component}-{generate_random_string(4)}"
+    """Generate a unique, time-sortable incident ID."""
+    return f"INC-{generate_ulid()}"
 
 def generate_random_string(length: int) -> str:
     """Generate a random alphanumeric string of specified length."""
@@ -252,9 +296,11 @@ def update_eido(original_eido: Dict[str, Any], updates: Dict[str, Any]) -> Dict[
         An updated EIDO object
     """
     # Create a deep copy of the original
-    import copy
     updated_eido = copy.deepcopy(original_eido)
     
+    # Each version gets its own EIDO ID; the incident ID stays the same
+    updated_eido["eido"]["eidoID"] = generate_eido_id()
+    
     # Update timestamp
     updated_eido["eido"]["timestamp"] = datetime.now().isoformat()
     
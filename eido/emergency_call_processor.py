@@ -5,18 +5,43 @@ This module processes emergency call transcripts and extracts key information
 to create a standardized EIDO object for notification decisions.
 """
 
+import contextvars
 import json
+import math
 import os
+import time
 import re
 import uuid
 import datetime
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 # Import local modules
-from mistralai import Mistral
 from eido.eido_schema import create_empty_eido, validate_eido
 from eido.location_extractor import extract_json_from_response
+from eido.keyword_rules import KeywordHits, get_keyword_scanner
+from eido.local_model import LocalIncidentModel, default_local_model
+from eido.preprocessing import TranscriptPreprocessor, default_preprocessor, prepare_prompt_text
+from eido.tiering import (LOCAL_CONFIDENCE_THRESHOLD, TIERED_CLASSIFICATION, assess_local, find_known_location,
+                           get_tier_metrics)
+from tracing import span
 from geocoding.geocode import geocode_location
+from notification.planner import NotificationPlan, NotificationPlanner, PRIORITY_CHANNELS, DEFAULT_CHANNELS
+from notification.templates import build_content, render_messages
+from llm.client import get_llm_client
+from llm.deadline import DEFAULT_LLM_DEADLINE_SECONDS, call_with_deadline
+from llm.streaming import IncrementalJSONParser
+from pipeline import get_executor
+
+# A speculative recipient set is reused when the LLM result targets the same
+# priority, radius and groups at coordinates at most this far apart
+SPECULATION_TOLERANCE_METERS = 100
+
+# Stream LLM completions and act on fields as they arrive
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# Extracted fields that determine the notification scope; the prompt asks for
+# them first so recipients can be selected while the rest is generated
+SCOPE_FIELDS = ("incident_type", "priority", "location", "immediate_danger", "weapons_involved")
 
 class EmergencyCallProcessor:
     """
@@ -24,26 +49,65 @@ class EmergencyCallProcessor:
     Demo #1 - taking a 911 call transcript and converting it to an EIDO.
     """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, notification_planner: Optional[NotificationPlanner] = None,
+                 llm_deadline_seconds: Optional[float] = None, streaming: Optional[bool] = None,
+                 tiered: Optional[bool] = None, confidence_threshold: Optional[float] = None,
+                 local_model: Optional[LocalIncidentModel] = None,
+                 preprocessor: Optional[TranscriptPreprocessor] = None):
         """
         Initialize the emergency call processor.
         
         Args:
             api_key: API key for Mistral LLM (optional, will use env var if not provided)
+            notification_planner: Planner used by process_call_with_notifications
+                (defaults to one over the configured recipient directory)
+            llm_deadline_seconds: Time budget for the LLM extraction before the
+                rule-based result is used (defaults to LLM_DEADLINE_SECONDS)
+            streaming: Whether to stream the LLM completion (defaults to
+                LLM_STREAMING)
+            tiered: Whether to skip the LLM when the keyword rules are
+                confident (defaults to TIERED_CLASSIFICATION)
+            confidence_threshold: Local confidence needed to skip the LLM
+                (defaults to LOCAL_CONFIDENCE_THRESHOLD)
+            local_model: Local classifier for incident type, subtype and
+                priority in the rule-based extraction (defaults to the trained
+                model if LOCAL_CLASSIFIER=model, else keyword rules only)
+            preprocessor: Compresses the transcript to a token budget before it
+                is sent to the LLM (defaults to the shared preprocessor unless
+                PREPROCESS_TRANSCRIPTS is off)
         """
         self.api_key = api_key or os.environ.get("MISTRAL_API_KEY")
         if not self.api_key:
             raise ValueError("Mistral API key is required. Set MISTRAL_API_KEY environment variable or pass as argument.")
             
-        self.client = Mistral(api_key=self.api_key)
+        # Shared process-wide client (connection pool, rate limits, retries)
+        self.client = get_llm_client(self.api_key)
         self.model = "mistral-large-latest"
+        self._notification_planner = notification_planner
+        self.llm_deadline_seconds = llm_deadline_seconds or DEFAULT_LLM_DEADLINE_SECONDS
+        self.streaming = LLM_STREAMING if streaming is None else streaming
+        self.tiered = TIERED_CLASSIFICATION if tiered is None else tiered
+        self.confidence_threshold = LOCAL_CONFIDENCE_THRESHOLD if confidence_threshold is None else confidence_threshold
+        self.local_model = local_model if local_model is not None else default_local_model()
+        self.preprocessor = preprocessor if preprocessor is not None else default_preprocessor()
     
-    def process_call(self, transcript: str) -> Dict[str, Any]:
+    @property
+    def notification_planner(self) -> NotificationPlanner:
+        """Planner over the recipient directory, loaded on first use."""
+        if self._notification_planner is None:
+            from notification.directory import load_default_directory
+            self._notification_planner = NotificationPlanner(load_default_directory())
+        return self._notification_planner
+    
+    def process_call(self, transcript: str, on_upgrade: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Process an emergency call transcript and create an EIDO object.
         
         Args:
             transcript: The text transcript of the emergency call
+            on_upgrade: Called with an updated EIDO if the LLM missed its
+                deadline (so the returned EIDO came from the rule-based
+                extraction) and answers later
             
         Returns:
             EIDO object as a dictionary
@@ -51,27 +115,283 @@ class EmergencyCallProcessor:
         # Create an empty EIDO to start with
         eido = create_empty_eido()
         
-        # Extract key information using the LLM
-        extracted_info = self._extract_information(transcript)
+        # Extract key information locally if the keyword rules are confident, else using the LLM
+        start_time = time.perf_counter()
+        with span("extraction") as extraction_span:
+            extracted_info, escalation = self._local_extraction(transcript)
+            tier = "local" if extracted_info is not None else "llm"
+            if extracted_info is None:
+                extracted_info = self._extract_information(transcript, self._upgrade_callback(eido, transcript, on_upgrade))
+            extraction_span.set_attribute("tier", tier)
+        get_tier_metrics().record(tier, (time.perf_counter() - start_time) * 1000, escalation)
         
         # Update the EIDO with extracted information
-        self._update_eido_with_extracted_info(eido, extracted_info, transcript)
+        with span("eido_generation"):
+            self._update_eido_with_extracted_info(eido, extracted_info, transcript)
         
         # Validate the EIDO
         validate_eido(eido)
         
         return eido
     
-    def _extract_information(self, transcript: str) -> Dict[str, Any]:
+    def _upgrade_callback(self, eido: Dict[str, Any], transcript: str,
+                          on_upgrade: Optional[Callable[[Dict[str, Any]], None]]) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """
+        Build the callback turning a late LLM extraction into an updated
+        version of an EIDO built from the fallback extraction.
         """
-        Extract key information from the call transcript using an LLM.
+        if on_upgrade is None:
+            return None
+        
+        def upgrade(extracted_info: Dict[str, Any]) -> None:
+            upgraded = create_empty_eido()
+            upgraded["eido"]["eidoType"] = "update"
+            upgraded["eido"]["incident"]["incidentID"] = eido["eido"]["incident"]["incidentID"]
+            upgraded["eido"]["incident"]["createdAt"] = eido["eido"]["incident"]["createdAt"]
+            upgraded["eido"]["incident"]["updatedAt"] = upgraded["eido"]["timestamp"]
+            self._update_eido_with_extracted_info(upgraded, extracted_info, transcript)
+            validate_eido(upgraded)
+            on_upgrade(upgraded)
+        
+        return upgrade
+    
+    def process_call_with_notifications(self, transcript: str,
+                                        on_upgrade: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Process a call and plan its notifications.
+        
+        In tiered mode a confident keyword-rule extraction is used directly.
+        Otherwise the LLM is called; see below.
+        
+        While the LLM extraction runs, the rule-based extraction is used to
+        speculatively build the EIDO, select recipients and render messages.
+        When the completion is streamed, a second speculation starts as soon
+        as the fields in SCOPE_FIELDS have arrived. When the LLM result
+        arrives, the first speculative plan that targets the same people (see
+        _same_recipients) is kept, streamed one first; messages are
+        re-rendered only if they differ.
+        
+        Args:
+            transcript: The text transcript of the emergency call
+            on_upgrade: Called with an updated EIDO if the LLM missed its
+                deadline and answers later
+            
+        Returns:
+            Dictionary with "eido", "notification_plan" (a NotificationPlan)
+            and "speculation" describing whether the speculative work was used
+        """
+        start_time = time.perf_counter()
+        eido = create_empty_eido()
+        
+        # Confident local extraction: no LLM call, nothing to speculate about
+        local_info, escalation = self._local_extraction(transcript)
+        if local_info is not None:
+            with span("eido_generation"):
+                self._update_eido_with_extracted_info(eido, local_info, transcript)
+            validate_eido(eido)
+            get_tier_metrics().record("local", (time.perf_counter() - start_time) * 1000)
+            with span("notification_planning"):
+                plan = self._plan_notifications(eido)
+            return {
+                "eido": eido,
+                "notification_plan": plan,
+                "speculation": {
+                    "status": "skipped",
+                    "source": None,
+                    "streamed": False,
+                    "recipients_reused": False,
+                    "messages_reused": False,
+                    "speculative_plan_ready_ms": None,
+                    "time_to_plan_ms": round((time.perf_counter() - start_time) * 1000, 3)
+                }
+            }
+        
+        # Same call, same incident: speculative messages refer to the final incident ID
+        incident_id = eido["eido"]["incident"]["incidentID"]
+        
+        # Speculate again on the streamed fields once the scope is known
+        streamed_fields: Dict[str, Any] = {}
+        streamed_future = None
+        
+        def on_field(key: str, value: Any) -> None:
+            nonlocal streamed_future
+            streamed_fields[key] = value
+            if streamed_future is None and all(f in streamed_fields for f in SCOPE_FIELDS):
+                streamed_future = get_executor().submit(
+                    contextvars.copy_context().run, self._speculate, dict(streamed_fields), transcript, incident_id)
+        
+        # Speculate with the cheap rule-based extraction while the LLM runs; this
+        # happens in this thread, only the LLM call itself waits on the LLM pool
+        speculations = []
+        speculative_ready_ms = None
+        
+        def speculate(fallback_info: Dict[str, Any]) -> None:
+            nonlocal speculative_ready_ms
+            with span("speculation"):
+                speculations.append(("fallback", self._speculate(fallback_info, transcript, incident_id)))
+            speculative_ready_ms = (time.perf_counter() - start_time) * 1000
+        
+        with span("extraction"):
+            extracted_info = self._extract_information(transcript, self._upgrade_callback(eido, transcript, on_upgrade),
+                                                       on_field, speculate)
+        get_tier_metrics().record("llm", (time.perf_counter() - start_time) * 1000, escalation)
+        
+        with span("eido_generation"):
+            self._update_eido_with_extracted_info(eido, extracted_info, transcript)
+        validate_eido(eido)
+        
+        if streamed_future is not None:
+            speculations.insert(0, ("stream", streamed_future.result()))
+        
+        with span("notification_planning") as planning_span:
+            messages = self._render_messages(eido)
+            plan, source = None, None
+            for candidate_source, (speculative_eido, speculative_plan) in speculations:
+                if speculative_plan is not None and self._same_recipients(speculative_eido, eido):
+                    plan, source = speculative_plan, candidate_source
+                    break
+            if plan is not None:
+                messages_reused = messages == plan.messages
+                if not messages_reused:
+                    plan = plan.with_messages(messages)
+                status = "confirmed"
+            else:
+                plan = self._plan_notifications(eido, messages)
+                messages_reused = False
+                status = "discarded" if any(p is not None for _, (_, p) in speculations) else "failed"
+            planning_span.set_attribute("speculation", status)
+        
+        return {
+            "eido": eido,
+            "notification_plan": plan,
+            "speculation": {
+                "status": status,
+                "source": source,
+                "streamed": streamed_future is not None,
+                "recipients_reused": status == "confirmed",
+                "messages_reused": messages_reused,
+                "speculative_plan_ready_ms": round(speculative_ready_ms, 3) if speculative_ready_ms is not None else None,
+                "time_to_plan_ms": round((time.perf_counter() - start_time) * 1000, 3)
+            }
+        }
+    
+    def _speculate(self, extracted_info: Dict[str, Any], transcript: str,
+                   incident_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[NotificationPlan]]:
+        """
+        Build a speculative EIDO and notification plan from a (possibly
+        partial) extraction.
+        
+        Returns:
+            (eido, plan), or (None, None) if speculation failed
+        """
+        try:
+            eido = create_empty_eido()
+            eido["eido"]["incident"]["incidentID"] = incident_id
+            self._update_eido_with_extracted_info(eido, extracted_info, transcript)
+            return eido, self._plan_notifications(eido)
+        except Exception as e:
+            print(f"Warning: Speculative notification planning failed: {e}")
+            return None, None
+    
+    def _render_messages(self, eido: Dict[str, Any]) -> Dict[str, str]:
+        """Render the channel messages for an EIDO."""
+        channels = PRIORITY_CHANNELS.get(eido["eido"]["incident"]["priority"], DEFAULT_CHANNELS)
+        return render_messages(build_content(eido), channels)
+    
+    def _plan_notifications(self, eido: Dict[str, Any], messages: Optional[Dict[str, str]] = None) -> NotificationPlan:
+        """Select recipients and attach rendered messages for an EIDO."""
+        incident = eido["eido"]["incident"]
+        scope = eido["eido"]["notification"]["recommendedNotificationScope"]
+        coordinates = incident["location"]["coordinates"]
+        messages = messages or self._render_messages(eido)
+        channels = PRIORITY_CHANNELS.get(incident["priority"], DEFAULT_CHANNELS)
+        
+        return self.notification_planner.plan(
+            coordinates["latitude"],
+            coordinates["longitude"],
+            scope["radius_meters"],
+            scope["population"],
+            incident["priority"],
+            messages[channels[0]],
+            messages=messages
+        )
+    
+    def _same_recipients(self, first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+        """Check whether two EIDOs would notify the same recipients."""
+        first_incident = first["eido"]["incident"]
+        second_incident = second["eido"]["incident"]
+        first_scope = first["eido"]["notification"]["recommendedNotificationScope"]
+        second_scope = second["eido"]["notification"]["recommendedNotificationScope"]
+        
+        if first_incident["priority"] != second_incident["priority"]:
+            return False
+        if first_scope["radius_meters"] != second_scope["radius_meters"]:
+            return False
+        if set(first_scope["population"]) != set(second_scope["population"]):
+            return False
+        
+        a = first_incident["location"]["coordinates"]
+        b = second_incident["location"]["coordinates"]
+        dy = (a["latitude"] - b["latitude"]) * 111320
+        dx = (a["longitude"] - b["longitude"]) * 111320 * math.cos(math.radians(a["latitude"]))
+        return math.hypot(dx, dy) <= SPECULATION_TOLERANCE_METERS
+    
+    def _extract_information(self, transcript: str,
+                             on_late_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                             on_field: Optional[Callable[[str, Any], None]] = None,
+                             on_fallback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Extract key information from the call transcript using an LLM,
+        bounded by the LLM deadline.
+        
+        The rule-based extraction runs in the calling thread while the LLM
+        call is in flight and is returned if the LLM fails or misses the
+        deadline.
+        
+        Args:
+            transcript: The call transcript
+            on_late_result: Called with the LLM extraction if it arrives after
+                the deadline
+            on_field: Called with each field of a streamed LLM completion as
+                soon as it is complete
+            on_fallback: Called in the calling thread with the rule-based
+                extraction while the LLM call is still in flight
+            
+        Returns:
+            Dictionary with extracted information
+        """
+        def fallback() -> Dict[str, Any]:
+            fallback_info = self._fallback_extraction(transcript)
+            if on_fallback is not None:
+                on_fallback(fallback_info)
+            return fallback_info
+        
+        race = call_with_deadline(
+            lambda: self._call_llm(transcript, on_field),
+            fallback,
+            deadline_seconds=self.llm_deadline_seconds,
+            on_late_result=on_late_result
+        )
+        if race.error:
+            print(f"Error extracting information: {race.error}")
+        return race.value
+    
+    def _call_llm(self, transcript: str, on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Extract key information from the call transcript using the LLM.
         
         Args:
             transcript: The call transcript
+            on_field: Called with each field as soon as it has been streamed
+                (only when streaming is enabled)
             
         Returns:
             Dictionary with extracted information
+            
+        Raises:
+            Exception: If the API call fails or returns invalid JSON
         """
+        transcript = prepare_prompt_text(transcript, self.preprocessor)
         prompt = f"""
         You are an emergency call processing expert. Analyze this 911 call transcript and extract key information needed for emergency response.
         
@@ -80,74 +400,118 @@ class EmergencyCallProcessor:
         
         Extract and return ONLY a JSON object with these fields:
         - incident_type: Primary category (e.g., "fire", "medical", "crime", "hazard", "infrastructure")
-        - incident_subtype: More specific classification 
         - priority: Assessed emergency priority (1-5, with 1 being highest priority)
         - location: The specific location mentioned
+        - immediate_danger: Boolean indicating if there's immediate danger to people
+        - weapons_involved: Boolean indicating if weapons are involved
+        - incident_subtype: More specific classification 
         - location_details: Building, floor, room number, etc.
         - reporter_info: Information about the person reporting the incident
         - victim_count: Estimated number of affected/injured people
         - victim_details: Details about victims' conditions
         - suspect_info: Any information about suspects (for criminal incidents)
-        - weapons_involved: Boolean indicating if weapons are involved
-        - immediate_danger: Boolean indicating if there's immediate danger to people
         - key_details: Array of 3-5 most important details from the transcript
         - recommended_response: Brief recommendation for appropriate emergency response
         - quote: A direct quote from the transcript that best illustrates the situation
         
-        Output ONLY the JSON with no additional text.
+        Output ONLY the JSON with the fields in this order and no additional text.
         """
+        messages = [
+            {"role": "system", "content": "You are an emergency call processing expert who extracts key information from 911 call transcripts."},
+            {"role": "user", "content": prompt}
+        ]
         
-        try:
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an emergency call processing expert who extracts key information from 911 call transcripts."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            result_text = response.choices[0].message.content
+        if not self.streaming:
+            result_text = self.client.chat(messages, model=self.model)
             
             # Clean up the result
             result_text = extract_json_from_response(result_text)
             
-            return json.loads(result_text)
-                
-        except Exception as e:
-            print(f"Error extracting information: {e}")
-            # Fallback extraction if API fails
-            return self._fallback_extraction(transcript)
+            try:
+                return json.loads(result_text)
+            except json.JSONDecodeError:
+                # Do not replay an unusable answer from the cache
+                self.client.invalidate(messages, model=self.model)
+                raise
+        
+        parser = IncrementalJSONParser()
+        with span("llm.stream", model=self.model) as stream_span:
+            start_time = time.perf_counter()
+            for delta in self.client.stream_chat(messages, model=self.model):
+                for key, value in parser.feed(delta):
+                    if not parser.fields.keys() - {key}:
+                        # Time to the first usable field
+                        stream_span.set_attribute("first_field_ms", round((time.perf_counter() - start_time) * 1000, 3))
+                    if on_field is not None:
+                        on_field(key, value)
+            stream_span.set_attribute("fields", len(parser.fields))
+        
+        if parser.complete:
+            return parser.result()
+        # Not a single well-formed object; fall back to parsing the whole text
+        try:
+            return json.loads(extract_json_from_response(parser.text))
+        except json.JSONDecodeError:
+            self.client.invalidate(messages, model=self.model)
+            raise
+    
+    def _local_extraction(self, transcript: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Rule-based extraction for tiered mode.
+        
+        Returns:
+            (extracted info, None) if the keyword rules (or the local model)
+            are confident enough, else (None, reason the LLM is needed)
+        """
+        if not self.tiered:
+            return None, None
+        hits = get_keyword_scanner().scan(transcript)
+        predictions = self.local_model.predict(transcript) if self.local_model is not None else None
+        extracted_info = self._fallback_extraction(transcript, hits, predictions)
+        location = find_known_location(transcript)
+        confidence, escalation = assess_local(
+            hits, "call.incident_type", location, self.confidence_threshold,
+            confidence=predictions["incident_type"][1] if predictions and "incident_type" in predictions else None,
+            priority_rule_set="call.priority",
+            priority_confidence=predictions["priority"][1] if predictions and "priority" in predictions else None
+        )
+        if escalation is not None:
+            return None, escalation
+        extracted_info["location"] = location["name"]
+        extracted_info["key_details"] = ["Extracted by local model" if predictions else "Extracted by local keyword rules"]
+        return extracted_info, None
     
-    def _fallback_extraction(self, transcript: str) -> Dict[str, Any]:
+    def _fallback_extraction(self, transcript: str, hits: Optional[KeywordHits] = None,
+                             predictions: Optional[Dict[str, Tuple[Any, float]]] = None) -> Dict[str, Any]:
         """Simple rule-based extraction as fallback if LLM API fails."""
+        # One scan of the transcript scores every keyword rule set
+        if hits is None:
+            hits = get_keyword_scanner().scan(transcript)
+        if predictions is None and self.local_model is not None:
+            predictions = self.local_model.predict(transcript)
+        
         # Extract incident type based on keywords
-        incident_type = "unknown"
-        if re.search(r'fire|burning|smoke|flames', transcript, re.I):
-            incident_type = "fire"
-        elif re.search(r'hurt|injured|bleeding|pain|medical|ambulance|heart', transcript, re.I):
-            incident_type = "medical"
-        elif re.search(r'steal|robber|thief|assault|attack|threat|suspicious|weapon|gun', transcript, re.I):
-            incident_type = "crime"
-        elif re.search(r'leak|spill|chemical|gas|hazard|toxic|explosion', transcript, re.I):
-            incident_type = "hazard"
-        elif re.search(r'power|outage|water|flooding|building|damage|elevator', transcript, re.I):
-            incident_type = "infrastructure"
+        type_rule = hits.first("call.incident_type")
+        incident_type = type_rule["label"] if type_rule else "unknown"
+        incident_subtype = ""
             
         # Extract location with a simple regex
-        location_match = re.search(r'at\s+([A-Za-z0-9\s,&\-]+?)(?:\.|\n)', transcript)
+        location_match = re.search(r'\bat\s+([A-Za-z0-9\s,&\-]+?)(?:\.|\n)', transcript)
         location = location_match.group(1).strip() if location_match else "Unknown location"
         
         # Determine priority based on keywords
-        priority = 3  # Default to medium
-        if re.search(r'emergency|immediate|life.?threatening|critical|severe|grave', transcript, re.I):
-            priority = 1
-        elif re.search(r'urgent|serious|bad|quickly|asap', transcript, re.I):
-            priority = 2
-        elif re.search(r'minor|small|not urgent|not serious|not bad', transcript, re.I):
-            priority = 4
+        priority_rule = hits.first("call.priority")
+        priority = priority_rule["label"] if priority_rule else 3  # Default to medium
+        
+        # The local model, if enabled, decides type, subtype and priority;
+        # heads it was not trained for keep the rule-based values
+        if predictions:
+            incident_type = predictions.get("incident_type", (incident_type,))[0]
+            incident_subtype = predictions.get("incident_subtype", (incident_subtype,))[0]
+            priority = predictions.get("priority", (priority,))[0]
             
         # Determine if weapons are involved
-        weapons_involved = bool(re.search(r'gun|knife|weapon|armed', transcript, re.I))
+        weapons_involved = hits.matched("weapons")
         
         # Extract a quote
         sentences = re.split(r'[.!?]', transcript)
@@ -155,7 +519,7 @@ class EmergencyCallProcessor:
             
         return {
             "incident_type": incident_type,
-            "incident_subtype": "",
+            "incident_subtype": incident_subtype,
             "priority": priority,
             "location": location,
             "location_details": "",
@@ -201,7 +565,8 @@ class EmergencyCallProcessor:
         
         # Try to geocode the location
         try:
-            coordinates = geocode_location(location)
+            with span("geocoder.geocode"):
+                coordinates = geocode_location(location)
             if coordinates:
                 eido["eido"]["incident"]["location"]["coordinates"]["latitude"] = coordinates.get("lat")
                 eido["eido"]["incident"]["location"]["coordinates"]["longitude"] = coordinates.get("lng")
@@ -0,0 +1,347 @@
+"""
+incident_registry.py
+
+Registry of active incidents with a spatio-temporal index.
+
+Incidents are indexed by (grid cell, time window, incident type). A new
+report is looked up in the neighbouring cells of the current and previous
+window before a new incident is created; a match is folded into the
+existing incident with update_eido, and only changes that alter who must
+be notified, or how urgently, trigger another round of notifications.
+"""
+
+import copy
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from eido.eido_schema import update_eido
+
+logger = logging.getLogger(__name__)
+
+_METERS_PER_DEGREE = 111320.0
+
+
+@dataclass
+class IncidentRecord:
+    """An active incident and the state it was last notified with."""
+    incident_id: str
+    incident_type: str
+    lat: float
+    lng: float
+    eido: Dict[str, Any]
+    first_seen: float
+    last_seen: float
+    report_count: int = 1
+    notified_signature: Tuple = field(default_factory=tuple)
+
+
+def notification_signature(eido: Dict[str, Any]) -> Tuple:
+    """
+    Fields of an EIDO that determine the notifications sent for it.
+
+    Two versions of an incident with the same signature would notify the
+    same people with the same urgency, so no new round is needed.
+    """
+    incident = eido["eido"]["incident"]
+    scope = eido["eido"]["notification"]["recommendedNotificationScope"]
+    details = incident["details"]
+    return (
+        incident["priority"],
+        scope.get("radius_meters"),
+        tuple(sorted(scope.get("population", []))),
+        bool(details.get("suspects", {}).get("weaponsInvolved")),
+        details.get("victims", {}).get("count", 0) > 0
+    )
+
+
+class IncidentRegistry:
+    """
+    Correlates reports of the same incident by place, time and type.
+    Safe to share between threads.
+    """
+
+    def __init__(self, match_radius_meters: float = 250, window_seconds: float = 900):
+        """
+        Initialize the registry.
+
+        Args:
+            match_radius_meters: Maximum distance between reports of one incident
+            window_seconds: Maximum time since the last report of an incident
+                for a new report to be folded into it
+        """
+        self.match_radius = match_radius_meters
+        self.window = window_seconds
+        self._incidents: Dict[str, IncidentRecord] = {}
+        self._index: Dict[Tuple[int, int, int, str], List[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "folded": 0, "updated": 0, "renotified": 0}
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def _key(self, lat: float, lng: float, when: float, incident_type: str) -> Tuple[int, int, int, str]:
+        """Index key; grid cells are match_radius wide so matches lie in adjacent cells."""
+        x = lng * _METERS_PER_DEGREE * math.cos(math.radians(lat))
+        y = lat * _METERS_PER_DEGREE
+        return (int(x // self.match_radius), int(y // self.match_radius), int(when // self.window), incident_type)
+
+    def _distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        """Approximate distance in meters (equirectangular, fine at campus scale)."""
+        x = (lng2 - lng1) * _METERS_PER_DEGREE * math.cos(math.radians((lat1 + lat2) / 2))
+        y = (lat2 - lat1) * _METERS_PER_DEGREE
+        return math.hypot(x, y)
+
+    def find_match(self, incident_type: str, lat: float, lng: float, when: Optional[float] = None) -> Optional[IncidentRecord]:
+        """
+        Find the nearest active incident of the same type.
+
+        Args:
+            incident_type: Incident type of the new report
+            lat, lng: Location of the new report
+            when: Report time (epoch seconds, defaults to now)
+
+        Returns:
+            The matching IncidentRecord, or None
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            return self._find_match(incident_type, lat, lng, when)
+
+    def _find_match(self, incident_type: str, lat: float, lng: float, when: float) -> Optional[IncidentRecord]:
+        """Nearest active incident of the same type (lock held)."""
+        cx, cy, bucket, _ = self._key(lat, lng, when, incident_type)
+
+        best = None
+        best_distance = None
+        for b in (bucket, bucket - 1):
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    for incident_id in self._index.get((gx, gy, b, incident_type), ()):
+                        record = self._incidents.get(incident_id)
+                        if record is None or when - record.last_seen > self.window:
+                            continue
+                        distance = self._distance(lat, lng, record.lat, record.lng)
+                        if distance <= self.match_radius and (best is None or distance < best_distance):
+                            best, best_distance = record, distance
+        return best
+
+    def match_or_register(self, eido: Dict[str, Any], incident_type: str, lat: float, lng: float,
+                          when: Optional[float] = None) -> Tuple[IncidentRecord, Optional[List[str]]]:
+        """
+        Fold a report into the nearest matching incident, or register it as
+        a new one, in one step. Concurrent reports of the same event are
+        serialized, so only the first creates (and notifies) an incident.
+
+        Args:
+            eido: EIDO generated for the report (kept by the registry if new)
+            incident_type: Incident type of the report
+            lat, lng: Location of the report
+            when: Report time (epoch seconds, defaults to now)
+
+        Returns:
+            (record, None) for a new incident, or (record, changes) when the
+            report was folded (see fold())
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            match = self._find_match(incident_type, lat, lng, when)
+            if match is None:
+                return self._register(eido, when), None
+            changes = self._fold(match, eido, when)
+
+        self._log_fold(match, changes)
+        return match, changes
+
+    def register(self, eido: Dict[str, Any], when: Optional[float] = None) -> IncidentRecord:
+        """
+        Register a new incident.
+
+        Args:
+            eido: EIDO of the incident
+            when: Report time (epoch seconds, defaults to now)
+
+        Returns:
+            The new IncidentRecord
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            return self._register(eido, when)
+
+    def _register(self, eido: Dict[str, Any], when: float) -> IncidentRecord:
+        """Add a new incident (lock held)."""
+        incident = eido["eido"]["incident"]
+        coordinates = incident["location"]["coordinates"]
+        record = IncidentRecord(
+            incident_id=incident["incidentID"],
+            incident_type=incident["incidentType"],
+            lat=coordinates["latitude"],
+            lng=coordinates["longitude"],
+            eido=eido,
+            first_seen=when,
+            last_seen=when,
+            notified_signature=notification_signature(eido)
+        )
+        self._prune(when)
+        self._incidents[record.incident_id] = record
+        self._add_to_index(record, when)
+        self.stats["created"] += 1
+        return record
+
+    def fold(self, record: IncidentRecord, eido: Dict[str, Any], when: Optional[float] = None) -> List[str]:
+        """
+        Fold a new report into an existing incident.
+
+        The incident keeps its ID. Priority can only escalate; victims,
+        weapons, suspect descriptions and key facts accumulate. When the
+        priority escalates, the new report's notification scope and actions
+        are adopted.
+
+        Args:
+            record: Incident returned by find_match
+            eido: EIDO generated for the new report
+            when: Report time (epoch seconds, defaults to now)
+
+        Returns:
+            Names of the material changes that require notifying again
+            (empty if the report only confirmed what was already known)
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            changes = self._fold(record, eido, when)
+        self._log_fold(record, changes)
+        return changes
+
+    def _fold(self, record: IncidentRecord, eido: Dict[str, Any], when: float) -> List[str]:
+        """Fold a report into an incident (lock held)."""
+        updates = self._merge_updates(record, eido)
+        updates["incident.details.reportCount"] = record.report_count + 1
+        updated = self._apply_updates(record, eido, updates)
+        updated["eido"]["incident"]["details"]["timeline"].append({
+            "timestamp": updated["eido"]["timestamp"],
+            "action": "Related report received",
+            "notes": eido["eido"]["incident"]["details"].get("rawReport", "")
+        })
+
+        record.report_count += 1
+        self._touch(record, when)
+        self.stats["folded"] += 1
+        return self._renotify(record)
+
+    @staticmethod
+    def _log_fold(record: IncidentRecord, changes: List[str]) -> None:
+        logger.info(f"Folded report into {record.incident_id} ({record.report_count} reports)"
+                    + (f", material changes: {', '.join(changes)}" if changes else ""))
+
+    def update(self, record: IncidentRecord, eido: Dict[str, Any], when: Optional[float] = None) -> List[str]:
+        """
+        Merge a newer version of a report the incident already counts, such
+        as the latest state of a live call that is still in progress.
+
+        The same rules as fold() apply, but the update is not counted as
+        another report and adds no timeline entry.
+
+        Args:
+            record: Incident the report belongs to
+            eido: Latest EIDO of the report
+            when: Update time (epoch seconds, defaults to now)
+
+        Returns:
+            Names of the material changes that require notifying again
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            updates = self._merge_updates(record, eido)
+            if updates:
+                self._apply_updates(record, eido, updates)
+            self._touch(record, when)
+            self.stats["updated"] += 1
+            changes = self._renotify(record)
+
+        if changes:
+            logger.info(f"Updated {record.incident_id}, material changes: {', '.join(changes)}")
+        return changes
+
+    @staticmethod
+    def _merge_updates(record: IncidentRecord, eido: Dict[str, Any]) -> Dict[str, Any]:
+        """update_eido-style updates merging a report into an incident (lock held)."""
+        incident = record.eido["eido"]["incident"]
+        details = incident["details"]
+        new_incident = eido["eido"]["incident"]
+        new_details = new_incident["details"]
+        updates: Dict[str, Any] = {}
+
+        if new_incident["priority"] < incident["priority"]:
+            updates["priority"] = new_incident["priority"]
+
+        victims = new_details.get("victims", {})
+        if victims.get("count", 0) > details["victims"].get("count", 0):
+            updates["incident.details.victims"] = victims
+
+        suspects = dict(details["suspects"])
+        new_suspects = new_details.get("suspects", {})
+        if new_suspects.get("weaponsInvolved") and not suspects.get("weaponsInvolved"):
+            suspects["weaponsInvolved"] = True
+        if new_suspects.get("description") and not suspects.get("description"):
+            suspects["description"] = new_suspects["description"]
+        if suspects != details["suspects"]:
+            updates["incident.details.suspects"] = suspects
+
+        new_facts = [fact for fact in new_details.get("keyFacts", []) if fact not in details.get("keyFacts", [])]
+        if new_facts:
+            updates["incident.details.keyFacts"] = details.get("keyFacts", []) + new_facts
+        return updates
+
+    @staticmethod
+    def _apply_updates(record: IncidentRecord, eido: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply merge updates to the incident, adopting the report's scope on escalation (lock held)."""
+        updated = update_eido(record.eido, updates)
+        if "priority" in updates:
+            updated["eido"]["notification"] = copy.deepcopy(eido["eido"]["notification"])
+        record.eido = updated
+        return updated
+
+    def _renotify(self, record: IncidentRecord) -> List[str]:
+        """Material changes since the incident was last notified; records the new signature (lock held)."""
+        signature = notification_signature(record.eido)
+        changes = self._describe_changes(record.notified_signature, signature)
+        if changes:
+            record.notified_signature = signature
+            self.stats["renotified"] += 1
+        return changes
+
+    @staticmethod
+    def _describe_changes(before: Tuple, after: Tuple) -> List[str]:
+        """Name the signature fields that differ."""
+        names = ["priority", "radius", "population", "weapons", "victims"]
+        return [name for name, old, new in zip(names, before, after) if old != new]
+
+    def _add_to_index(self, record: IncidentRecord, when: float) -> None:
+        self._index.setdefault(self._key(record.lat, record.lng, when, record.incident_type), []).append(record.incident_id)
+
+    def _touch(self, record: IncidentRecord, when: float) -> None:
+        """Record activity, indexing the incident under the current window too."""
+        if self._key(record.lat, record.lng, when, record.incident_type) != \
+                self._key(record.lat, record.lng, record.last_seen, record.incident_type):
+            self._add_to_index(record, when)
+        record.last_seen = when
+
+    def _prune(self, now: float) -> None:
+        """Drop incidents and index buckets older than one window."""
+        oldest_bucket = int(now // self.window) - 1
+        for key in [key for key in self._index if key[2] < oldest_bucket]:
+            del self._index[key]
+        for incident_id in [i for i, r in self._incidents.items() if now - r.last_seen > self.window]:
+            del self._incidents[incident_id]
+
+    def get(self, incident_id: str) -> Optional[IncidentRecord]:
+        """Look up an active incident by ID."""
+        return self._incidents.get(incident_id)
+
+    def active_incidents(self) -> List[IncidentRecord]:
+        """All active incidents, most recently updated first."""
+        with self._lock:
+            return sorted(self._incidents.values(), key=lambda r: r.last_seen, reverse=True)
@@ -0,0 +1,256 @@
+"""
+incident_store.py
+
+Persistent SQLite store for incidents and their EIDO version history.
+
+The current version of each incident is kept in an `incidents` table with
+B-tree indexes on status, type, priority, creation time and location, so
+lookups and filtered listings are O(log n). Every saved EIDO is also
+appended to `eido_versions`, which keeps the full history of an incident.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    incident_id   TEXT PRIMARY KEY,
+    eido_id       TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    incident_type TEXT NOT NULL,
+    priority      INTEGER NOT NULL,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    latitude      REAL,
+    longitude     REAL,
+    version       INTEGER NOT NULL,
+    eido          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_type ON incidents (incident_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_priority ON incidents (priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_created ON incidents (created_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_location ON incidents (latitude, longitude);
+
+CREATE TABLE IF NOT EXISTS eido_versions (
+    incident_id TEXT NOT NULL,
+    version     INTEGER NOT NULL,
+    eido_id     TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    eido        TEXT NOT NULL,
+    PRIMARY KEY (incident_id, version)
+);
+"""
+
+
+class IncidentStore:
+    """
+    SQLite-backed incident store. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Open (and if needed create) the store.
+
+        Args:
+            path: Database file, or ":memory:" for a transient store
+        """
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def save(self, eido: Dict[str, Any]) -> int:
+        """
+        Save an EIDO as the newest version of its incident.
+
+        Args:
+            eido: EIDO object
+
+        Returns:
+            Version number of the saved EIDO (1 for a new incident)
+        """
+        incident = eido["eido"]["incident"]
+        coordinates = incident.get("location", {}).get("coordinates", {})
+        incident_id = incident["incidentID"]
+        document = json.dumps(eido)
+        now = datetime.now().isoformat()
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT version FROM incidents WHERE incident_id = ?", (incident_id,)
+            ).fetchone()
+            version = row["version"] + 1 if row else 1
+
+            self._conn.execute(
+                """
+                INSERT INTO incidents (incident_id, eido_id, status, incident_type, priority,
+                                       created_at, updated_at, latitude, longitude, version, eido)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (incident_id) DO UPDATE SET
+                    eido_id = excluded.eido_id,
+                    status = excluded.status,
+                    incident_type = excluded.incident_type,
+                    priority = excluded.priority,
+                    updated_at = excluded.updated_at,
+                    latitude = excluded.latitude,
+                    longitude = excluded.longitude,
+                    version = excluded.version,
+                    eido = excluded.eido
+                """,
+                (
+                    incident_id,
+                    eido["eido"]["eidoID"],
+                    incident.get("status", "active"),
+                    incident.get("incidentType", "unknown"),
+                    incident.get("priority", 3),
+                    incident.get("createdAt") or now,
+                    incident.get("updatedAt") or incident.get("createdAt") or now,
+                    coordinates.get("latitude"),
+                    coordinates.get("longitude"),
+                    version,
+                    document
+                )
+            )
+            self._conn.execute(
+                "INSERT INTO eido_versions (incident_id, version, eido_id, recorded_at, eido) VALUES (?, ?, ?, ?, ?)",
+                (incident_id, version, eido["eido"]["eidoID"], now, document)
+            )
+
+        return version
+
+    def get(self, incident_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the current EIDO of an incident.
+
+        Args:
+            incident_id: Incident ID
+
+        Returns:
+            EIDO object, or None if the incident is unknown
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT eido FROM incidents WHERE incident_id = ?", (incident_id,)).fetchone()
+        return json.loads(row["eido"]) if row else None
+
+    def get_history(self, incident_id: str) -> List[Dict[str, Any]]:
+        """
+        Get every saved version of an incident, oldest first.
+
+        Args:
+            incident_id: Incident ID
+
+        Returns:
+            List of dictionaries with "version", "eidoID", "recordedAt" and "eido"
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, eido_id, recorded_at, eido FROM eido_versions WHERE incident_id = ? ORDER BY version",
+                (incident_id,)
+            ).fetchall()
+        return [
+            {"version": row["version"], "eidoID": row["eido_id"], "recordedAt": row["recorded_at"], "eido": json.loads(row["eido"])}
+            for row in rows
+        ]
+
+    def list_incidents(self,
+                       status: Optional[str] = None,
+                       incident_type: Optional[str] = None,
+                       priority: Optional[int] = None,
+                       created_from: Optional[str] = None,
+                       created_to: Optional[str] = None,
+                       bounds: Optional[Dict[str, float]] = None,
+                       limit: int = 100,
+                       offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        List incidents, newest first.
+
+        Args:
+            status: Filter by status
+            incident_type: Filter by incident type
+            priority: Filter by priority
+            created_from: Earliest creation time (ISO format)
+            created_to: Latest creation time (ISO format)
+            bounds: Bounding box with "south", "west", "north" and "east"
+            limit: Maximum number of incidents
+            offset: Number of incidents to skip
+
+        Returns:
+            List of summaries with incidentID, eidoID, status, type, priority,
+            createdAt, updatedAt, latitude, longitude and version
+        """
+        clauses = []
+        params: List[Any] = []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if incident_type is not None:
+            clauses.append("incident_type = ?")
+            params.append(incident_type)
+        if priority is not None:
+            clauses.append("priority = ?")
+            params.append(priority)
+        if created_from is not None:
+            clauses.append("created_at >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            clauses.append("created_at <= ?")
+            params.append(created_to)
+        if bounds is not None:
+            clauses.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+            params.extend([bounds["south"], bounds["north"], bounds["west"], bounds["east"]])
+
+        query = ("SELECT incident_id, eido_id, status, incident_type, priority, created_at, updated_at, "
+                 "latitude, longitude, version FROM incidents")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {
+                "incidentID": row["incident_id"],
+                "eidoID": row["eido_id"],
+                "status": row["status"],
+                "type": row["incident_type"],
+                "priority": row["priority"],
+                "createdAt": row["created_at"],
+                "updatedAt": row["updated_at"],
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "version": row["version"]
+            }
+            for row in rows
+        ]
+
+    def count(self, status: Optional[str] = None) -> int:
+        """Number of incidents, optionally with a given status."""
+        with self._lock:
+            if status is None:
+                row = self._conn.execute("SELECT COUNT(*) FROM incidents").fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM incidents WHERE status = ?", (status,)).fetchone()
+        return row[0]
@@ -0,0 +1,220 @@
+"""
+keyword_rules.py
+
+Shared keyword rule tables for rule-based incident classification.
+
+All rule sets are compiled into one keyword automaton, so a single scan of
+the text scores every category used by the Safe Campus Agent and by the
+rule-based fallbacks of the call processor and report classifier. Adding
+keywords or rule sets grows the automaton, not the number of passes over
+the text.
+"""
+
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+from geocoding.matcher import AhoCorasick, lower_preserving_length
+
+# Each rule set is an ordered list of rules. Where a caller needs a single
+# answer, the first rule with a keyword present wins, so order encodes
+# precedence exactly like the if/elif chains these tables replace.
+# Keywords match as case-insensitive substrings.
+KEYWORD_RULES: Dict[str, List[Dict[str, Any]]] = {
+    # SafeCampusAgent._classify_incident
+    "agent.incident_type": [
+        {"label": "fire", "priority": 1, "confidence": 0.95,
+         "keywords": ["fire", "burning", "flames", "smoke"]},
+        {"label": "hazard", "priority": 1, "confidence": 0.93,
+         "keywords": ["gas leak", "gas smell", "fume", "strong smell"]},
+        {"label": "crime", "priority": 2, "confidence": 0.88,
+         "keywords": ["suspicious", "theft", "steal", "threat", "weapon", "gun"]},
+        {"label": "medical", "priority": 2, "confidence": 0.91,
+         "keywords": ["injured", "hurt", "medical", "ambulance", "blood"]},
+        {"label": "hazard", "priority": 1, "confidence": 0.89,
+         "keywords": ["leak", "chemical", "hazard", "spill"]},
+        {"label": "infrastructure", "priority": 3, "confidence": 0.85,
+         "keywords": ["power", "outage", "electricity"]},
+    ],
+    "agent.crime_subtype": [
+        {"label": "theft", "keywords": ["theft", "steal", "took", "missing"]},
+        {"label": "suspicious_person", "keywords": ["suspicious", "strange", "odd"]},
+        {"label": "assault", "keywords": ["assault", "attack", "hit", "punch"]},
+        {"label": "break_in", "keywords": ["break", "broke", "breaking"]},
+    ],
+    "agent.hazard_subtype": [
+        {"label": "gas_leak", "keywords": ["gas", "smell"]},
+        {"label": "chemical_spill", "keywords": ["chemical", "spill"]},
+        {"label": "flooding", "keywords": ["water", "flood"]},
+    ],
+    "agent.victims": [
+        {"label": "victims", "keywords": ["injured", "hurt", "victim", "bleeding"]},
+    ],
+    "agent.suspects": [
+        {"label": "suspects", "keywords": ["suspect", "suspicious", "man", "woman", "person", "wearing"]},
+    ],
+    "weapons": [
+        {"label": "weapons", "keywords": ["weapon", "gun", "knife", "armed"]},
+    ],
+
+    # EmergencyCallProcessor._fallback_extraction
+    "call.incident_type": [
+        {"label": "fire", "keywords": ["fire", "burning", "smoke", "flames"]},
+        {"label": "medical", "keywords": ["hurt", "injured", "bleeding", "pain", "medical", "ambulance", "heart"]},
+        {"label": "crime", "keywords": ["steal", "robber", "thief", "assault", "attack", "threat", "suspicious", "weapon", "gun"]},
+        {"label": "hazard", "keywords": ["leak", "spill", "chemical", "gas", "hazard", "toxic", "explosion"]},
+        {"label": "infrastructure", "keywords": ["power", "outage", "water", "flooding", "building", "damage", "elevator"]},
+    ],
+    "call.priority": [
+        {"label": 1, "keywords": ["emergency", "immediate", "lifethreatening", "life threatening", "life-threatening",
+                                  "critical", "severe", "grave"]},
+        {"label": 2, "keywords": ["urgent", "serious", "bad", "quickly", "asap"]},
+        {"label": 4, "keywords": ["minor", "small", "not urgent", "not serious", "not bad"]},
+    ],
+
+    # ReportClassifier._fallback_classification
+    "report.incident_type": [
+        {"label": "fire", "keywords": ["fire", "burn", "smoke", "flames"]},
+        {"label": "crime", "keywords": ["assault", "robbery", "theft", "break", "weapon"]},
+        {"label": "medical", "keywords": ["injured", "medical", "ambulance", "heart", "breathing", "blood"]},
+        {"label": "hazard", "keywords": ["leak", "spill", "chemical", "gas", "hazard", "toxic"]},
+        {"label": "infrastructure", "keywords": ["power", "outage", "water", "flooding", "building", "damage", "elevator"]},
+    ],
+    "report.resolved": [
+        {"label": "resolved", "keywords": ["resolved", "contained", "fixed", "ended", "secured"]},
+    ],
+    "report.severity": [
+        {"label": 5, "keywords": ["severe", "serious", "critical", "emergency", "immediate", "lifethreatening",
+                                  "life threatening", "life-threatening"]},
+        {"label": 3, "keywords": ["moderate", "significant"]},
+        {"label": 1, "keywords": ["minor", "small", "contained", "limited"]},
+    ],
+}
+
+
+class KeywordHits:
+    """Keyword occurrences found in one text, resolved against the rule sets."""
+
+    def __init__(self, rules: Dict[str, List[Dict[str, Any]]], keyword_counts: Counter, index: Dict[str, list]):
+        """
+        Args:
+            rules: The rule tables that were scanned for
+            keyword_counts: Occurrences of each keyword in the text
+            index: Keyword to [(rule set, rule position)] mapping
+        """
+        self.rules = rules
+        self.keyword_counts = keyword_counts
+        self._rule_counts: Dict[str, Counter] = {}
+        for keyword, count in keyword_counts.items():
+            for rule_set, position in index[keyword]:
+                self._rule_counts.setdefault(rule_set, Counter())[position] += count
+
+    def first(self, rule_set: str) -> Optional[Dict[str, Any]]:
+        """Return the highest-precedence rule with a keyword present, or None."""
+        counts = self._rule_counts.get(rule_set)
+        if not counts:
+            return None
+        return self.rules[rule_set][min(counts)]
+
+    def matched(self, rule_set: str) -> bool:
+        """Check whether any keyword of a rule set is present."""
+        return bool(self._rule_counts.get(rule_set))
+
+    def scores(self, rule_set: str) -> Dict[Any, int]:
+        """Return keyword occurrence counts per label of a rule set."""
+        scores: Dict[Any, int] = {}
+        for position, count in self._rule_counts.get(rule_set, {}).items():
+            label = self.rules[rule_set][position]["label"]
+            scores[label] = scores.get(label, 0) + count
+        return scores
+
+
+class KeywordScanner:
+    """
+    Scans text for the keywords of every rule set in a single pass.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        """
+        Compile the rule tables into one automaton.
+
+        Args:
+            rules: Rule tables (defaults to KEYWORD_RULES)
+        """
+        self.rules = rules if rules is not None else KEYWORD_RULES
+        self._index: Dict[str, list] = {}
+        self._automaton = AhoCorasick()
+
+        for rule_set, rule_list in self.rules.items():
+            for position, rule in enumerate(rule_list):
+                for keyword in rule["keywords"]:
+                    keyword = keyword.lower()
+                    if keyword not in self._index:
+                        self._index[keyword] = []
+                        self._automaton.add(keyword, keyword)
+                    self._index[keyword].append((rule_set, position))
+
+        self._automaton.build()
+
+    def scan(self, text: str) -> KeywordHits:
+        """
+        Find every rule keyword in text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            KeywordHits for all rule sets
+        """
+        counts = Counter(keyword for _, _, keyword in self._automaton.search(lower_preserving_length(text)))
+        return KeywordHits(self.rules, counts, self._index)
+
+    def stream(self) -> 'KeywordStream':
+        """Start an incremental scan over text that arrives in chunks."""
+        return KeywordStream(self)
+
+
+class KeywordStream:
+    """
+    Incremental keyword scan. Each chunk is scanned once, resuming the
+    automaton where the previous chunk ended, so keywords split across
+    chunks are still found.
+    """
+
+    def __init__(self, scanner: KeywordScanner):
+        self._scanner = scanner
+        self._state = 0
+        self._offset = 0
+        self.keyword_counts: Counter = Counter()
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Scan the next chunk of text.
+
+        Args:
+            chunk: Text following everything fed so far
+
+        Returns:
+            Keywords found in this chunk (including ones that started in
+            earlier chunks), in order of occurrence
+        """
+        matches, self._state = self._scanner._automaton.scan(
+            lower_preserving_length(chunk), self._state, self._offset
+        )
+        self._offset += len(chunk)
+        keywords = [keyword for _, _, keyword in matches]
+        self.keyword_counts.update(keywords)
+        return keywords
+
+    def hits(self) -> KeywordHits:
+        """Keyword hits for all text fed so far."""
+        return KeywordHits(self._scanner.rules, self.keyword_counts, self._scanner._index)
+
+
+_default_scanner = None
+
+def get_keyword_scanner() -> KeywordScanner:
+    """Get or build the scanner for the shared rule tables."""
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = KeywordScanner()
+    return _default_scanner
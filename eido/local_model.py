@@ -0,0 +1,423 @@
+"""
+local_model.py
+
+Offline incident classifier: hashed TF-IDF features and multinomial
+logistic regression, one head each for incident type, subtype and priority.
+
+The model is pure Python and needs no network. It is trained from the
+labeled examples in data/examples and the historical alerts, and stored as
+a small JSON file that loads in a few milliseconds:
+
+    python -m eido.local_model train
+    python -m eido.local_model predict "Smoke on the 3rd floor of Geisel"
+    python -m eido.local_model benchmark
+"""
+
+import glob
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Location of the trained model (see env.example); relative paths are
+# resolved against the project root, not the current directory
+LOCAL_MODEL_PATH = os.path.join(
+    _PROJECT_ROOT, os.getenv("LOCAL_MODEL_PATH", os.path.join("data", "models", "incident_classifier.json"))
+)
+
+# Whether the rule-based fallbacks use the model (see env.example)
+LOCAL_CLASSIFIER = os.getenv("LOCAL_CLASSIFIER", "keywords").lower()
+
+EXAMPLES_DIR = os.path.join(_PROJECT_ROOT, "data", "examples")
+ALERTS_PATH = os.path.join(_PROJECT_ROOT, "ucsd_alerts_geocoded.json")
+
+HEADS = ("incident_type", "incident_subtype", "priority")
+N_FEATURES = 2 ** 18
+EPOCHS = 30
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-4
+MODEL_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Historical alert crime types (lowercased) to (incident_type, incident_subtype)
+ALERT_CRIME_LABELS = [
+    ("arson", ("fire", "arson")),
+    ("robbery", ("crime", "robbery")),
+    ("burglar", ("crime", "burglary")),
+    ("unlawful entry", ("crime", "burglary")),
+    ("catalytic converter", ("crime", "theft")),
+    ("vehicle theft", ("crime", "vehicle_theft")),
+    ("false pretenses", ("crime", "fraud")),
+    ("sexual", ("crime", "sexual_assault")),
+    ("indecent exposure", ("crime", "indecent_exposure")),
+    ("aggravated assault", ("crime", "assault")),
+    ("firearm", ("crime", "armed_person")),
+    ("weapons", ("crime", "armed_person")),
+    ("stalking", ("crime", "stalking")),
+    ("intimidation", ("crime", "threat")),
+    ("trespass", ("crime", "trespassing")),
+    ("suspicious", ("crime", "suspicious_person")),
+]
+
+# Historical alert severity to priority (1 is highest)
+ALERT_SEVERITY_PRIORITY = {"high": 2, "medium": 3, "low": 4}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams and bigrams."""
+    words = _TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def hash_features(text: str) -> Counter:
+    """Term counts of a text, keyed by hashed feature bucket."""
+    return Counter(zlib.crc32(token.encode("utf-8")) & (N_FEATURES - 1) for token in tokenize(text))
+
+
+class LocalIncidentModel:
+    """
+    Trained incident classifier.
+
+    Each head stores, per feature bucket seen in training, the weight of
+    the bucket for every class, so scoring a text is one dictionary lookup
+    and one vector addition per feature.
+    """
+
+    def __init__(self, idf: Dict[int, float], default_idf: float, heads: Dict[str, Dict[str, Any]],
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            idf: Inverse document frequency per feature bucket seen in training
+            default_idf: IDF of buckets not seen in training
+            heads: Per head: "classes", "bias" (per class) and "weights"
+                (bucket to per-class weights)
+            metadata: Training information
+        """
+        self.idf = idf
+        self.default_idf = default_idf
+        self.heads = heads
+        self.metadata = metadata or {}
+
+    def vectorize(self, text: str) -> Dict[int, float]:
+        """L2-normalized sublinear TF-IDF vector of a text."""
+        counts = hash_features(text)
+        idf, default_idf = self.idf, self.default_idf
+        vector = {bucket: (1.0 + math.log(count)) * idf.get(bucket, default_idf) for bucket, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {bucket: w / norm for bucket, w in vector.items()}
+
+    def predict(self, text: str) -> Dict[str, Tuple[Any, float]]:
+        """
+        Classify a text.
+
+        Args:
+            text: Transcript or report
+
+        Returns:
+            Dictionary mapping each head to (label, probability)
+        """
+        vector = self.vectorize(text)
+        predictions = {}
+        for name, head in self.heads.items():
+            weights = head["weights"]
+            scores = list(head["bias"])
+            # Buckets never seen in training carry no evidence and are skipped
+            for bucket, w in vector.items():
+                row = weights.get(bucket)
+                if row is not None:
+                    for i, weight in enumerate(row):
+                        scores[i] += w * weight
+            best = max(range(len(scores)), key=scores.__getitem__)
+            top = scores[best]
+            probability = 1.0 / sum(math.exp(s - top) for s in scores)
+            predictions[name] = (head["classes"][best], round(probability, 4))
+        return predictions
+
+    def predict_batch(self, texts: Iterable[str]) -> List[Dict[str, Tuple[Any, float]]]:
+        """Classify several texts."""
+        return [self.predict(text) for text in texts]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form of the model."""
+        return {
+            "version": MODEL_VERSION,
+            "n_features": N_FEATURES,
+            "metadata": self.metadata,
+            "default_idf": self.default_idf,
+            "idf": {str(bucket): round(v, 5) for bucket, v in self.idf.items()},
+            "heads": {
+                name: {
+                    "classes": head["classes"],
+                    "bias": [round(v, 4) for v in head["bias"]],
+                    "weights": {str(bucket): [round(v, 4) for v in row] for bucket, row in head["weights"].items()}
+                }
+                for name, head in self.heads.items()
+            }
+        }
+
+    def save(self, path: str = LOCAL_MODEL_PATH) -> None:
+        """Write the model as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str = LOCAL_MODEL_PATH) -> 'LocalIncidentModel':
+        """
+        Load a model written by save().
+
+        Raises:
+            ValueError: If the file was written for a different feature space
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION or data.get("n_features") != N_FEATURES:
+            raise ValueError(f"Incompatible local model file: {path}")
+        heads = {
+            name: {
+                "classes": head["classes"],
+                "bias": head["bias"],
+                "weights": {int(bucket): row for bucket, row in head["weights"].items()}
+            }
+            for name, head in data["heads"].items()
+        }
+        idf = {int(bucket): v for bucket, v in data["idf"].items()}
+        return cls(idf, data["default_idf"], heads, data.get("metadata"))
+
+
+def train(examples: List[Dict[str, Any]], epochs: int = EPOCHS, learning_rate: float = LEARNING_RATE,
+          l2: float = L2_PENALTY, seed: int = 0) -> LocalIncidentModel:
+    """
+    Train a model with stochastic gradient descent on the softmax loss.
+
+    Examples are weighted so every class carries the same total weight:
+    the historical alerts are mostly crimes, and the corpus frequencies say
+    little about what the next call will be.
+
+    Args:
+        examples: Dictionaries with "text" and any of the labels in HEADS
+        epochs: Passes over the examples
+        learning_rate: Initial SGD step size (decays linearly)
+        l2: L2 penalty on the weights
+        seed: Shuffling seed
+
+    Returns:
+        Trained LocalIncidentModel
+    """
+    counts = [hash_features(example["text"]) for example in examples]
+    document_frequency: Counter = Counter()
+    for doc in counts:
+        document_frequency.update(doc.keys())
+    n_docs = len(examples)
+    idf = {bucket: math.log((1 + n_docs) / (1 + df)) + 1.0 for bucket, df in document_frequency.items()}
+    default_idf = math.log(1 + n_docs) + 1.0
+    model = LocalIncidentModel(idf, default_idf, {})
+    vectors = [model.vectorize(example["text"]) for example in examples]
+
+    rng = random.Random(seed)
+    for name in HEADS:
+        labeled = [(vector, example[name]) for vector, example in zip(vectors, examples) if example.get(name) not in (None, "")]
+        classes = sorted({label for _, label in labeled}, key=str)
+        if len(classes) < 2:
+            continue
+        index = {label: i for i, label in enumerate(classes)}
+        class_counts = Counter(label for _, label in labeled)
+        sample_weights = {label: len(labeled) / (len(classes) * count) for label, count in class_counts.items()}
+
+        n_classes = len(classes)
+        bias = [0.0] * n_classes
+        weights: Dict[int, List[float]] = {}
+        order = list(range(len(labeled)))
+        steps, total_steps = 0, epochs * len(order)
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for position in order:
+                vector, label = labeled[position]
+                rate = learning_rate * (1.0 - steps / total_steps)
+                steps += 1
+                rows = [weights.setdefault(bucket, [0.0] * n_classes) for bucket in vector]
+                scores = list(bias)
+                for w, row in zip(vector.values(), rows):
+                    for i in range(n_classes):
+                        scores[i] += w * row[i]
+                top = max(scores)
+                exps = [math.exp(score - top) for score in scores]
+                total = sum(exps)
+                target = index[label]
+                scale = rate * sample_weights[label]
+                gradients = [(e / total - (1.0 if i == target else 0.0)) * scale for i, e in enumerate(exps)]
+                for i in range(n_classes):
+                    bias[i] -= gradients[i]
+                for w, row in zip(vector.values(), rows):
+                    for i in range(n_classes):
+                        row[i] -= gradients[i] * w + rate * l2 * row[i]
+
+        model.heads[name] = {"classes": classes, "bias": bias, "weights": weights}
+
+    model.metadata = {
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "examples": n_docs,
+        "heads": {name: len(head["classes"]) for name, head in model.heads.items()}
+    }
+    return model
+
+
+def load_examples(examples_dir: str = EXAMPLES_DIR) -> List[Dict[str, Any]]:
+    """
+    Load labeled examples from the JSON Lines files of a directory.
+
+    Each line has labels and either "text" or "file" (a path relative to the
+    directory, e.g. one of the sample calls or reports).
+    """
+    examples = []
+    for path in sorted(glob.glob(os.path.join(examples_dir, "*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                example = json.loads(line)
+                if "file" in example:
+                    with open(os.path.join(examples_dir, example.pop("file")), "r", encoding="utf-8") as text_file:
+                        example["text"] = text_file.read()
+                examples.append(example)
+    return examples
+
+
+def keyword_examples() -> List[Dict[str, Any]]:
+    """
+    One single-keyword example per incident type keyword of the keyword
+    rules, so the model knows every term the rule-based fallbacks know.
+    """
+    from eido.keyword_rules import KEYWORD_RULES
+    
+    examples = []
+    for rule_set in ("call.incident_type", "report.incident_type"):
+        for rule in KEYWORD_RULES[rule_set]:
+            examples.extend({"text": keyword, "incident_type": rule["label"]} for keyword in rule["keywords"])
+    return examples
+
+
+def load_alert_examples(path: str = ALERTS_PATH) -> List[Dict[str, Any]]:
+    """
+    Turn historical alerts into labeled examples.
+
+    Alerts whose crime type is unspecified only label the priority.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        alerts = json.load(f)
+    examples = []
+    for alert in alerts:
+        crime_type = alert.get("crime_type", "")
+        example = {"text": f"{alert.get('alert_title', '')}. {crime_type}"}
+        lowered = crime_type.lower()
+        for fragment, (incident_type, subtype) in ALERT_CRIME_LABELS:
+            if fragment in lowered:
+                example["incident_type"] = incident_type
+                example["incident_subtype"] = subtype
+                break
+        severity = alert.get("description", "").rsplit(":", 1)[-1].strip().lower()
+        if severity in ALERT_SEVERITY_PRIORITY:
+            example["priority"] = 1 if alert.get("alert_type") == "Triton Alert" else ALERT_SEVERITY_PRIORITY[severity]
+        examples.append(example)
+    return examples
+
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_local_model() -> Optional[LocalIncidentModel]:
+    """
+    The model at LOCAL_MODEL_PATH, loaded on first use.
+
+    Returns:
+        The model, or None if the file is missing or unreadable
+    """
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            try:
+                start_time = time.perf_counter()
+                _model = LocalIncidentModel.load(LOCAL_MODEL_PATH)
+                logger.info(f"Loaded local incident model in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Local incident model unavailable: {e}")
+        return _model
+
+
+def default_local_model() -> Optional[LocalIncidentModel]:
+    """The local model if enabled by LOCAL_CLASSIFIER=model, else None."""
+    return get_local_model() if LOCAL_CLASSIFIER == "model" else None
+
+
+# Training CLI
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Train and evaluate the local incident classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train and save the model")
+    train_parser.add_argument("--examples", default=EXAMPLES_DIR, help="Directory of labeled .jsonl files")
+    train_parser.add_argument("--alerts", default=ALERTS_PATH, help="Historical alerts JSON ('' to skip)")
+    train_parser.add_argument("--output", default=LOCAL_MODEL_PATH, help="Model file to write")
+    train_parser.add_argument("--no-keywords", action="store_true", help="Skip the keyword rule examples")
+    train_parser.add_argument("--epochs", type=int, default=EPOCHS, help="SGD passes over the examples")
+
+    predict_parser = subparsers.add_parser("predict", help="Classify texts")
+    predict_parser.add_argument("texts", nargs="+")
+    predict_parser.add_argument("--model", default=LOCAL_MODEL_PATH)
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Measure load time and throughput")
+    benchmark_parser.add_argument("--model", default=LOCAL_MODEL_PATH)
+    benchmark_parser.add_argument("--examples", default=EXAMPLES_DIR)
+    benchmark_parser.add_argument("--count", type=int, default=5000, help="Texts to classify")
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        examples = load_examples(args.examples)
+        if args.alerts:
+            examples += load_alert_examples(args.alerts)
+        if not args.no_keywords:
+            examples += keyword_examples()
+        model = train(examples, epochs=args.epochs)
+        model.save(args.output)
+        print(f"Trained on {len(examples)} examples {model.metadata['heads']}; wrote {args.output} "
+              f"({os.path.getsize(args.output) / 1024:.0f} KB)")
+        # Resubstitution accuracy, as a sanity check only
+        for name in model.heads:
+            labeled = [e for e in examples if e.get(name) not in (None, "")]
+            correct = sum(model.predict(e["text"])[name][0] == e[name] for e in labeled)
+            print(f"  {name}: {correct}/{len(labeled)} training examples correct")
+
+    elif args.command == "predict":
+        model = LocalIncidentModel.load(args.model)
+        for text in args.texts:
+            print(json.dumps({"text": text, **{k: {"label": v[0], "probability": v[1]} for k, v in model.predict(text).items()}}))
+
+    elif args.command == "benchmark":
+        start_time = time.perf_counter()
+        model = LocalIncidentModel.load(args.model)
+        print(f"Loaded model in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+        texts = [e["text"] for e in load_examples(args.examples)]
+        texts = (texts * (args.count // len(texts) + 1))[:args.count]
+        start_time = time.perf_counter()
+        model.predict_batch(texts)
+        elapsed = time.perf_counter() - start_time
+        print(f"Classified {len(texts)} texts in {elapsed * 1000:.0f}ms ({len(texts) / elapsed:.0f}/s on one core)")
@@ -1,10 +1,11 @@
+import asyncio
 import csv
 import json
-import time
 import os
 import random
 import math
-from mistralai import Mistral
+
+from tracing import span
 
 # Configuration
 INPUT_CSV = "alerts.csv"
@@ -13,7 +14,7 @@ OUTPUT_JSON = "ucsd_alerts_geocoded.json"
 KNOWN_LOCATIONS_FILE = "known_locations.json"
 BATCH_SIZE = 5  # Process this many unknown locations at once
 MAX_ATTEMPTS = 3  # Max retry attempts for API calls
-PAUSE_SECONDS = 2  # Pause between retries
+PAUSE_SECONDS = 2  # Pause between retries of a malformed answer
 
 # Mistral API configuration
 API_KEY = os.environ.get("MISTRAL_API_KEY", "0y7ZgwMeDjtawMwmAcpo7i9polWc3TKM")
@@ -171,96 +172,103 @@ def extract_json_from_response(response_text):
     
     return response_text
 
+def parse_geocoding_response(result_text):
+    """Parse the LLM's geocoding answer into a mapping of location to details."""
+    json_text = extract_json_from_response(result_text)
+    try:
+        geocoded_results = json.loads(json_text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Failed to parse JSON response: {e}\nResponse: {json_text}")
+    
+    # Validate results format
+    if not isinstance(geocoded_results, list):
+        raise ValueError(f"Expected JSON array, got: {type(geocoded_results)}")
+    
+    results = {}
+    for result in geocoded_results:
+        # Check required fields
+        if not all(k in result for k in ["location", "name", "address", "lat", "lng"]):
+            print(f"Warning: Missing required keys in result: {result}")
+            continue
+        
+        location = result["location"]
+        name = result["name"]
+        address = result["address"]
+        lat = float(result["lat"])
+        lng = float(result["lng"])
+        
+        # Add to results without any boundary restrictions
+        results[location] = {
+            "name": name, 
+            "address": address,
+            "lat": lat, 
+            "lng": lng
+        }
+        print(f"Geocoded: {name} | {address} | ({lat}, {lng})")
+    return results
+
+async def geocode_batch_async(client, batch):
+    """
+    Geocode one batch of locations on the shared LLM client.
+    
+    Transient API errors are retried by the client; attempts here cover
+    malformed answers. Locations of a batch that keeps failing get the
+    San Diego default.
+    """
+    prompt = build_geocoding_prompt(batch)
+    
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            result_text = await client.chat_async([{"role": "user", "content": prompt}], model=MODEL,
+                                                refresh_cache=attempt > 1)
+            return parse_geocoding_response(result_text)
+        except Exception as e:
+            print(f"Error in geocoding attempt: {e}")
+            if attempt < MAX_ATTEMPTS:
+                print(f"Retrying in {PAUSE_SECONDS} seconds... ({MAX_ATTEMPTS - attempt} attempts left)")
+                await asyncio.sleep(PAUSE_SECONDS)
+    
+    print(f"All attempts failed for batch. Using default coordinates.")
+    # Use San Diego coordinates and address as fallback
+    return {
+        location: {
+            "name": location.split(',')[0] if ',' in location else location,
+            "address": "San Diego, California, USA",
+            "lat": 32.7157, 
+            "lng": -117.1611
+        }
+        for location in batch
+    }
+
 def geocode_unknown_locations_with_mistral(unknown_locations):
     """
     Use Mistral AI to geocode unknown location addresses to coordinates.
+    
+    Batches are sent concurrently through the shared LLM client, whose
+    concurrency limit and rate limiter replace the fixed pauses between
+    batches.
+    
     Returns: Dictionary mapping each location to its coordinates and address
     """
     if not unknown_locations:
         return {}
-        
-    # Initialize Mistral client
-    client = Mistral(api_key=API_KEY)
     
-    # Process in batches
+    # Imported here so that modules which only need the helpers above
+    # do not pay for setting up the LLM client
+    from llm.client import get_llm_client
+    client = get_llm_client(API_KEY)
+    
     location_batches = [unknown_locations[i:i+BATCH_SIZE] 
                         for i in range(0, len(unknown_locations), BATCH_SIZE)]
+    print(f"Geocoding {len(unknown_locations)} locations in {len(location_batches)} batches")
     
-    results = {}
+    async def geocode_all():
+        return await asyncio.gather(*(geocode_batch_async(client, batch) for batch in location_batches))
     
-    for batch_idx, batch in enumerate(location_batches):
-        print(f"Geocoding batch {batch_idx+1}/{len(location_batches)} ({len(batch)} locations)")
-        
-        prompt = build_geocoding_prompt(batch)
-        
-        attempts = MAX_ATTEMPTS
-        while attempts > 0:
-            try:
-                response = client.chat.complete(
-                    model=MODEL,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                if not response or not hasattr(response, "choices") or not response.choices:
-                    raise ValueError("No completion choices returned.")
-                
-                result_text = response.choices[0].message.content
-                json_text = extract_json_from_response(result_text)
-                
-                try:
-                    geocoded_results = json.loads(json_text)
-                    
-                    # Validate results format
-                    if not isinstance(geocoded_results, list):
-                        raise ValueError(f"Expected JSON array, got: {type(geocoded_results)}")
-                    
-                    for result in geocoded_results:
-                        # Check required fields
-                        if not all(k in result for k in ["location", "name", "address", "lat", "lng"]):
-                            print(f"Warning: Missing required keys in result: {result}")
-                            continue
-                        
-                        location = result["location"]
-                        name = result["name"]
-                        address = result["address"]
-                        lat = float(result["lat"])
-                        lng = float(result["lng"])
-                        
-                        # Add to results without any boundary restrictions
-                        results[location] = {
-                            "name": name, 
-                            "address": address,
-                            "lat": lat, 
-                            "lng": lng
-                        }
-                        print(f"Geocoded: {name} | {address} | ({lat}, {lng})")
-                    
-                    break  # Success - exit retry loop
-                    
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Failed to parse JSON response: {e}\nResponse: {json_text}")
-                
-            except Exception as e:
-                attempts -= 1
-                print(f"Error in geocoding attempt: {e}")
-                if attempts > 0:
-                    print(f"Retrying in {PAUSE_SECONDS} seconds... ({attempts} attempts left)")
-                    time.sleep(PAUSE_SECONDS)
-                else:
-                    print(f"All attempts failed for batch. Using default coordinates.")
-                    # Use default coordinates for failed locations
-                    for location in batch:
-                        # Use San Diego coordinates and address as fallback
-                        results[location] = {
-                            "name": location.split(',')[0] if ',' in location else location,
-                            "address": "San Diego, California, USA",
-                            "lat": 32.7157, 
-                            "lng": -117.1611
-                        }
-        
-        # Pause between batches to avoid rate limits
-        if batch_idx < len(location_batches) - 1:
-            time.sleep(PAUSE_SECONDS)
+    results = {}
+    with span("llm.geocode", model=MODEL, batches=len(location_batches)):
+        for batch_results in client.run(geocode_all()):
+            results.update(batch_results)
     
     return results
 
@@ -0,0 +1,283 @@
+"""
+preprocessing.py
+
+Token-budgeted preprocessing of transcripts and reports before LLM calls.
+
+Long calls carry a lot of text the LLM does not need: the dispatcher's
+standard script, filler words and statements repeated while the caller
+waits. Text within the token budget is sent unchanged. Longer text has
+those stripped, and if it is still over the budget the preprocessor keeps
+the sentences that score highest on the hazard keyword rules and on
+location mentions, in their original order. Speaker labels ("Caller:",
+"Dispatcher:") are kept on every turn that survives.
+
+The rule-based extraction and tiering still see the full text; only the
+prompt is compressed.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from eido.keyword_rules import KeywordScanner, get_keyword_scanner
+from geocoding.matcher import LocationMatcher, get_location_matcher
+from llm.tokens import estimate_tokens
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Preprocess prompts, and the token budget of a transcript or report in a
+# prompt (see env.example)
+PREPROCESS_TRANSCRIPTS = os.getenv("PREPROCESS_TRANSCRIPTS", "true").lower() in ("1", "true", "yes")
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "1500"))
+
+# Keyword rule sets that mark a sentence as describing the hazard
+HAZARD_RULE_SETS = ("call.incident_type", "report.incident_type", "call.priority", "weapons",
+                    "agent.victims", "agent.suspects")
+
+# Sentences of the dispatcher's standard script; they carry no incident facts
+DISPATCHER_SCRIPT_RE = re.compile(
+    r"^(?:9-?1-?1,?\s*)?(?:what(?:'s| is) (?:your|the) (?:emergency|address|location)"
+    r"|what(?:'s| is) your (?:name|phone number|callback number)"
+    r"|(?:please )?stay on the line|(?:please )?stay calm|(?:please )?(?:remain|stay) (?:calm|on the phone)"
+    r"|help is (?:on the way|coming)|(?:units?|officers?|fire department|paramedics) (?:are|is) on (?:the|their) way"
+    r"|(?:can|could) you (?:repeat|say) that(?: again)?|i(?:'m| am) (?:sending|dispatching) \w+(?: \w+)? now"
+    r"|(?:okay|ok|alright|all right|i see|i understand|got it|thank you|thanks)"
+    r")[\s,.!?]*$",
+    re.I
+)
+
+# Filler words and stutters
+FILLER_RE = re.compile(r"\b(?:u+m+|u+h+|e+r+m*|h+m+|you know|i mean)\b[,.]?\s*", re.I)
+REPEATED_WORD_RE = re.compile(r"\b(\w+)(?:\s+\1\b)+", re.I)
+
+# Words that place a sentence even when no known location is named
+LOCATION_CUE_RE = re.compile(
+    r"\b(?:floor|room|building|hall|lot|parking|structure|library|center|college|street|road|"
+    r"entrance|exit|wing|apartment|dorm|lab|stairwell|elevator|location|address|near|outside|inside)\b",
+    re.I
+)
+
+# Sentences with at least this many words are deduplicated across turns;
+# shorter ones only within a turn
+MIN_DEDUPE_WORDS = 5
+
+SPEAKER_RE = re.compile(r"^\s*([A-Z][\w .'-]{0,30}):\s+(.*)$")
+SENTENCE_RE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+
+
+@dataclass
+class PreprocessedText:
+    """Outcome of preprocessing one transcript or report."""
+    text: str
+    original_tokens: int
+    tokens: int
+    dropped_sentences: int = 0
+    truncated: bool = False  # Sentences were dropped to meet the budget
+
+    @property
+    def compression_ratio(self) -> float:
+        """Tokens kept per original token (1.0 when nothing was removed)."""
+        return round(self.tokens / self.original_tokens, 3) if self.original_tokens else 1.0
+
+
+class TranscriptPreprocessor:
+    """
+    Compresses transcripts and reports to a token budget.
+    """
+
+    def __init__(self, token_budget: int = TRANSCRIPT_TOKEN_BUDGET,
+                 scanner: Optional[KeywordScanner] = None,
+                 location_matcher: Optional[LocationMatcher] = None):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            token_budget: Maximum estimated tokens of the output (0 for no
+                limit, i.e. text is never changed)
+            scanner: Keyword scanner scoring hazard sentences (defaults to the
+                shared scanner)
+            location_matcher: Matcher scoring location sentences (defaults to
+                the shared matcher, see geocoding.matcher.get_location_matcher)
+        """
+        self.token_budget = token_budget
+        self.scanner = scanner or get_keyword_scanner()
+        self._location_matcher = location_matcher
+
+    @property
+    def location_matcher(self) -> LocationMatcher:
+        """Location matcher (the shared one unless given to the constructor)."""
+        if self._location_matcher is None:
+            self._location_matcher = get_location_matcher()
+        return self._location_matcher
+
+    def preprocess(self, text: str) -> PreprocessedText:
+        """
+        Fit a transcript or report to the budget, stripping boilerplate only
+        if it is over. Text within the budget is returned unchanged.
+
+        Args:
+            text: Transcript or report text
+
+        Returns:
+            PreprocessedText with the compressed text and token counts
+        """
+        original_tokens = estimate_tokens(text)
+        if self.token_budget <= 0 or original_tokens <= self.token_budget:
+            # Fits as is; short answers ("Yes.", "No.") only make sense in place
+            return PreprocessedText(text=text, original_tokens=original_tokens, tokens=original_tokens)
+
+        turns = self._split(text)
+        total = sum(len(sentences) for _, sentences in turns)
+
+        # (turn, position in turn, sentence, tokens); boilerplate already removed
+        candidates: List[Tuple[int, int, str, int]] = []
+        seen_anywhere = set()
+        for turn_index, (_, sentences) in enumerate(turns):
+            seen_in_turn = set()
+            for position, sentence in enumerate(sentences):
+                sentence = self._clean(sentence)
+                normalized = re.sub(r"[^a-z0-9]+", " ", sentence.lower()).strip()
+                if not normalized or normalized in seen_in_turn or DISPATCHER_SCRIPT_RE.match(sentence):
+                    continue
+                # Short sentences repeat legitimately across turns; only
+                # statements the caller keeps repeating are dropped
+                long_sentence = len(normalized.split()) >= MIN_DEDUPE_WORDS
+                if long_sentence and normalized in seen_anywhere:
+                    continue
+                seen_in_turn.add(normalized)
+                if long_sentence:
+                    seen_anywhere.add(normalized)
+                candidates.append((turn_index, position, sentence, estimate_tokens(sentence)))
+
+        kept = candidates
+        truncated = False
+        if self._cost(turns, candidates) > self.token_budget:
+            kept = self._select(turns, candidates)
+            truncated = True
+
+        compressed = self._join(turns, kept)
+        return PreprocessedText(
+            text=compressed,
+            original_tokens=original_tokens,
+            tokens=estimate_tokens(compressed),
+            dropped_sentences=total - len(kept),
+            truncated=truncated
+        )
+
+    def _split(self, text: str) -> List[Tuple[Optional[str], List[str]]]:
+        """Split text into (speaker, sentences) turns; lines without a speaker label have speaker None."""
+        turns = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            match = SPEAKER_RE.match(line)
+            speaker, body = (match.group(1), match.group(2)) if match else (None, line)
+            sentences = [s.strip() for s in SENTENCE_RE.findall(body) if s.strip()]
+            if sentences:
+                turns.append((speaker, sentences))
+        return turns
+
+    def _clean(self, sentence: str) -> str:
+        """Remove filler words and stutters."""
+        sentence = FILLER_RE.sub("", sentence)
+        sentence = REPEATED_WORD_RE.sub(r"\1", sentence)
+        sentence = re.sub(r"\s+", " ", sentence).strip(" ,")
+        return sentence[:1].upper() + sentence[1:]
+
+    def _score(self, sentence: str) -> float:
+        """Relevance of a sentence: hazard keywords plus location mentions."""
+        hits = self.scanner.scan(sentence)
+        score = sum(sum(hits.scores(rule_set).values()) for rule_set in HAZARD_RULE_SETS)
+        score += 2 * len(self.location_matcher.find_all(sentence))
+        if LOCATION_CUE_RE.search(sentence):
+            score += 1
+        if any(c.isdigit() for c in sentence):
+            # Floors, rooms, counts and phone numbers
+            score += 0.5
+        return score
+
+    def _select(self, turns: List[Tuple[Optional[str], List[str]]],
+                candidates: List[Tuple[int, int, str, int]]) -> List[Tuple[int, int, str, int]]:
+        """Keep the highest scoring sentences that fit the budget, in their original order."""
+        ranked = sorted(range(len(candidates)), key=lambda i: (-self._score(candidates[i][2]), i))
+        selected: List[int] = []
+        labeled = set()
+        used = 0
+        for i in ranked:
+            turn_index, _, _, tokens = candidates[i]
+            speaker = turns[turn_index][0]
+            if speaker and turn_index not in labeled:
+                tokens += estimate_tokens(speaker + ":")
+            if used + tokens > self.token_budget:
+                continue
+            used += tokens
+            selected.append(i)
+            if speaker:
+                labeled.add(turn_index)
+        return [candidates[i] for i in sorted(selected)]
+
+    def _cost(self, turns: List[Tuple[Optional[str], List[str]]],
+              candidates: List[Tuple[int, int, str, int]]) -> int:
+        """Estimated tokens of the joined text, including one speaker label per kept turn."""
+        labels = {turn_index for turn_index, _, _, _ in candidates if turns[turn_index][0]}
+        return sum(tokens for _, _, _, tokens in candidates) + sum(
+            estimate_tokens(turns[turn_index][0] + ":") for turn_index in labels
+        )
+
+    def _join(self, turns: List[Tuple[Optional[str], List[str]]],
+              kept: List[Tuple[int, int, str, int]]) -> str:
+        """Reassemble kept sentences into turns."""
+        lines = []
+        current_turn = None
+        for turn_index, _, sentence, _ in kept:
+            if turn_index != current_turn:
+                speaker = turns[turn_index][0]
+                lines.append(f"{speaker}: {sentence}" if speaker else sentence)
+                current_turn = turn_index
+            else:
+                lines[-1] += " " + sentence
+        return "\n".join(lines)
+
+
+_preprocessor: Optional[TranscriptPreprocessor] = None
+
+def default_preprocessor() -> Optional[TranscriptPreprocessor]:
+    """
+    Shared preprocessor with the configured budget, or None if
+    PREPROCESS_TRANSCRIPTS is off.
+    """
+    global _preprocessor
+    if not PREPROCESS_TRANSCRIPTS:
+        return None
+    if _preprocessor is None:
+        _preprocessor = TranscriptPreprocessor()
+    return _preprocessor
+
+
+def prepare_prompt_text(text: str, preprocessor: Optional[TranscriptPreprocessor]) -> str:
+    """
+    Text to embed in an LLM prompt.
+
+    Args:
+        text: Transcript or report text
+        preprocessor: Preprocessor to apply (None to use the text as is)
+
+    Returns:
+        The preprocessed text; the compression is recorded on an
+        "llm.preprocess" span
+    """
+    if preprocessor is None:
+        return text
+    with span("llm.preprocess") as preprocess_span:
+        result = preprocessor.preprocess(text)
+        preprocess_span.set_attribute("original_tokens", result.original_tokens)
+        preprocess_span.set_attribute("tokens", result.tokens)
+        preprocess_span.set_attribute("compression_ratio", result.compression_ratio)
+        preprocess_span.set_attribute("dropped_sentences", result.dropped_sentences)
+    logger.debug(f"Preprocessed prompt text: {result.original_tokens} -> {result.tokens} tokens "
+                 f"(ratio {result.compression_ratio})")
+    return result.text
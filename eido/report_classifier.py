@@ -9,53 +9,356 @@ import json
 import datetime
 import uuid
 import re
+import asyncio
 import os
-from typing import Dict, Any, List, Optional
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from enum import Enum
 
-# Import Mistral API client
-from mistralai import Mistral
-
 # Import local modules
 from eido.eido_schema import validate_eido
+from eido.keyword_rules import KeywordHits, get_keyword_scanner
+from eido.local_model import LocalIncidentModel, default_local_model
+from eido.preprocessing import TranscriptPreprocessor, default_preprocessor, prepare_prompt_text
+from eido.tiering import (LOCAL_CONFIDENCE_THRESHOLD, TIERED_CLASSIFICATION, assess_local, find_known_location,
+                           get_tier_metrics)
+from llm.client import get_llm_client
+from llm.deadline import DEFAULT_LLM_DEADLINE_SECONDS, call_with_deadline
+from llm.tokens import estimate_tokens, pack_batches
+from tracing import span
 from geocoding.geocode import geocode_location
 
+# Fields the LLM extracts from a report
+CLASSIFICATION_FIELDS = """
+        - incident_type: Primary category (e.g., "fire", "crime", "medical", "hazard", "infrastructure")
+        - incident_subtype: More specific classification
+        - severity: Assessed severity level (1-5, with 5 being most severe)
+        - location: The specific location mentioned
+        - location_details: Building, floor, room number, etc.
+        - time_occurred: When the incident occurred
+        - time_reported: When the incident was reported
+        - ongoing: Boolean indicating if the incident is ongoing
+        - affected_area_size: Estimated size of affected area in meters (radius from incident)
+        - immediate_danger: Boolean indicating if there's immediate danger to people
+        - evacuate: Boolean indicating if evacuation is needed
+        - shelter_in_place: Boolean indicating if people should shelter in place
+        - key_details: Array of 3-5 most important details from the report
+        - recommended_response: Brief recommendation for appropriate response""".strip("\n")
+
+# Bulk classification budget (see env.example): prompt plus expected output
+# tokens per request, and a cap on reports per request
+BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "12000"))
+BATCH_MAX_REPORTS = int(os.getenv("LLM_BATCH_MAX_REPORTS", "20"))
+# Expected output tokens per classification in a batch answer
+CLASSIFICATION_OUTPUT_TOKENS = 300
+
 class ReportClassifier:
     """
     Classifies written incident reports into structured alert information.
     Demo #2 - taking written reports and classifying them for notifications.
     """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, llm_deadline_seconds: Optional[float] = None,
+                 tiered: Optional[bool] = None, confidence_threshold: Optional[float] = None,
+                 local_model: Optional[LocalIncidentModel] = None,
+                 preprocessor: Optional[TranscriptPreprocessor] = None):
         """
         Initialize the report classifier.
         
         Args:
             api_key: API key for Mistral LLM (optional, will use env var if not provided)
+            llm_deadline_seconds: Time budget for the LLM classification before
+                the rule-based result is used (defaults to LLM_DEADLINE_SECONDS)
+            tiered: Whether to skip the LLM when the keyword rules are
+                confident (defaults to TIERED_CLASSIFICATION)
+            confidence_threshold: Local confidence needed to skip the LLM
+                (defaults to LOCAL_CONFIDENCE_THRESHOLD)
+            local_model: Local classifier for incident type, subtype and
+                severity in the rule-based classification (defaults to the
+                trained model if LOCAL_CLASSIFIER=model, else keyword rules only)
+            preprocessor: Compresses the report to a token budget before it
+                is sent to the LLM (defaults to the shared preprocessor unless
+                PREPROCESS_TRANSCRIPTS is off)
         """
         self.api_key = api_key or os.environ.get("MISTRAL_API_KEY")
         if not self.api_key:
             raise ValueError("Mistral API key is required. Set MISTRAL_API_KEY environment variable or pass as argument.")
             
-        self.client = Mistral(api_key=self.api_key)
+        # Shared process-wide client (connection pool, rate limits, retries)
+        self.client = get_llm_client(self.api_key)
         self.model = "mistral-large-latest"
+        self.llm_deadline_seconds = llm_deadline_seconds or DEFAULT_LLM_DEADLINE_SECONDS
+        self.tiered = TIERED_CLASSIFICATION if tiered is None else tiered
+        self.confidence_threshold = LOCAL_CONFIDENCE_THRESHOLD if confidence_threshold is None else confidence_threshold
+        self.local_model = local_model if local_model is not None else default_local_model()
+        self.preprocessor = preprocessor if preprocessor is not None else default_preprocessor()
     
-    def classify_report(self, report_text: str) -> Dict[str, Any]:
+    def classify_report(self, report_text: str, on_upgrade: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Classifies a written incident report into structured alert information.
         
+        In tiered mode the keyword rules classify the report first and the
+        LLM is only called if they are not confident enough.
+        
         Args:
             report_text: The text of the incident report
+            on_upgrade: Called with an updated alert (same alert_id) if the LLM
+                missed its deadline and answers later
             
         Returns:
             Structured alert information
         """
+        alert_id = str(uuid.uuid4())
+        on_late_result = None
+        if on_upgrade is not None:
+            on_late_result = lambda classification: on_upgrade(self._build_alert(alert_id, classification, report_text))
+        
+        start_time = time.perf_counter()
+        with span("classification") as classification_span:
+            classification, tier, escalation = self._classify_tiered(report_text, on_late_result)
+            classification_span.set_attribute("tier", tier)
+        get_tier_metrics().record(tier, (time.perf_counter() - start_time) * 1000, escalation)
+        
+        return self._build_alert(alert_id, classification, report_text, tier)
+    
+    def _classify_tiered(self, report_text: str,
+                         on_late_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[Dict[str, Any], str, Optional[str]]:
+        """
+        Classify with the keyword rules (or the local model) if they are
+        confident, else the LLM.
+        
+        Returns:
+            (classification, tier, escalation reason)
+        """
+        local, escalation = self._classify_locally(report_text)
+        if local is not None:
+            return local, "local", None
+        
         # Extract key information using the LLM
-        classification = self._extract_classification(report_text)
+        return self._extract_classification(report_text, on_late_result), "llm", escalation
+    
+    def _classify_locally(self, report_text: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Local classification for tiered mode.
+        
+        Returns:
+            (classification, None) if the keyword rules (or the local model)
+            are confident enough, else (None, reason the LLM is needed)
+        """
+        if not self.tiered:
+            return None, None
+        hits = get_keyword_scanner().scan(report_text)
+        predictions = self.local_model.predict(report_text) if self.local_model is not None else None
+        local = self._fallback_classification(report_text, hits, predictions)
+        location = find_known_location(report_text)
+        confidence, escalation = assess_local(
+            hits, "report.incident_type", location, self.confidence_threshold,
+            confidence=predictions["incident_type"][1] if predictions and "incident_type" in predictions else None,
+            priority_rule_set="report.severity",
+            priority_confidence=predictions["priority"][1] if predictions and "priority" in predictions else None
+        )
+        if escalation is not None:
+            return None, escalation
+        local["location"] = location["name"]
+        local["key_details"] = ["Classified by local model" if predictions else "Classified by local keyword rules"]
+        local["confidence"] = confidence
+        return local, None
+    
+    def classify_reports(self, report_texts: List[str],
+                         token_budget: Optional[int] = None,
+                         max_batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Classify many reports with few LLM requests, e.g. to backfill
+        historical reports.
+        
+        In tiered mode confidently classified reports never reach the LLM.
+        The others are packed into batches that fit the token budget, and the
+        batches are sent concurrently through the shared LLM client. Each
+        answer is an array with one classification per report. Reports that
+        are missing or malformed in an answer are split off and retried in
+        smaller batches. A report that fails on its own, and every report in
+        a batch whose request fails, gets the rule-based classification.
+        
+        Args:
+            report_texts: Report texts
+            token_budget: Estimated prompt plus output tokens per request
+                (defaults to BATCH_TOKEN_BUDGET)
+            max_batch_size: Maximum reports per request (defaults to
+                BATCH_MAX_REPORTS)
+            
+        Returns:
+            Alerts in the order of report_texts
+        """
+        token_budget = token_budget or BATCH_TOKEN_BUDGET
+        max_batch_size = max_batch_size or BATCH_MAX_REPORTS
+        metrics = get_tier_metrics()
+        
+        classifications: List[Optional[Dict[str, Any]]] = [None] * len(report_texts)
+        tiers = ["llm"] * len(report_texts)
+        pending = []
+        for index, report_text in enumerate(report_texts):
+            start_time = time.perf_counter()
+            local, escalation = self._classify_locally(report_text)
+            if local is not None:
+                classifications[index] = local
+                tiers[index] = "local"
+                metrics.record("local", (time.perf_counter() - start_time) * 1000)
+            else:
+                pending.append((index, escalation))
+        
+        if pending:
+            start_time = time.perf_counter()
+            prompt_texts = {index: prepare_prompt_text(report_texts[index], self.preprocessor) for index, _ in pending}
+            available = token_budget - estimate_tokens(self._batch_prompt([]))
+            batches = pack_batches(
+                [index for index, _ in pending],
+                lambda index: estimate_tokens(prompt_texts[index]) + CLASSIFICATION_OUTPUT_TOKENS,
+                available,
+                max_batch_size
+            )
+            with span("classification.batch", reports=len(pending), requests=len(batches)) as batch_span:
+                results = self.client.run(self._classify_batches_async(batches, report_texts, prompt_texts))
+                batch_span.set_attribute("fallbacks", sum(1 for c in results.values() if c.get("_fallback")))
+            # Per-report latency of the bulk tier is its share of the wall time
+            latency_ms = (time.perf_counter() - start_time) * 1000 / len(pending)
+            for index, escalation in pending:
+                classification = results[index]
+                classification.pop("_fallback", None)
+                classifications[index] = classification
+                metrics.record("llm", latency_ms, escalation)
+        
+        return [
+            self._build_alert(str(uuid.uuid4()), classification, report_text, tier)
+            for classification, report_text, tier in zip(classifications, report_texts, tiers)
+        ]
+    
+    async def _classify_batches_async(self, batches: List[List[int]], report_texts: List[str],
+                                      prompt_texts: Dict[int, str]) -> Dict[int, Dict[str, Any]]:
+        """Classify batches concurrently; returns classifications by report index."""
+        results: Dict[int, Dict[str, Any]] = {}
+        batch_calls = (self._classify_batch_async(batch, report_texts, prompt_texts) for batch in batches)
+        for batch_results in await asyncio.gather(*batch_calls):
+            results.update(batch_results)
+        return results
+    
+    async def _classify_batch_async(self, batch: List[int], report_texts: List[str],
+                                    prompt_texts: Dict[int, str]) -> Dict[int, Dict[str, Any]]:
+        """
+        Classify one batch, splitting and retrying reports missing from the
+        answer.
+        
+        Only an answer that cannot be parsed or covers part of the batch is
+        split and retried. If the request itself fails (authentication,
+        exhausted retries, a replay-mode cache miss), the whole batch falls
+        back to the rule-based classification at once, so an outage does not
+        multiply the traffic.
+        
+        Args:
+            batch: Indices into report_texts
+            report_texts: All report texts
+            prompt_texts: Preprocessed texts for the prompt by report index
+            
+        Returns:
+            Classifications by report index; rule-based ones are marked with
+            "_fallback"
+        """
+        messages = [
+            {"role": "system", "content": "You are an emergency management expert who analyzes incident reports."},
+            {"role": "user", "content": self._batch_prompt([prompt_texts[index] for index in batch])}
+        ]
+        try:
+            result_text = await self.client.chat_async(messages, model=self.model)
+        except Exception as e:
+            print(f"Error classifying batch of {len(batch)} reports: {e}")
+            return {index: self._marked_fallback(report_texts[index]) for index in batch}
         
-        # Create alert object from classification
-        alert = {
-            "alert_id": str(uuid.uuid4()),
+        parsed: Dict[int, Dict[str, Any]] = {}
+        try:
+            parsed = self._parse_batch(result_text, len(batch))
+        except ValueError as e:
+            print(f"Could not parse answer for batch of {len(batch)} reports: {e}")
+        if len(parsed) < len(batch):
+            # Do not replay a partial answer; the missing reports are retried below
+            self.client.invalidate(messages, model=self.model)
+        
+        results = {batch[position]: classification for position, classification in parsed.items()}
+        missing = [index for position, index in enumerate(batch) if position not in parsed]
+        if not missing:
+            return results
+        
+        if len(batch) == 1:
+            # Nothing left to split
+            results[batch[0]] = self._marked_fallback(report_texts[batch[0]])
+            return results
+        
+        # Retry the missing reports in halves (or alone)
+        half = (len(missing) + 1) // 2
+        parts = [missing[:half], missing[half:]] if len(missing) > 1 else [missing]
+        for part_results in await asyncio.gather(*(self._classify_batch_async(part, report_texts, prompt_texts) for part in parts)):
+            results.update(part_results)
+        return results
+    
+    def _marked_fallback(self, report_text: str) -> Dict[str, Any]:
+        """Rule-based classification of a report in a batch, marked with "_fallback"."""
+        classification = self._fallback_classification(report_text)
+        classification["_fallback"] = True
+        return classification
+    
+    def _batch_prompt(self, report_texts: List[str]) -> str:
+        """Prompt classifying several reports at once."""
+        reports = "\n\n".join(
+            f"REPORT {number}:\n{report_text}" for number, report_text in enumerate(report_texts, start=1)
+        )
+        return f"""
+        Analyze each of these {len(report_texts)} campus incident reports and extract key information for emergency notification purposes.
+        
+        {reports}
+        
+        Return ONLY a JSON array with one object per report, in report order. Each object has:
+        - report_number: The number of the report it classifies
+{CLASSIFICATION_FIELDS}
+        
+        Output ONLY the JSON array with no additional text.
+        """
+    
+    def _parse_batch(self, result_text: str, count: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Parse a batch answer.
+        
+        Args:
+            result_text: LLM answer
+            count: Number of reports in the batch
+            
+        Returns:
+            Classifications by position in the batch; malformed or missing
+            entries are left out
+            
+        Raises:
+            ValueError: If the answer is not a JSON array
+        """
+        items = json.loads(self._clean_json_text(result_text))
+        if not isinstance(items, list):
+            raise ValueError(f"Expected JSON array, got: {type(items)}")
+        
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or "incident_type" not in item:
+                continue
+            number = item.pop("report_number", None)
+            if isinstance(number, int) and 1 <= number <= count:
+                position = number - 1
+            elif len(items) != count:
+                # Without a number the position is only trusted if nothing was dropped
+                continue
+            parsed.setdefault(position, item)
+        return parsed
+    
+    def _build_alert(self, alert_id: str, classification: Dict[str, Any], report_text: str,
+                     tier: str = "llm") -> Dict[str, Any]:
+        """Create the alert object from a classification."""
+        return {
+            "alert_id": alert_id,
+            "classification_tier": tier,
             "timestamp": datetime.datetime.now().isoformat(),
             "classification": classification,
             "alert_level": self._determine_alert_level(classification),
@@ -63,19 +366,45 @@ class ReportClassifier:
             "notification_scope": self._determine_notification_scope(classification),
             "original_report": report_text
         }
+    
+    def _extract_classification(self, report_text: str,
+                                on_late_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Extract structured classification from the report text using LLM,
+        bounded by the LLM deadline.
         
-        return alert
+        Args:
+            report_text: The report text
+            on_late_result: Called with the LLM classification if it arrives
+                after the deadline
+            
+        Returns:
+            Dictionary containing extracted classification
+        """
+        race = call_with_deadline(
+            lambda: self._call_llm(report_text),
+            lambda: self._fallback_classification(report_text),
+            deadline_seconds=self.llm_deadline_seconds,
+            on_late_result=on_late_result
+        )
+        if race.error:
+            print(f"Error classifying report: {race.error}")
+        return race.value
     
-    def _extract_classification(self, report_text: str) -> Dict[str, Any]:
+    def _call_llm(self, report_text: str) -> Dict[str, Any]:
         """
-        Extract structured classification from the report text using LLM.
+        Classify the report text using the LLM.
         
         Args:
             report_text: The report text
             
         Returns:
             Dictionary containing extracted classification
+            
+        Raises:
+            Exception: If the API call fails or returns invalid JSON
         """
+        report_text = prepare_prompt_text(report_text, self.preprocessor)
         prompt = f"""
         Analyze this campus incident report and extract key information for emergency notification purposes:
         
@@ -83,44 +412,26 @@ class ReportClassifier:
         {report_text}
         
         Extract and return ONLY a JSON object with these fields:
-        - incident_type: Primary category (e.g., "fire", "crime", "medical", "hazard", "infrastructure")
-        - incident_subtype: More specific classification
-        - severity: Assessed severity level (1-5, with 5 being most severe)
-        - location: The specific location mentioned
-        - location_details: Building, floor, room number, etc.
-        - time_occurred: When the incident occurred
-        - time_reported: When the incident was reported
-        - ongoing: Boolean indicating if the incident is ongoing
-        - affected_area_size: Estimated size of affected area in meters (radius from incident)
-        - immediate_danger: Boolean indicating if there's immediate danger to people
-        - evacuate: Boolean indicating if evacuation is needed
-        - shelter_in_place: Boolean indicating if people should shelter in place
-        - key_details: Array of 3-5 most important details from the report
-        - recommended_response: Brief recommendation for appropriate response
+{CLASSIFICATION_FIELDS}
         
         Output ONLY the JSON with no additional text.
         """
         
+        messages = [
+            {"role": "system", "content": "You are an emergency management expert who analyzes incident reports."},
+            {"role": "user", "content": prompt}
+        ]
+        result_text = self.client.chat(messages, model=self.model)
+        
+        # Clean up the result
+        result_text = self._clean_json_text(result_text)
+        
         try:
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an emergency management expert who analyzes incident reports."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            result_text = response.choices[0].message.content
-            
-            # Clean up the result
-            result_text = self._clean_json_text(result_text)
-            
             return json.loads(result_text)
-                
-        except Exception as e:
-            print(f"Error classifying report: {e}")
-            # Fallback classification if API fails
-            return self._fallback_classification(report_text)
+        except json.JSONDecodeError:
+            # Do not replay an unusable answer from the cache
+            self.client.invalidate(messages, model=self.model)
+            raise
     
     def _clean_json_text(self, text: str) -> str:
         """Clean up JSON text that might be wrapped in markdown code blocks."""
@@ -140,40 +451,42 @@ class ReportClassifier:
         
         return text
     
-    def _fallback_classification(self, report_text: str) -> Dict[str, Any]:
+    def _fallback_classification(self, report_text: str, hits: Optional[KeywordHits] = None,
+                                 predictions: Optional[Dict[str, Tuple[Any, float]]] = None) -> Dict[str, Any]:
         """Simple keyword-based classification as fallback if API fails."""
+        # One scan of the report scores every keyword rule set
+        if hits is None:
+            hits = get_keyword_scanner().scan(report_text)
+        if predictions is None and self.local_model is not None:
+            predictions = self.local_model.predict(report_text)
+        
         # Extract incident type based on keywords
-        incident_type = "other"
-        if re.search(r'fire|burn|smoke|flames', report_text, re.I):
-            incident_type = "fire"
-        elif re.search(r'assault|robbery|theft|break|break-in|weapon', report_text, re.I):
-            incident_type = "crime"
-        elif re.search(r'injured|medical|ambulance|heart|breathing|blood', report_text, re.I):
-            incident_type = "medical"
-        elif re.search(r'leak|spill|chemical|gas|hazard|toxic', report_text, re.I):
-            incident_type = "hazard"
-        elif re.search(r'power|outage|water|flooding|building|damage|elevator', report_text, re.I):
-            incident_type = "infrastructure"
+        type_rule = hits.first("report.incident_type")
+        incident_type = type_rule["label"] if type_rule else "other"
+        incident_subtype = ""
             
         # Extract location with a simple regex
-        location_match = re.search(r'at\s+([A-Za-z0-9\s,&\-]+?)(?:\.|\n)', report_text)
+        location_match = re.search(r'\bat\s+([A-Za-z0-9\s,&\-]+?)(?:\.|\n)', report_text)
         location = location_match.group(1).strip() if location_match else "Unknown location"
         
         # Determine if it's ongoing based on tense
-        ongoing = not bool(re.search(r'resolved|contained|fixed|ended|secured', report_text, re.I))
+        ongoing = not hits.matched("report.resolved")
         
         # Simple severity assessment
-        severity = 3  # Default to medium
-        if re.search(r'severe|serious|critical|emergency|immediate|life.?threatening', report_text, re.I):
-            severity = 5
-        elif re.search(r'moderate|significant', report_text, re.I):
-            severity = 3
-        elif re.search(r'minor|small|contained|limited', report_text, re.I):
-            severity = 1
+        severity_rule = hits.first("report.severity")
+        severity = severity_rule["label"] if severity_rule else 3  # Default to medium
+        
+        # The local model, if enabled, decides type, subtype and severity;
+        # heads it was not trained for keep the rule-based values
+        if predictions:
+            incident_type = predictions.get("incident_type", (incident_type,))[0]
+            incident_subtype = predictions.get("incident_subtype", (incident_subtype,))[0]
+            if "priority" in predictions:
+                severity = 6 - predictions["priority"][0]
             
         return {
             "incident_type": incident_type,
-            "incident_subtype": "",
+            "incident_subtype": incident_subtype,
             "severity": severity,
             "location": location,
             "location_details": "",
@@ -333,7 +646,8 @@ class ReportClassifier:
         """Get coordinates for a location using the geocoding service."""
         try:
             # Call the geocoding service
-            geocode_result = geocode_location(location)
+            with span("geocoder.geocode"):
+                geocode_result = geocode_location(location)
             
             if geocode_result and 'lat' in geocode_result and 'lng' in geocode_result:
                 return {
@@ -0,0 +1,177 @@
+"""
+tiering.py
+
+Confidence-gated tiered classification.
+
+The call processor and report classifier first classify with the local
+keyword rules (or the local model, see local_model.py), which take about a
+millisecond. The LLM is only called when the local incident type or
+priority is not confident enough, no specific known place is mentioned, or
+the stakes are ambiguous (see assess_local). Per-tier counts and
+latencies are collected in TierMetrics.
+"""
+
+import os
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from eido.keyword_rules import KeywordHits
+from geocoding.matcher import get_location_matcher
+
+# Tiered mode and the local confidence needed to skip the LLM (see env.example)
+TIERED_CLASSIFICATION = os.getenv("TIERED_CLASSIFICATION", "true").lower() in ("1", "true", "yes")
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.8"))
+
+def keyword_confidence(hits: KeywordHits, rule_set: str) -> float:
+    """
+    Confidence of the rule-based answer for a rule set.
+
+    The share of keyword occurrences pointing to the winning label, scaled
+    down when the answer rests on a single occurrence.
+
+    Args:
+        hits: Keyword hits of the text
+        rule_set: Rule set deciding the label
+
+    Returns:
+        Confidence in [0, 1]; 0 if no rule matched
+    """
+    scores = hits.scores(rule_set)
+    if not scores:
+        return 0.0
+    winner = hits.first(rule_set)["label"]
+    share = scores[winner] / sum(scores.values())
+    support = min(1.0, 0.6 + 0.2 * scores[winner])
+    return round(share * support, 3)
+
+
+def find_known_location(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Most specific known place mentioned in a text.
+
+    Regional names ("UC San Diego", "San Diego") do not count, since they
+    do not say whom to notify.
+
+    Args:
+        text: Transcript or report text
+
+    Returns:
+        The mention (see LocationMatcher.find_all), or None
+    """
+    mention = get_location_matcher().best_match(text)
+    return mention if mention is not None and mention["specific"] else None
+
+
+def assess_local(hits: KeywordHits, rule_set: str, location: Optional[Dict[str, Any]],
+                 threshold: float = LOCAL_CONFIDENCE_THRESHOLD,
+                 confidence: Optional[float] = None,
+                 priority_rule_set: Optional[str] = None,
+                 priority_confidence: Optional[float] = None) -> Tuple[float, Optional[str]]:
+    """
+    Decide whether a local classification can be used without the LLM.
+
+    Both the incident type and the priority must be confident, since the
+    priority decides who is notified and how.
+
+    Args:
+        hits: Keyword hits of the text
+        rule_set: Rule set deciding the incident type
+        location: Known place mentioned in the text (see find_known_location)
+        threshold: Minimum confidence
+        confidence: Confidence of the local incident type if it did not come
+            from the keyword rules (e.g. the local model's probability)
+        priority_rule_set: Rule set deciding the priority (or severity)
+        priority_confidence: Confidence of the local priority if it did not
+            come from the keyword rules
+
+    Returns:
+        (confidence, escalation reason); the reason is None when the local
+        result is good enough
+    """
+    if confidence is None:
+        confidence = keyword_confidence(hits, rule_set)
+    if confidence == 0:
+        return confidence, "no_match"
+    if confidence < threshold:
+        return confidence, "low_confidence"
+    if priority_confidence is None and priority_rule_set is not None:
+        priority_confidence = keyword_confidence(hits, priority_rule_set)
+    if priority_confidence is not None:
+        # A default priority would silently narrow who gets notified
+        if priority_confidence == 0:
+            return confidence, "no_priority"
+        if priority_confidence < threshold:
+            return confidence, "low_priority_confidence"
+    # High stakes: weapon reports need the LLM's suspect and threat details
+    if hits.matched("weapons"):
+        return confidence, "weapons"
+    # Without a known place nobody can be targeted
+    if location is None:
+        return confidence, "no_location"
+    return confidence, None
+
+
+class TierMetrics:
+    """
+    Thread-safe counts and recent latencies per classification tier.
+    """
+
+    def __init__(self, window: int = 1000):
+        """
+        Args:
+            window: Number of recent latencies kept per tier
+        """
+        self._lock = threading.Lock()
+        self._window = window
+        self._counts: Counter = Counter()
+        self._latencies: Dict[str, deque] = {}
+        self._escalations: Counter = Counter()
+
+    def record(self, tier: str, latency_ms: float, escalation: Optional[str] = None) -> None:
+        """
+        Record one classification.
+
+        Args:
+            tier: "local" or "llm"
+            latency_ms: End-to-end classification latency
+            escalation: Why the LLM was needed, for the "llm" tier
+        """
+        with self._lock:
+            self._counts[tier] += 1
+            self._latencies.setdefault(tier, deque(maxlen=self._window)).append(latency_ms)
+            if escalation:
+                self._escalations[escalation] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current metrics.
+
+        Returns:
+            Dictionary with total, the share of each tier, per-tier count and
+            latency percentiles, and escalation reasons
+        """
+        with self._lock:
+            total = sum(self._counts.values())
+            tiers = {}
+            for tier, count in self._counts.items():
+                latencies = sorted(self._latencies[tier])
+                tiers[tier] = {
+                    "count": count,
+                    "ratio": round(count / total, 3),
+                    "mean_ms": round(sum(latencies) / len(latencies), 3),
+                    "p50_ms": round(_percentile(latencies, 0.5), 3),
+                    "p95_ms": round(_percentile(latencies, 0.95), 3)
+                }
+            return {"total": total, "tiers": tiers, "escalations": dict(self._escalations)}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+_metrics = TierMetrics()
+
+def get_tier_metrics() -> TierMetrics:
+    """Process-wide tier metrics."""
+    return _metrics
@@ -0,0 +1,223 @@
+"""
+cache.py
+
+Two-level cache in front of geocode_location.
+
+Resolved locations are kept in an in-process LRU backed by a SQLite
+key-value table, keyed by normalized location text. Entries hold the
+un-jittered base coordinate and the tier that resolved it ("campus",
+"database" or "fuzzy"), so callers still get fresh jitter on every lookup.
+Text that fell through to the San Diego default is cached as a negative
+entry (tier "default", no coordinate) with a shorter TTL.
+
+Every entry records the generation (fingerprint) of the location data it
+was resolved against; entries from another generation are ignored, so
+adding or editing locations never serves stale answers.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cache switch, location, size and TTLs (see env.example)
+GEOCODE_CACHE_ENABLED = os.getenv("GEOCODE_CACHE", "true").lower() in ("1", "true", "yes")
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "geocode_cache.db")
+)
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+GEOCODE_CACHE_TTL_SECONDS = float(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL_SECONDS = float(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+
+# Tier of a negative entry
+DEFAULT_TIER = "default"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    key        TEXT PRIMARY KEY,
+    lat        REAL,
+    lng        REAL,
+    tier       TEXT NOT NULL,
+    generation TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_location_text(location_text: str) -> str:
+    """Cache key of a location string: lowercased, whitespace collapsed."""
+    return _WHITESPACE_RE.sub(" ", location_text).strip().lower()
+
+
+@dataclass
+class GeocodeEntry:
+    """Cached resolution of one location string."""
+    lat: Optional[float]
+    lng: Optional[float]
+    tier: str
+    generation: str
+    created_at: float
+
+    @property
+    def negative(self) -> bool:
+        return self.tier == DEFAULT_TIER
+
+
+class GeocodeCache:
+    """
+    In-process LRU over a persistent SQLite table. Safe to share between
+    threads.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = GEOCODE_CACHE_PATH,
+                 max_memory_entries: int = GEOCODE_CACHE_SIZE,
+                 ttl_seconds: float = GEOCODE_CACHE_TTL_SECONDS,
+                 negative_ttl_seconds: float = GEOCODE_NEGATIVE_TTL_SECONDS):
+        """
+        Open (and if needed create) the cache.
+
+        Args:
+            path: Database file, ":memory:", or None for the in-process LRU only
+            max_memory_entries: Size of the in-process LRU
+            ttl_seconds: Lifetime of resolved entries (0 for no expiry)
+            negative_ttl_seconds: Lifetime of negative entries (0 for no expiry)
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "negative_hits": 0, "writes": 0}
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, GeocodeEntry]" = OrderedDict()
+        self._conn = None
+        if path is not None:
+            if path != ":memory:":
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock:
+                if path != ":memory:":
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _fresh(self, entry: GeocodeEntry, generation: str, now: float) -> bool:
+        if entry.generation != generation:
+            return False
+        ttl = self.negative_ttl_seconds if entry.negative else self.ttl_seconds
+        return ttl <= 0 or now - entry.created_at <= ttl
+
+    def get(self, key: str, generation: str) -> Optional[GeocodeEntry]:
+        """
+        Cached entry for a normalized location string.
+
+        Args:
+            key: Key from normalize_location_text()
+            generation: Current location data generation
+
+        Returns:
+            The entry, or None if missing, expired or from another generation
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry, generation, now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    self.stats["negative_hits"] += entry.negative
+                    return entry
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT lat, lng, tier, generation, created_at FROM geocode_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = GeocodeEntry(*row)
+                    if self._fresh(entry, generation, now):
+                        self._remember(key, entry)
+                        self.stats["disk_hits"] += 1
+                        self.stats["negative_hits"] += entry.negative
+                        return entry
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, lat: Optional[float], lng: Optional[float], tier: str, generation: str) -> None:
+        """
+        Store the resolution of a normalized location string.
+
+        Args:
+            key: Key from normalize_location_text()
+            lat: Base latitude (None for a negative entry)
+            lng: Base longitude (None for a negative entry)
+            tier: Resolving tier, or DEFAULT_TIER for a negative entry
+            generation: Location data generation it was resolved against
+        """
+        entry = GeocodeEntry(lat, lng, tier, generation, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO geocode_cache (key, lat, lng, tier, generation, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, lat, lng, tier, generation, entry.created_at)
+                    )
+            self.stats["writes"] += 1
+
+    def _remember(self, key: str, entry: GeocodeEntry) -> None:
+        """Add to the LRU (lock held)."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry from both levels."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM geocode_cache")
+
+    def summary(self) -> Dict[str, Any]:
+        """Sizes and hit statistics."""
+        with self._lock:
+            disk_entries = (self._conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+                            if self._conn is not None else 0)
+            return {"memory_entries": len(self._memory), "disk_entries": disk_entries, **self.stats}
+
+
+_cache: Optional[GeocodeCache] = None
+_cache_lock = threading.Lock()
+
+def get_geocode_cache() -> Optional[GeocodeCache]:
+    """Process-wide geocode cache, or None if GEOCODE_CACHE is off."""
+    global _cache
+    if not GEOCODE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache()
+        return _cache
@@ -9,15 +9,36 @@ import logging
 import json
 import re
 from typing import Dict, Any, List, Optional, Tuple, Union
-import time
 import random
 import math
+import zlib
 
-from geocoding.locations import LocationDatabase
+from geocoding.cache import DEFAULT_TIER, get_geocode_cache, normalize_location_text
+from geocoding.locations import MATCHER_VERSION, LocationDatabase
+from geocoding.matcher import AhoCorasick
+from tracing import span
 
 logger = logging.getLogger(__name__)
 
-# Initialize location database
+# Campus landmarks checked before the location database
+CAMPUS_LOCATIONS = {
+    "Geisel Library": (32.8810, -117.2370),
+    "Price Center": (32.8794, -117.2359),
+    "Warren Mall": (32.8822, -117.2345),
+    "BCB Café": (32.8820, -117.2350),
+    "UCSD": (32.8801, -117.2340),
+    "UC San Diego": (32.8801, -117.2340),
+    "La Jolla": (32.8328, -117.2712),
+    "San Diego": (32.7157, -117.1611)
+}
+_CAMPUS_FINGERPRINT = format(zlib.crc32(json.dumps(CAMPUS_LOCATIONS, sort_keys=True).encode("utf-8")), "08x")
+
+# Tier of locations placed by the remote (LLM) provider, and the coordinates
+# the provider answers with when it cannot place a location
+REMOTE_TIER = "remote"
+REMOTE_FALLBACK_COORDINATES = (32.7157, -117.1611)
+
+# Location database, built lazily on first use
 _location_db = None
 
 def get_location_database() -> LocationDatabase:
@@ -30,11 +51,18 @@ def get_location_database() -> LocationDatabase:
         )
     return _location_db
 
+def warm_up() -> None:
+    """Build the location database ahead of the first geocoding request."""
+    get_location_database()
+
 def geocode_location(location_text: str) -> Optional[Dict[str, float]]:
     """
     Geocode a location string to coordinates.
     Uses a hierarchy of geocoding methods, falling back as needed.
     
+    Resolved base coordinates are cached (see geocoding/cache.py); jitter is
+    applied to every result, cached or not.
+    
     Args:
         location_text: Location text to geocode
         
@@ -44,27 +72,53 @@ def geocode_location(location_text: str) -> Optional[Dict[str, float]]:
     if not location_text:
         return None
     
-    # Try campus geocoding first
-    coordinates = simple_campus_geocode(location_text)
-    if coordinates:
-        logger.debug(f"Found coordinates for '{location_text}' using campus geocoding: {coordinates}")
-        return coordinates
+    base, tier = resolve_location(location_text)
+    if base is None:
+        # Fall back to default coordinates for San Diego with jitter
+        return get_default_coordinates()
     
-    # Try geocoding using the location database
-    coordinates = database_geocode(location_text)
-    if coordinates:
-        logger.debug(f"Found coordinates for '{location_text}' using database geocoding: {coordinates}")
-        return coordinates
+    lat, lng = jitter_coordinates(base[0], base[1])
+    return {"lat": lat, "lng": lng}
+
+def resolve_location(location_text: str) -> Tuple[Optional[Tuple[float, float]], str]:
+    """
+    Un-jittered base coordinates of a location string and the tier that
+    resolved them, served from the geocode cache when possible.
     
-    # Try fuzzy matching for locations
-    coordinates = fuzzy_location_match(location_text)
-    if coordinates:
-        logger.debug(f"Found coordinates for '{location_text}' using fuzzy matching: {coordinates}")
-        return coordinates
+    Args:
+        location_text: Location text to geocode
+        
+    Returns:
+        ((lat, lng), tier) with tier "campus", "database" or "fuzzy", or
+        (None, "default") if no tier knows the location
+    """
+    # Every tier matches case-insensitively, so the normalized text resolves
+    # exactly like any string sharing its cache key
+    key = normalize_location_text(location_text)
+    cache = get_geocode_cache()
+    if cache is not None:
+        generation = _cache_generation()
+        entry = cache.get(key, generation)
+        if entry is not None:
+            return (None if entry.negative else (entry.lat, entry.lng)), entry.tier
     
-    # Fall back to default coordinates for San Diego with jitter
-    logger.info(f"Could not geocode location: '{location_text}', using default coordinates")
-    return get_default_coordinates()
+    base, tier = None, DEFAULT_TIER
+    for tier_name, resolve in GEOCODING_TIERS:
+        base = resolve(key)
+        if base:
+            tier = tier_name
+            logger.debug(f"Found coordinates for '{location_text}' using {tier_name} geocoding: {base}")
+            break
+    else:
+        logger.info(f"Could not geocode location: '{location_text}', using default coordinates")
+    
+    if cache is not None:
+        cache.put(key, base[0] if base else None, base[1] if base else None, tier, generation)
+    return base, tier
+
+def _cache_generation() -> str:
+    """Generation of the data the geocoding tiers resolve against."""
+    return f"{_CAMPUS_FINGERPRINT}-{get_location_database().fingerprint()}-m{MATCHER_VERSION}"
 
 def simple_campus_geocode(location_text: str) -> Optional[Dict[str, float]]:
     """
@@ -76,27 +130,7 @@ def simple_campus_geocode(location_text: str) -> Optional[Dict[str, float]]:
     Returns:
         Dictionary with "lat" and "lng" keys, or None if not found
     """
-    # Use existing simple campus geocode function for backward compatibility
-    CAMPUS_LOCATIONS = {
-        "Geisel Library": (32.8810, -117.2370),
-        "Price Center": (32.8794, -117.2359),
-        "Warren Mall": (32.8822, -117.2345),
-        "BCB Café": (32.8820, -117.2350),
-        "UCSD": (32.8801, -117.2340),
-        "UC San Diego": (32.8801, -117.2340),
-        "La Jolla": (32.8328, -117.2712),
-        "San Diego": (32.7157, -117.1611)
-    }
-    
-    if not location_text:
-        return None
-        
-    for name, coords in CAMPUS_LOCATIONS.items():
-        if name.lower() in location_text.lower():
-            lat, lng = jitter_coordinates(coords[0], coords[1])
-            return {"lat": lat, "lng": lng}
-            
-    return None
+    return _jittered(_campus_base(location_text))
 
 def database_geocode(location_text: str) -> Optional[Dict[str, float]]:
     """
@@ -108,15 +142,7 @@ def database_geocode(location_text: str) -> Optional[Dict[str, float]]:
     Returns:
         Dictionary with "lat" and "lng" keys, or None if not found
     """
-    db = get_location_database()
-    coordinates = db.get_coordinates(location_text)
-    
-    if coordinates:
-        # Add jitter to avoid exact overlaps
-        lat, lng = jitter_coordinates(coordinates["lat"], coordinates["lng"])
-        return {"lat": lat, "lng": lng}
-        
-    return None
+    return _jittered(_database_base(location_text))
 
 def fuzzy_location_match(location_text: str) -> Optional[Dict[str, float]]:
     """
@@ -129,52 +155,100 @@ def fuzzy_location_match(location_text: str) -> Optional[Dict[str, float]]:
     Returns:
         Dictionary with "lat" and "lng" keys, or None if not found
     """
-    db = get_location_database()
-    location_text = location_text.lower()
-    
-    # Try to match by extracting keywords
-    # Common location prefixes/suffixes to extract
-    keywords = [
-        "near", "at", "in", "by", "close to", "next to", "across from",
-        "hall", "building", "center", "library", "commons", "plaza",
-        "quad", "park", "field", "lab", "campus", "college"
-    ]
-    
-    # Extract potential location names
-    for keyword in keywords:
-        if keyword in location_text:
-            parts = location_text.split(keyword)
-            for part in parts:
-                # Try to geocode each part
-                cleaned_part = part.strip()
-                if cleaned_part:
-                    coords = db.get_coordinates(cleaned_part)
-                    if coords:
-                        lat, lng = jitter_coordinates(coords["lat"], coords["lng"])
-                        return {"lat": lat, "lng": lng}
+    return _jittered(_fuzzy_base(location_text))
+
+def _jittered(base: Optional[Tuple[float, float]]) -> Optional[Dict[str, float]]:
+    """Jittered coordinates dictionary for a base coordinate."""
+    if not base:
+        return None
+    # Add jitter to avoid exact overlaps
+    lat, lng = jitter_coordinates(base[0], base[1])
+    return {"lat": lat, "lng": lng}
+
+class _NameIndex:
+    """
+    Finds the first of an ordered list of names contained in a text with one
+    Aho-Corasick scan, instead of one substring test per name. Matching is
+    case-insensitive, like the linear scans it replaces.
+    """
     
-    # Try checking all known locations for partial matches
-    all_known = db.get_all_known_locations()
-    best_match = None
-    best_match_score = 0
+    def __init__(self, entries: List[Tuple[str, Tuple[float, float]]]):
+        """
+        Args:
+            entries: (name, (lat, lng)) pairs; earlier entries win
+        """
+        self._automaton = AhoCorasick()
+        for priority, (name, coords) in enumerate(entries):
+            self._automaton.add(name.lower(), (priority, coords))
+        self._automaton.build()
     
-    for known_name, data in all_known.items():
-        # Simple scoring: count how many words from the known name appear in the text
-        words = known_name.lower().split()
-        score = sum(1 for word in words if word in location_text)
-        
-        # Require at least one word match with 3+ characters
-        if score > 0 and any(len(word) >= 3 and word in location_text for word in words):
-            if score > best_match_score:
-                best_match = data
-                best_match_score = score
+    def first(self, text: str) -> Optional[Tuple[float, float]]:
+        """Coordinates of the earliest entry whose name occurs in text."""
+        matches = self._automaton.search(text.lower())
+        if not matches:
+            return None
+        return min(payload for _, _, payload in matches)[1]
+
+_campus_index: Optional[_NameIndex] = None
+_database_index_state: Optional[Tuple[int, _NameIndex]] = None
+
+def _campus_names() -> _NameIndex:
+    """Index over CAMPUS_LOCATIONS, built on first use."""
+    global _campus_index
+    if _campus_index is None:
+        _campus_index = _NameIndex(list(CAMPUS_LOCATIONS.items()))
+    return _campus_index
+
+def _database_names() -> _NameIndex:
+    """
+    Index over the location database names in LocationDatabase.get_coordinates
+    order (known locations, then buildings, landmarks and areas), rebuilt
+    after the database changes.
+    """
+    global _database_index_state
+    db = get_location_database()
+    if _database_index_state is None or _database_index_state[0] != db.revision:
+        entries = [(name, (data["lat"], data["lng"])) for name, data in db.known_locations.items()]
+        for collection in [db.buildings, db.landmarks, db.areas]:
+            for item in collection.values():
+                coords = item["coordinates"]
+                entries.append((item["name"], (coords["latitude"], coords["longitude"])))
+        _database_index_state = (db.revision, _NameIndex(entries))
+    return _database_index_state[1]
+
+def _campus_base(location_text: str) -> Optional[Tuple[float, float]]:
+    """Coordinates of the first campus landmark mentioned in the text."""
+    if not location_text:
+        return None
+    return _campus_names().first(location_text)
+
+def _database_base(location_text: str) -> Optional[Tuple[float, float]]:
+    """Coordinates of the location database entry named in the text."""
+    return _database_names().first(location_text)
+
+def _fuzzy_base(location_text: str) -> Optional[Tuple[float, float]]:
+    """Coordinates of the best partial match in the location database."""
+    # A database name anywhere in the text (this is what probing the text
+    # around location keywords such as "near" or "hall" used to find)
+    coords = _database_base(location_text)
+    if coords:
+        return coords
     
-    if best_match:
-        lat, lng = jitter_coordinates(best_match["lat"], best_match["lng"])
-        return {"lat": lat, "lng": lng}
+    # Otherwise the known location sharing the most informative words,
+    # from the database's token index
+    match = get_location_database().fuzzy_lookup(location_text)
+    if match:
+        return match["lat"], match["lng"]
     
     return None
 
+# Geocoding tiers, tried in order
+GEOCODING_TIERS = (
+    ("campus", _campus_base),
+    ("database", _database_base),
+    ("fuzzy", _fuzzy_base)
+)
+
 def jitter_coordinates(lat: float, lng: float, meters: int = 30) -> Tuple[float, float]:
     """
     Add a small random jitter to coordinates (up to specified meters) 
@@ -232,28 +306,70 @@ def find_locations_in_radius(lat: float, lng: float, radius_meters: float) -> Li
     db = get_location_database()
     return db.find_locations_in_radius(lat, lng, radius_meters)
 
-def batch_geocode(location_texts: List[str]) -> Dict[str, Dict[str, float]]:
+def batch_geocode(location_texts: List[str], remote: bool = False) -> Dict[str, Dict[str, float]]:
     """
     Geocode multiple locations at once.
     
+    Inputs are normalized and deduplicated, so each distinct location is
+    resolved once: from the geocode cache, else by the local tiers. With
+    remote=True, locations no local tier knows are sent to the Mistral
+    geocoding provider, whose batches run concurrently within the shared
+    LLM client's rate limits. Local lookups are never throttled.
+    
     Args:
         location_texts: List of location texts to geocode
+        remote: Whether to geocode unresolved locations with the LLM provider
         
     Returns:
-        Dictionary mapping location texts to coordinates
+        Dictionary mapping location texts to coordinates (jittered per text)
     """
-    results = {}
-    
+    # Normalize and deduplicate; keep the first spelling for the remote provider
+    keys: Dict[str, str] = {}
+    spellings: Dict[str, str] = {}
     for location_text in location_texts:
-        coordinates = geocode_location(location_text)
-        if coordinates:
-            results[location_text] = coordinates
-            
-            # Small delay to avoid overloading any services
-            time.sleep(0.1)
+        if location_text and location_text not in keys:
+            key = normalize_location_text(location_text)
+            keys[location_text] = key
+            spellings.setdefault(key, location_text)
+    
+    with span("geocode.batch", texts=len(location_texts), unique=len(spellings)) as batch_span:
+        bases = {key: resolve_location(key) for key in spellings}
+        
+        unresolved = [key for key, (base, _) in bases.items() if base is None]
+        batch_span.set_attribute("unresolved", len(unresolved))
+        if remote and unresolved:
+            bases.update(_remote_geocode([spellings[key] for key in unresolved]))
     
+    results = {}
+    for location_text, key in keys.items():
+        base, _ = bases[key]
+        results[location_text] = _jittered(base) if base is not None else get_default_coordinates()
     return results
 
+def _remote_geocode(location_texts: List[str]) -> Dict[str, Tuple[Optional[Tuple[float, float]], str]]:
+    """
+    Geocode locations with the Mistral provider and cache the answers.
+    
+    Returns:
+        Normalized text -> (base, tier) for each location the provider
+        placed; its San Diego fallback counts as unresolved
+    """
+    # Imported here: the provider pulls in the LLM client
+    from geocoding.providers.mistral import geocode_unknown_locations_with_mistral
+    
+    cache = get_geocode_cache()
+    generation = _cache_generation() if cache is not None else None
+    resolved = {}
+    for location_text, details in geocode_unknown_locations_with_mistral(location_texts).items():
+        base = (float(details["lat"]), float(details["lng"]))
+        if base == REMOTE_FALLBACK_COORDINATES:
+            continue
+        key = normalize_location_text(location_text)
+        resolved[key] = (base, REMOTE_TIER)
+        if cache is not None:
+            cache.put(key, base[0], base[1], REMOTE_TIER, generation)
+    return resolved
+
 # Example usage
 if __name__ == "__main__":
     # Set up logging
@@ -9,12 +9,266 @@ import json
 import os
 import logging
 import random
+import heapq
 import math
-from typing import Dict, Any, List, Optional, Tuple, Union
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple, Union
 import time
 
 logger = logging.getLogger(__name__)
 
+# Words that never identify a location on their own
+LOCATION_STOPWORDS = {
+    "a", "an", "the", "of", "and", "at", "in", "on", "by", "to", "from", "for", "near", "next",
+    "close", "across", "behind", "front", "outside", "inside", "around", "between", "off", "into"
+}
+
+# Abbreviations seen in reports, expanded before matching
+LOCATION_ABBREVIATIONS = {
+    "cyn": "canyon", "bldg": "building", "blg": "building", "ctr": "center", "cntr": "center",
+    "lib": "library", "apt": "apartment", "apts": "apartment", "hl": "hall", "lec": "lecture",
+    "st": "street", "dr": "drive", "ave": "avenue", "rd": "road", "blvd": "boulevard", "pkwy": "parkway",
+    "pkg": "parking", "univ": "university", "coll": "college", "sci": "science", "eng": "engineering",
+    "med": "medical", "hosp": "hospital", "rec": "recreation", "res": "residence", "mt": "mount"
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Version of the fuzzy matching rules; part of the geocode cache generation,
+# so results cached under older rules are resolved again
+MATCHER_VERSION = 2
+
+def normalize_token(token: str) -> str:
+    """
+    Expand known abbreviations ("cyn" -> "canyon") and fold simple plurals
+    so "apartments" and "apartment" share a token.
+    """
+    token = LOCATION_ABBREVIATIONS.get(token, token)
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def location_tokens(text: str) -> List[str]:
+    """
+    Normalized tokens of a location string: accents folded, lowercased,
+    split on non-alphanumerics, stopwords and single letters dropped.
+    """
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return [
+        normalize_token(token) for token in _TOKEN_RE.findall(folded)
+        if token not in LOCATION_STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions, so "giesel" is one edit from "geisel").
+    
+    Args:
+        a: First string
+        b: Second string
+        limit: Stop early once the distance must exceed this
+        
+    Returns:
+        The distance, or limit + 1 if it exceeds limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationTokenIndex:
+    """
+    Inverted index from location tokens to known location names and aliases.
+    
+    A lookup only visits the posting lists of the query's tokens, so its
+    cost depends on how many names share those tokens, not on the size of
+    the gazetteer. Candidates are scored by the IDF-weighted overlap of
+    their tokens with the query.
+    
+    Query tokens missing from the vocabulary are matched approximately: a
+    trigram index over the vocabulary proposes spellings, which are kept if
+    they are within a small edit distance ("prize" -> "price"). A corrected
+    token counts with its IDF scaled by its similarity.
+    """
+    
+    # Vocabulary candidates verified per misspelled token
+    MAX_SPELLING_CANDIDATES = 30
+    
+    # Tokens in more than this share of the names (and at least
+    # COMMON_TOKEN_MIN_NAMES of them) only rescore other candidates
+    COMMON_TOKEN_SHARE = 0.05
+    COMMON_TOKEN_MIN_NAMES = 50
+    
+    def __init__(self, locations: Dict[str, Dict[str, Any]]):
+        """
+        Build the index.
+        
+        Args:
+            locations: Mapping of location name to a dictionary with "lat",
+                "lng" and optionally "aliases"; earlier entries win ties
+        """
+        self.locations = locations
+        self.postings: Dict[str, List[str]] = defaultdict(list)
+        self._order: Dict[str, int] = {}
+        name_tokens: Dict[str, Set[str]] = {}
+        for position, name in enumerate(locations):
+            self._order[name] = position
+            name_tokens[name] = set(location_tokens(name))
+            tokens = set(name_tokens[name])
+            for alias in locations[name].get("aliases", []):
+                tokens.update(location_tokens(alias))
+            for token in tokens:
+                self.postings[token].append(name)
+        
+        count = len(locations)
+        self.idf = {token: math.log(1 + count / len(names)) for token, names in self.postings.items()}
+        self._weights = {name: sum(self.idf[token] for token in tokens) for name, tokens in name_tokens.items()}
+        self._common = {
+            token: set(names) for token, names in self.postings.items()
+            if len(names) > max(self.COMMON_TOKEN_MIN_NAMES, count * self.COMMON_TOKEN_SHARE)
+        }
+        
+        # Trigram index over the vocabulary, for misspelled query tokens
+        self._trigram_postings: Dict[str, List[str]] = defaultdict(list)
+        for token in self.postings:
+            if len(token) >= 3 and not token.isdigit():
+                for gram in _trigrams(token):
+                    self._trigram_postings[gram].append(token)
+        self._spellings: Dict[str, List[Tuple[str, float]]] = {}
+    
+    def spellings(self, token: str) -> List[Tuple[str, float]]:
+        """
+        Vocabulary tokens a query token may stand for.
+        
+        Args:
+            token: Normalized query token
+            
+        Returns:
+            (vocabulary token, similarity) pairs; the token itself with
+            similarity 1.0 if it is in the vocabulary
+        """
+        if token in self.postings:
+            return [(token, 1.0)]
+        if len(token) < 4 or token.isdigit():
+            # Too short to correct reliably
+            return []
+        cached = self._spellings.get(token)
+        if cached is not None:
+            return cached
+        
+        limit = 1 if len(token) <= 5 else 2
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in _trigrams(token):
+            for candidate in self._trigram_postings.get(gram, ()):
+                if abs(len(candidate) - len(token)) <= limit:
+                    shared[candidate] += 1
+        best = sorted(shared, key=lambda candidate: -shared[candidate])[:self.MAX_SPELLING_CANDIDATES]
+        
+        matches = []
+        for candidate in best:
+            distance = edit_distance(token, candidate, limit)
+            if distance <= limit:
+                matches.append((candidate, 1 - distance / max(len(token), len(candidate))))
+        if len(self._spellings) >= 10000:
+            self._spellings.clear()
+        self._spellings[token] = matches
+        return matches
+    
+    def candidates(self, tokens: Iterable[str]) -> Dict[str, Tuple[float, Set[str]]]:
+        """
+        Names sharing at least one (possibly corrected) token with the query.
+        
+        Common tokens ("hall", "center") only add weight to names reached
+        through a rarer token, unless the query has no rarer token, so a
+        lookup does not walk their long posting lists.
+        
+        Returns:
+            Name -> (IDF-weighted overlap, shared vocabulary tokens)
+        """
+        tokens = set(tokens)
+        spellings = {token: self.spellings(token) for token in tokens}
+        common = {token for token in tokens if all(spelling in self._common for spelling, _ in spellings[token])}
+        overlap: Dict[str, float] = defaultdict(float)
+        shared: Dict[str, Set[str]] = defaultdict(set)
+        
+        def add(token: str, restrict: Optional[Set[str]]) -> None:
+            # Best similarity per name over the spellings of this token
+            weights: Dict[str, Tuple[float, str]] = {}
+            for spelling, similarity in spellings[token]:
+                weight = self.idf[spelling] * similarity
+                names = self.postings[spelling] if restrict is None else self._common[spelling] & restrict
+                for name in names:
+                    if name not in weights or weight > weights[name][0]:
+                        weights[name] = (weight, spelling)
+            for name, (weight, spelling) in weights.items():
+                overlap[name] += weight
+                shared[name].add(spelling)
+        
+        for token in tokens - common:
+            add(token, None)
+        restrict = set(overlap) or None
+        for token in common:
+            add(token, restrict)
+        return {name: (overlap[name], shared[name]) for name in overlap}
+    
+    def search(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Ranked fuzzy matches for a location string.
+        
+        A candidate must share a token of at least three characters. The
+        highest IDF-weighted overlap ranks first, then the share of the
+        name's weight covered, then the earlier entry.
+        
+        Args:
+            text: Location text
+            limit: Maximum number of matches
+            
+        Returns:
+            Dictionaries with "name", "lat", "lng" and "score" (covered share
+            of the name, 0-1), best first
+        """
+        ranked = []
+        for name, (overlap, shared) in self.candidates(location_tokens(text)).items():
+            if not any(len(token) >= 3 for token in shared):
+                continue
+            coverage = min(1.0, overlap / self._weights[name]) if self._weights[name] else 0.0
+            ranked.append(((overlap, coverage, -self._order[name]), name))
+        
+        matches = []
+        for (_, coverage, _), name in heapq.nlargest(limit, ranked):
+            data = self.locations[name]
+            matches.append({"name": name, "lat": data["lat"], "lng": data["lng"], "score": round(coverage, 3)})
+        return matches
+    
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Best fuzzy match for a location string (see search()), or None if
+        nothing matches.
+        """
+        matches = self.search(text, limit=1)
+        return matches[0] if matches else None
+
+
 class LocationDatabase:
     """
     Campus location database for geocoding and spatial queries.
@@ -37,8 +291,14 @@ class LocationDatabase:
         self.areas: Dict[str, Dict[str, Any]] = {}
         self.known_locations: Dict[str, Dict[str, Any]] = {}
         
+        # Bumped on every change; see fingerprint()
+        self.revision = 0
+        self._fingerprint: Optional[Tuple[int, str]] = None
+        self.token_index: Optional[LocationTokenIndex] = None
+        
         # Load data
         self._load_data()
+        self.token_index = LocationTokenIndex(self.known_locations)
     
     def _load_data(self) -> None:
         """Load location data from storage."""
@@ -76,8 +336,29 @@ class LocationDatabase:
             # Use default known locations
             self._create_default_known_locations()
     
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the location data, e.g. to tell whether cached
+        geocoding results are still valid. Recomputed only after changes.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.revision:
+            document = json.dumps([self.known_locations, self.buildings, self.landmarks, self.areas],
+                                  sort_keys=True, default=str)
+            self._fingerprint = (self.revision, format(zlib.crc32(document.encode("utf-8")), "08x"))
+        return self._fingerprint[1]
+    
+    def fuzzy_lookup(self, location_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Best fuzzy match among the known locations (see LocationTokenIndex.lookup).
+        """
+        return self.token_index.lookup(location_text)
+    
     def _save_data(self) -> None:
         """Save location data to storage."""
+        self.revision += 1
+        if self.token_index is not None:
+            # Known locations changed
+            self.token_index = LocationTokenIndex(self.known_locations)
         if not self.storage_path:
             return
             
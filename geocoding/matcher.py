@@ -0,0 +1,438 @@
+"""
+matcher.py
+
+Multi-pattern location matching for free text.
+
+Builds an Aho-Corasick automaton over every name and alias in the campus
+gazetteer once, then finds all mentions in a single pass over the text.
+Matching cost is linear in the length of the text regardless of how many
+names the gazetteer contains.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Names that describe a whole region rather than a specific place. A mention of
+# one of these only wins when nothing more specific appears in the text.
+GENERIC_PLACE_NAMES = {
+    "uc san diego",
+    "uc san diego campus",
+    "ucsd",
+    "university of california san diego",
+    "la jolla",
+    "san diego",
+    "united states",
+    "campus"
+}
+
+# Gazetteer files matched in addition to the curated campus places
+GAZETTEER_PATHS = [
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "locations", "known_locations.json"),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "locations", "campus_buildings.json")
+]
+
+# Curated campus places with their common short names. They take precedence
+# over gazetteer entries sharing a name or alias.
+CAMPUS_PLACES = {
+    "Geisel Library": {"lat": 32.8810, "lng": -117.2370, "name": "Geisel Library", "aliases": ["Geisel"]},
+    "Price Center": {"lat": 32.8794, "lng": -117.2359, "name": "Price Center"},
+    "Warren College": {"lat": 32.8815, "lng": -117.2350, "name": "Warren College"},
+    "Warren Apartments": {"lat": 32.8825, "lng": -117.2355, "name": "Warren Apartments"},
+    "Warren Mall": {"lat": 32.8822, "lng": -117.2345, "name": "Warren Mall"},
+    "BCB Café": {"lat": 32.8820, "lng": -117.2350, "name": "BCB Café"},
+    "Sixth College": {"lat": 32.8806, "lng": -117.2325, "name": "Sixth College"},
+    "Muir College": {"lat": 32.8789, "lng": -117.2410, "name": "Muir College"},
+    "Revelle College": {"lat": 32.8745, "lng": -117.2410, "name": "Revelle College"},
+    "RIMAC Arena": {"lat": 32.8869, "lng": -117.2406, "name": "RIMAC Arena", "aliases": ["RIMAC"]},
+    "Library Walk": {"lat": 32.8794, "lng": -117.2370, "name": "Library Walk"},
+    "La Jolla": {"lat": 32.8328, "lng": -117.2712, "name": "La Jolla"},
+    "UC San Diego": {"lat": 32.8801, "lng": -117.2340, "name": "UC San Diego Campus", "aliases": ["UCSD"]},
+    "San Diego": {"lat": 32.7157, "lng": -117.1611, "name": "San Diego"}
+}
+
+# Gazetteer entries that carry no location information
+_IGNORED_NAMES = {"unknown", "various locations throughout the uc san diego campus"}
+
+_PARENTHETICAL_RE = re.compile(r"\(([^)]*)\)")
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton for finding every occurrence of many patterns in one scan.
+    Patterns are matched as plain substrings; callers lowercase both sides for
+    case-insensitive matching.
+    """
+
+    def __init__(self):
+        """Initialize an empty automaton."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+        self.max_pattern_length = 0
+
+    def add(self, pattern: str, payload: Any) -> None:
+        """
+        Add a pattern to the automaton.
+
+        Args:
+            pattern: Pattern text
+            payload: Value reported with each match of the pattern
+        """
+        if not pattern:
+            return
+
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+
+        self._out[state].append((len(pattern), payload))
+        self.max_pattern_length = max(self.max_pattern_length, len(pattern))
+        self._built = False
+
+    def build(self) -> None:
+        """Compute failure links. Called automatically before the first scan."""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                # Inherit the outputs of the longest proper suffix
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        self._built = True
+
+    def scan(self, text: str, state: int = 0, offset: int = 0) -> Tuple[List[Tuple[int, int, Any]], int]:
+        """
+        Find every pattern occurrence in text.
+
+        The returned state can be passed back in to continue matching across
+        consecutive chunks of a stream.
+
+        Args:
+            text: Text to scan
+            state: Automaton state to resume from
+            offset: Position of text[0] in the overall stream
+
+        Returns:
+            (matches, end_state) where matches are (start, end, payload) tuples
+        """
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        matches = []
+
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = offset + i + 1
+                for length, payload in out[state]:
+                    matches.append((end - length, end, payload))
+
+        return matches, state
+
+    def search(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Find every pattern occurrence in text."""
+        return self.scan(text)[0]
+
+
+def lower_preserving_length(text: str) -> str:
+    """
+    Lowercase text without changing its length, so match offsets map back
+    onto the original string.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch.lower()[:1] or ch for ch in text)
+
+
+def load_gazetteer(paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load and merge gazetteer files of the form {name: {"lat", "lng", "address"}}.
+
+    Args:
+        paths: JSON files to load; missing or invalid files are skipped
+
+    Returns:
+        Dictionary mapping location names to their data
+    """
+    gazetteer = {}
+    for path in paths:
+        if not os.path.exists(path):
+            logger.warning(f"Gazetteer file not found: {path}")
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading gazetteer {path}: {e}")
+            continue
+
+        for name, info in data.items():
+            if name not in gazetteer and info.get("lat") is not None and info.get("lng") is not None:
+                gazetteer[name] = info
+
+    return gazetteer
+
+
+def derive_aliases(name: str) -> List[str]:
+    """
+    Derive the surface forms under which a gazetteer name may be mentioned.
+
+    "Engineering Building Unit II (EBU II), UC San Diego" yields the full name,
+    "Engineering Building Unit II" and "EBU II".
+
+    Args:
+        name: Gazetteer name
+
+    Returns:
+        List of aliases, most specific first
+    """
+    candidates = [name]
+    first_part = name.split(",")[0]
+    candidates.append(first_part)
+    candidates.append(_PARENTHETICAL_RE.sub("", first_part))
+    candidates.extend(_PARENTHETICAL_RE.findall(first_part))
+
+    aliases = []
+    for alias in candidates:
+        alias = " ".join(alias.split())
+        if alias.lower().startswith("the "):
+            alias = alias[4:]
+        if len(alias) < 3 or not any(ch.isalpha() for ch in alias):
+            continue
+        if alias.lower() in _IGNORED_NAMES or alias in aliases:
+            continue
+        aliases.append(alias)
+
+    return aliases
+
+
+class LocationMatcher:
+    """
+    Finds mentions of known locations in free text.
+
+    Every name and alias is compiled into one automaton when the matcher is
+    created. Mentions must start and end on word boundaries. When several
+    locations are mentioned, specific places win over regional names such as
+    "UC San Diego", and longer mentions win over shorter ones.
+    """
+
+    def __init__(self, locations: Dict[str, Dict[str, Any]]):
+        """
+        Build the matcher.
+
+        Args:
+            locations: Mapping of location name to a dictionary with "lat", "lng"
+                and optionally "name" (display name) and "aliases". Earlier
+                entries take precedence when two entries share an alias.
+        """
+        self.locations = locations
+        self._automaton = AhoCorasick()
+        self._aliases: Dict[str, str] = {}
+
+        for key, info in locations.items():
+            aliases = derive_aliases(key) + list(info.get("aliases", []))
+            for alias in aliases:
+                lowered = lower_preserving_length(alias)
+                if lowered in self._aliases:
+                    continue
+                self._aliases[lowered] = key
+                self._automaton.add(lowered, key)
+
+        self._automaton.build()
+        logger.info(f"Built location matcher with {len(self._aliases)} names for {len(locations)} locations")
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def find_all(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Find every location mention in text.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            List of mentions sorted by position, each with "name", "text",
+            "start", "end", "lat", "lng" and "specific"
+        """
+        if not text:
+            return []
+
+        lowered = lower_preserving_length(text)
+        mentions = []
+        for start, end, key in self._automaton.search(lowered):
+            mention = self._mention(text, lowered, start, end, key)
+            if mention:
+                mentions.append(mention)
+
+        mentions.sort(key=lambda m: (m["start"], -(m["end"] - m["start"])))
+        return mentions
+
+    def _mention(self, text: str, lowered: str, start: int, end: int, key: str) -> Optional[Dict[str, Any]]:
+        """Build a mention for a raw match, or None if it is not on word boundaries."""
+        if start > 0 and lowered[start - 1].isalnum():
+            return None
+        if end < len(lowered) and lowered[end].isalnum():
+            return None
+
+        info = self.locations[key]
+        return {
+            "name": info.get("name", key),
+            "text": text[start:end],
+            "start": start,
+            "end": end,
+            "lat": info["lat"],
+            "lng": info["lng"],
+            "specific": not self.is_generic(key)
+        }
+
+    def stream(self) -> 'LocationStream':
+        """Start incremental matching over text that arrives in chunks."""
+        return LocationStream(self)
+
+    def best_match(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the most specific location mentioned in text.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            The preferred mention (see find_all), or None if nothing matched
+        """
+        return self.select_best(self.find_all(text))
+
+    @staticmethod
+    def select_best(mentions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Pick the preferred mention: specific first, then longest, then earliest."""
+        if not mentions:
+            return None
+        return min(mentions, key=lambda m: (not m["specific"], -(m["end"] - m["start"]), m["start"]))
+
+    def is_generic(self, key: str) -> bool:
+        """Check whether a location names a whole region rather than a place."""
+        info = self.locations[key]
+        names = {key.lower(), key.split(",")[0].strip().lower(), str(info.get("name", "")).lower()}
+        return bool(names & GENERIC_PLACE_NAMES)
+
+
+class LocationStream:
+    """
+    Incremental location matching for text that arrives in chunks, such as
+    a live call transcript. Only the new chunk is scanned each time; the
+    automaton resumes where the previous chunk ended.
+
+    A match ending exactly at the end of the text so far is reported right
+    away, since live transcripts are usually chunked at word boundaries. If
+    the next chunk continues the word ("RIMAC" + "s"), the mention is
+    retracted.
+    """
+
+    def __init__(self, matcher: LocationMatcher):
+        self._matcher = matcher
+        self._state = 0
+        self._lowered = ""
+        self._provisional: List[Dict[str, Any]] = []
+        self.text = ""
+        self.mentions: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Match the next chunk of text.
+
+        Args:
+            chunk: Text following everything fed so far
+
+        Returns:
+            Mentions found in this chunk (see LocationMatcher.find_all)
+        """
+        if not chunk:
+            return []
+
+        if self._provisional and chunk[0].isalnum():
+            retracted = set(id(m) for m in self._provisional)
+            self.mentions = [m for m in self.mentions if id(m) not in retracted]
+        self._provisional = []
+
+        offset = len(self.text)
+        lowered_chunk = lower_preserving_length(chunk)
+        self.text += chunk
+        self._lowered += lowered_chunk
+
+        matches, self._state = self._matcher._automaton.scan(lowered_chunk, self._state, offset)
+        new_mentions = []
+        for start, end, key in matches:
+            mention = self._matcher._mention(self.text, self._lowered, start, end, key)
+            if mention:
+                new_mentions.append(mention)
+                if end == len(self.text):
+                    self._provisional.append(mention)
+
+        self.mentions.extend(new_mentions)
+        self.mentions.sort(key=lambda m: (m["start"], -(m["end"] - m["start"])))
+        return new_mentions
+
+    def best_match(self) -> Optional[Dict[str, Any]]:
+        """The preferred mention in the text so far."""
+        return LocationMatcher.select_best(self.mentions)
+
+
+_location_matcher: Optional[LocationMatcher] = None
+_location_matcher_lock = threading.Lock()
+
+def get_location_matcher() -> LocationMatcher:
+    """
+    Matcher over the curated campus places and the gazetteer, shared by the
+    agent, the preprocessor, tiering and the mock LLM server. Built once, on
+    first use.
+    """
+    global _location_matcher
+    with _location_matcher_lock:
+        if _location_matcher is None:
+            locations = dict(CAMPUS_PLACES)
+            for name, info in load_gazetteer(GAZETTEER_PATHS).items():
+                locations.setdefault(name, info)
+            _location_matcher = LocationMatcher(locations)
+    return _location_matcher
+
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    matcher = get_location_matcher()
+
+    sample = "There's smoke coming out of York Hall, near Library Walk at UC San Diego."
+    for mention in matcher.find_all(sample):
+        print(f"- {mention['text']!r} [{mention['start']}:{mention['end']}] -> {mention['name']}")
+    print(f"Best match: {matcher.best_match(sample)['name']}")
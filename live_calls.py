@@ -0,0 +1,359 @@
+# live_calls.py
+"""
+Incremental processing of live emergency call transcripts.
+
+A LiveCallSession receives transcript chunks as they are transcribed. Each
+chunk is scanned once for locations, classification keywords and victim and
+suspect details, resuming the matchers where the previous chunk ended, and
+the running results are turned into partial EIDO updates. As soon as the
+call is critical enough and a location is known, the incident is
+correlated, stored and notified without waiting for the call to end. Later
+changes update that incident in place; the call remains a single report.
+"""
+
+import copy
+import logging
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from eido.eido_schema import generate_ulid, update_eido
+from eido.keyword_rules import get_keyword_scanner
+from safe_campus_agent import SUSPECT_DESCRIPTION_RE, VICTIM_COUNT_RE
+from tracing import span, trace
+
+logger = logging.getLogger(__name__)
+
+# Calls at or above this priority (1 is highest) alert before the call ends
+LIVE_ALERT_PRIORITY = 2
+
+# Characters before the new text that are searched again, so a pattern
+# split across chunks ("3 peo" + "ple") is still found
+PATTERN_OVERLAP = 32
+
+
+class FirstMatchStream:
+    """
+    First match of a pattern in text that grows chunk by chunk. Each feed
+    only searches the new text plus a short overlap; a match that runs to
+    the end of the text so far may still grow and is searched again.
+    """
+
+    def __init__(self, pattern: re.Pattern):
+        self.pattern = pattern
+        self.match: Optional[re.Match] = None
+        self._position = 0
+        self._final = False
+
+    def feed(self, text: str) -> bool:
+        """
+        Update the match for the text so far.
+
+        Args:
+            text: Everything received so far (the previous text plus new chunks)
+
+        Returns:
+            Whether the match changed
+        """
+        if self._final:
+            return False
+        match = self.pattern.search(text, self._position)
+        if match is None:
+            position = max(self._position, len(text) - PATTERN_OVERLAP)
+            while position > self._position and text[position - 1].isalnum():
+                # Do not resume in the middle of a word or number
+                position -= 1
+            self._position = position
+            return False
+        changed = self.match is None or self.match.group(0) != match.group(0)
+        self.match = match
+        self._position = match.start()
+        self._final = match.end() < len(text)
+        return changed
+
+
+
+class LiveCallSession:
+    """
+    Running state of one live call.
+    """
+
+    def __init__(self, agent, call_id: Optional[str] = None, alert_priority: int = LIVE_ALERT_PRIORITY):
+        """
+        Start a session.
+
+        Args:
+            agent: SafeCampusAgent providing matching, classification,
+                correlation, storage and notification planning
+            call_id: Call ID (generated if omitted)
+            alert_priority: Lowest priority (highest number) that alerts mid-call
+        """
+        self.agent = agent
+        self.call_id = call_id or f"CALL-{generate_ulid()}"
+        self.alert_priority = alert_priority
+
+        self._locations = agent.location_matcher.stream()
+        self._keywords = get_keyword_scanner().stream()
+        self._patterns = {pattern: FirstMatchStream(pattern) for pattern in (VICTIM_COUNT_RE, SUSPECT_DESCRIPTION_RE)}
+        self._lock = threading.Lock()
+
+        self.sequence = 0
+        self.started_at = time.perf_counter()
+        self.last_activity = time.monotonic()
+        self.location: Optional[Dict[str, Any]] = None
+        self.classification: Optional[Dict[str, Any]] = None
+        self.eido: Optional[Dict[str, Any]] = None
+        self.incident_id: Optional[str] = None
+        self.first_alert_ms: Optional[float] = None
+        self.finished = False
+
+    @property
+    def text(self) -> str:
+        """Transcript received so far."""
+        return self._locations.text
+
+    @property
+    def alerted(self) -> bool:
+        """Whether notifications have already been sent for this call."""
+        return self.incident_id is not None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """
+        Process the next transcript chunk.
+
+        Args:
+            chunk: Transcript text following everything fed so far
+
+        Returns:
+            Update with the new mentions and keywords, the changed fields as
+            update_eido-style partial updates, the current EIDO and, when
+            this chunk triggered notifications, the notification results
+        """
+        with self._lock:
+            if self.finished:
+                raise ValueError(f"Call {self.call_id} has already finished")
+
+            self.sequence += 1
+            self.last_activity = time.monotonic()
+
+            with trace() as chunk_trace:
+                with span("incremental_scan", chars=len(chunk)):
+                    new_mentions = self._locations.feed(chunk)
+                    new_keywords = self._keywords.feed(chunk)
+                    new_details = [pattern_stream.feed(self.text) for pattern_stream in self._patterns.values()]
+
+                eido_updates, notification_results = self._apply(bool(new_mentions or new_keywords or any(new_details)))
+
+            return {
+                "call_id": self.call_id,
+                "sequence": self.sequence,
+                "new_mentions": [{"name": m["name"], "text": m["text"], "start": m["start"], "end": m["end"]} for m in new_mentions],
+                "new_keywords": new_keywords,
+                "eido_updates": eido_updates,
+                "eido": copy.deepcopy(self.eido),
+                "alerted": self.alerted,
+                "notification_results": notification_results,
+                "time_to_first_alert_ms": self.first_alert_ms,
+                "timings": chunk_trace.timings()
+            }
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        End the call.
+
+        A call that never alerted goes through the regular pipeline with the
+        full transcript. A call that did has its final state folded into the
+        incident.
+
+        Returns:
+            Final results; for calls that never alerted, the results of
+            SafeCampusAgent.process_emergency_call
+        """
+        with self._lock:
+            if self.finished:
+                raise ValueError(f"Call {self.call_id} has already finished")
+            self.finished = True
+
+            if not self.alerted:
+                results = self.agent.process_emergency_call(self.text)
+                results["call_id"] = self.call_id
+                return results
+
+            with trace() as final_trace:
+                eido_updates, notification_results = self._apply(True)
+
+            return {
+                "call_id": self.call_id,
+                "incident_id": self.incident_id,
+                "eido": copy.deepcopy(self.eido),
+                "eido_updates": eido_updates,
+                "notification_results": notification_results,
+                "time_to_first_alert_ms": self.first_alert_ms,
+                "call_duration_ms": round((time.perf_counter() - self.started_at) * 1000, 3),
+                "timings": final_trace.timings()
+            }
+
+    def _apply(self, rescore: bool):
+        """
+        Recompute location and classification from the running scan state,
+        update the EIDO and notify if needed.
+
+        Returns:
+            (eido_updates, notification_results or None)
+        """
+        if not rescore and self.eido is not None:
+            return {}, None
+
+        agent = self.agent
+        with span("classification"):
+            location = agent._location_from_mentions(self._locations.mentions)
+            classification = agent._classify_incident(self.text, hits=self._keywords.hits(),
+                                                      first_match=lambda pattern: self._patterns[pattern].match)
+
+        with span("eido_generation"):
+            eido_updates = self._eido_updates(location, classification)
+            if self.eido is None:
+                self.eido = agent._generate_eido(self.text, location, classification)
+            elif eido_updates:
+                self.eido = update_eido(self.eido, eido_updates)
+                self.eido["eido"]["notification"] = agent._notification_recommendations(
+                    classification["incidentType"], classification["priority"]
+                )
+            self.eido["eido"]["incident"]["details"]["rawReport"] = self.text
+            self.location = location
+            self.classification = classification
+
+        notification_results = None
+        if not self.alerted:
+            if location.get("span") is not None and classification["priority"] <= self.alert_priority:
+                notification_results = self._alert(location)
+        elif eido_updates:
+            notification_results = self._update_incident()
+
+        return eido_updates, notification_results
+
+    def _eido_updates(self, location: Dict[str, Any], classification: Dict[str, Any]) -> Dict[str, Any]:
+        """Partial EIDO updates (update_eido format) for fields that changed."""
+        previous_location = self.location or {}
+        previous = self.classification or {}
+        updates: Dict[str, Any] = {}
+
+        if location["name"] != previous_location.get("name"):
+            updates["incident.location"] = {
+                "address": {"fullAddress": location["name"], "additionalInfo": ""},
+                "coordinates": {"latitude": location["lat"], "longitude": location["lng"]}
+            }
+        if classification["incidentType"] != previous.get("incidentType"):
+            updates["incidentType"] = classification["incidentType"]
+        if classification["subtype"] != previous.get("subtype"):
+            updates["incidentSubType"] = classification["subtype"]
+        if classification["priority"] != previous.get("priority"):
+            updates["priority"] = classification["priority"]
+        if classification["victimCount"] != previous.get("victimCount"):
+            updates["incident.details.victims"] = {
+                "count": classification["victimCount"],
+                "details": classification["victimDetails"]
+            }
+        if (classification["suspectInfo"], classification["weaponsInvolved"]) != \
+                (previous.get("suspectInfo"), previous.get("weaponsInvolved")):
+            updates["incident.details.suspects"] = {
+                "description": classification["suspectInfo"],
+                "weaponsInvolved": classification["weaponsInvolved"]
+            }
+        if classification["keyDetails"] != previous.get("keyDetails"):
+            updates["incident.details.keyFacts"] = classification["keyDetails"]
+        if updates:
+            updates["incident.details.description"] = (
+                f"Reported {classification['incidentType']} incident at {location['name']}. "
+                f"Priority assessed as {classification['priority']}/5."
+            )
+        return updates
+
+    def _alert(self, location: Dict[str, Any]) -> Dict[str, Any]:
+        """Correlate, store and notify the incident for the first time."""
+        agent = self.agent
+        with span("correlation"):
+            eido, correlation = agent._correlate_incident(self.eido, location)
+        with span("persistence"):
+            agent.incident_store.save(eido)
+
+        self.eido = eido
+        self.incident_id = correlation["incident_id"]
+        self.first_alert_ms = round((time.perf_counter() - self.started_at) * 1000, 3)
+        logger.info(f"Live call {self.call_id} alerted for {self.incident_id} after {self.first_alert_ms:.0f}ms")
+
+        if not correlation["notify"]:
+            return agent._suppressed_notification_results(eido, correlation)
+        with span("notification_planning"):
+            return agent._generate_notification_plan(eido)
+
+    def _update_incident(self) -> Optional[Dict[str, Any]]:
+        """
+        Merge the call's latest state into its incident; notify on material
+        change. The call stays one report however many chunks change it.
+        """
+        agent = self.agent
+        record = agent.incident_registry.get(self.incident_id)
+        if record is None:
+            # The incident aged out of the registry; treat the call as new
+            self.incident_id = None
+            return self._alert(self.location)
+
+        with span("correlation"):
+            changes = agent.incident_registry.update(record, self.eido)
+        self.eido = copy.deepcopy(record.eido)
+        with span("persistence"):
+            agent.incident_store.save(self.eido)
+
+        if not changes:
+            return None
+        with span("notification_planning"):
+            return agent._generate_notification_plan(self.eido)
+
+
+class LiveCallManager:
+    """
+    Tracks the live call sessions of an agent. Sessions idle for longer than
+    the timeout are dropped.
+    """
+
+    def __init__(self, agent, idle_timeout_seconds: float = 900):
+        self.agent = agent
+        self.idle_timeout = idle_timeout_seconds
+        self._sessions: Dict[str, LiveCallSession] = {}
+        self._lock = threading.Lock()
+
+    def start(self, call_id: Optional[str] = None) -> LiveCallSession:
+        """Start a new session."""
+        session = self.agent.start_live_call(call_id)
+        with self._lock:
+            self._expire()
+            if session.call_id in self._sessions:
+                raise ValueError(f"Call {session.call_id} is already in progress")
+            self._sessions[session.call_id] = session
+        return session
+
+    def get(self, call_id: str) -> Optional[LiveCallSession]:
+        """Get an active session."""
+        with self._lock:
+            self._expire()
+            return self._sessions.get(call_id)
+
+    def finish(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Finish and forget a session; None if the call is unknown."""
+        with self._lock:
+            session = self._sessions.pop(call_id, None)
+        return session.finish() if session else None
+
+    def active_calls(self) -> List[str]:
+        """IDs of the active sessions."""
+        with self._lock:
+            self._expire()
+            return list(self._sessions)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for call_id in [c for c, s in self._sessions.items() if now - s.last_activity > self.idle_timeout]:
+            logger.info(f"Dropping idle live call {call_id}")
+            del self._sessions[call_id]
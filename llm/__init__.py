@@ -0,0 +1 @@
+# LLM client utilities package
@@ -0,0 +1,278 @@
+"""
+cache.py
+
+Persistent, content-addressed cache of LLM responses.
+
+Responses are stored in SQLite, keyed by a hash of the model, the messages
+and any extra completion arguments, so identical prompts from any call site
+(geocoding batches, call extraction, report classification) share entries
+across processes and restarts. Entries expire after a TTL, and the least
+recently used entries are evicted once the cache holds more than
+max_entries.
+
+Modes (LLM_CACHE, see env.example):
+
+- "off" (default): no cache. Emergency extraction and report classification
+  must see every new call, so caching is opt-in for development and
+  benchmarks rather than on in production
+- "on": read through the cache and store new responses
+- "replay": answer only from the cache and fail on a miss without touching
+  the network, so a recorded run can be replayed deterministically (e.g. for
+  benchmarks)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cache mode, location and bounds (see env.example)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE", "off").lower()
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "llm_cache.db")
+)
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+CACHE_MODES = ("on", "off", "replay")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0,
+    response   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used);
+"""
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+    """
+    Content address of a completion request.
+
+    Args:
+        model: Model name
+        messages: Chat messages
+        **kwargs: Extra completion arguments (e.g. temperature)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    document = json.dumps({"model": model, "messages": messages, "kwargs": kwargs},
+                          sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed LLM response cache. Safe to share between threads.
+    """
+
+    def __init__(self,
+                 path: str = LLM_CACHE_PATH,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 replay: bool = False):
+        """
+        Open (and if needed create) the cache.
+
+        Args:
+            path: Database file, or ":memory:" for a transient cache
+            ttl_seconds: Age after which an entry is ignored and removed
+                (0 for no expiry)
+            max_entries: Number of entries kept; least recently used entries
+                beyond it are evicted
+            replay: Replay-only mode; entries never expire and nothing is
+                written
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.replay = replay
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evictions": 0}
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Cached response for a key.
+
+        Args:
+            key: Key from cache_key()
+
+        Returns:
+            The response, or None if missing or expired
+
+        Raises:
+            CacheMissError: On a miss in replay mode
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and not self.replay and self.ttl_seconds > 0 and now - row[0] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._count -= 1
+                self.stats["expired"] += 1
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                if self.replay:
+                    raise CacheMissError(f"No cached LLM response for {key[:12]} in replay mode")
+                return None
+            if not self.replay:
+                self._conn.execute(
+                    "UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+                )
+            self.stats["hits"] += 1
+            return row[1]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """
+        Store a response, evicting least recently used entries if the cache
+        is full. Ignored in replay mode.
+
+        Args:
+            key: Key from cache_key()
+            model: Model name (kept for inspection)
+            response: Response content
+        """
+        if self.replay:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            exists = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                """
+                INSERT INTO llm_cache (key, model, created_at, last_used, hits, response)
+                VALUES (?, ?, ?, ?, 0, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    created_at = excluded.created_at,
+                    last_used = excluded.last_used,
+                    response = excluded.response
+                """,
+                (key, model, now, now, response)
+            )
+            if not exists:
+                self._count += 1
+            self.stats["writes"] += 1
+            if self.max_entries > 0 and self._count > self.max_entries:
+                excess = self._count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= excess
+                self.stats["evictions"] += excess
+
+    def invalidate(self, key: str) -> None:
+        """Remove an entry, e.g. a response the caller could not parse."""
+        if self.replay:
+            return
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._count -= cursor.rowcount
+
+    def prune(self) -> int:
+        """
+        Remove expired entries.
+
+        Returns:
+            Number of entries removed
+        """
+        if self.ttl_seconds <= 0:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._count -= cursor.rowcount
+            self.stats["expired"] += cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._count = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """Entry count, size bound, mode and hit statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "mode": "replay" if self.replay else "on",
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else None,
+            **self.stats
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Process-wide cache for the configured LLM_CACHE mode, or None if the
+    cache is off.
+
+    Raises:
+        ValueError: If LLM_CACHE is not a known mode
+    """
+    global _cache
+    if LLM_CACHE_MODE not in CACHE_MODES:
+        raise ValueError(f"Unknown LLM_CACHE mode {LLM_CACHE_MODE!r}; expected one of {', '.join(CACHE_MODES)}")
+    if LLM_CACHE_MODE == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(replay=LLM_CACHE_MODE == "replay")
+        return _cache
+
+
+if __name__ == "__main__":
+    # python -m llm.cache [stats|prune|clear]
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = LLMCache()
+    if command == "prune":
+        print(f"Removed {cache.prune()} expired entries")
+    elif command == "clear":
+        cache.clear()
+        print("Cleared LLM cache")
+    print(json.dumps(cache.summary(), indent=2))
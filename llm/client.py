@@ -0,0 +1,406 @@
+"""
+client.py
+
+Process-wide async client for the Mistral chat API.
+
+Every LLM call site shares one client per API key. The client owns a
+background event loop thread, so synchronous callers (thread-pool stages,
+the deadline racer) and async callers share the same:
+
+- HTTP connection pool with keep-alive, so calls reuse TLS connections
+- concurrency semaphore, bounding in-flight requests across the process
+- token-bucket rate limiter, smoothing bursts under the provider's limit
+- retries with exponential backoff and full jitter for transient failures
+  (connection errors, timeouts, 429 and 5xx responses)
+- persistent response cache (see cache.py); cache hits never reach the
+  network, and in replay mode nothing does
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional
+
+from llm.cache import LLMCache, cache_key, get_llm_cache
+from llm.deadline import remaining_budget
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "mistral-large-latest"
+
+# Process-wide limits (see env.example)
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "5"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+
+# Alternative API endpoint, e.g. the local mock server (see mock_server.py)
+SERVER_URL = os.getenv("MISTRAL_SERVER_URL") or None
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for coroutines on a single event loop.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; each
+    request takes one token and waits if none is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket (full).
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until `tokens` are available and take them."""
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter for a 0-based retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an API error is transient and worth retrying."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class LLMClient:
+    """
+    Shared async Mistral chat client.
+
+    Use chat() and stream_chat() from synchronous code, and chat_async() and
+    stream_chat_async() from coroutines running on the client's loop (e.g.
+    inside run()).
+    """
+
+    def __init__(self,
+                 api_key: str,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 requests_per_second: float = REQUESTS_PER_SECOND,
+                 max_retries: int = MAX_RETRIES,
+                 timeout_seconds: float = REQUEST_TIMEOUT_SECONDS,
+                 cache: Optional[LLMCache] = None,
+                 server_url: Optional[str] = SERVER_URL):
+        """
+        Initialize the client. The event loop and connections are created on
+        first use.
+
+        Args:
+            api_key: Mistral API key
+            max_concurrency: Maximum in-flight requests
+            requests_per_second: Sustained request rate (0 disables limiting)
+            max_retries: Retries after the first attempt for transient failures
+            timeout_seconds: Per-attempt HTTP timeout
+            cache: Response cache (defaults to the shared cache for the
+                LLM_CACHE mode; None there means no caching)
+            server_url: API endpoint (None for Mistral's)
+        """
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        self.server_url = server_url
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "cache_hits": 0}
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._http = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop thread if needed."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-client", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _ensure_client(self):
+        """Create the SDK client and limiters; runs on the client's loop."""
+        if self._client is None:
+            # Deferred import: the Mistral SDK is slow to import and only needed here
+            import httpx
+            from mistralai import Mistral
+
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+            options = {"server_url": self.server_url} if self.server_url else {}
+            self._client = Mistral(api_key=self.api_key, async_client=self._http, **options)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.requests_per_second, capacity=max(1.0, self.requests_per_second * 2))
+        return self._client
+
+    def _cached(self, key: Optional[str], refresh_cache: bool) -> Optional[str]:
+        """Cached response for a request key, if any (raises CacheMissError in replay mode)."""
+        if key is None or (refresh_cache and not self.cache.replay):
+            return None
+        content = self.cache.get(key)
+        if content is not None:
+            self.stats["cache_hits"] += 1
+        return content
+
+    async def chat_async(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL,
+                         refresh_cache: bool = False, **kwargs: Any) -> str:
+        """
+        Send a chat completion request and return the message content.
+
+        Must run on the client's loop (see run()).
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            refresh_cache: Skip the cached response (if any) and replace it,
+                e.g. when retrying after a malformed answer
+            **kwargs: Extra arguments for the completion API
+
+        Returns:
+            Content of the first choice
+
+        Raises:
+            CacheMissError: If the response is not cached in replay mode
+            Exception: The last error once retries are exhausted, or the first
+                non-retryable error
+        """
+        key = cache_key(model, messages, **kwargs) if self.cache is not None else None
+        cached = self._cached(key, refresh_cache)
+        if cached is not None:
+            return cached
+
+        client = self._ensure_client()
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                self.stats["requests"] += 1
+                try:
+                    response = await client.chat.complete_async(model=model, messages=messages, **kwargs)
+                    if not response or not response.choices:
+                        raise ValueError("No completion choices returned.")
+                    content = response.choices[0].message.content
+                    if key is not None:
+                        self.cache.put(key, model, content)
+                    return content
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        self.stats["failures"] += 1
+                        raise
+                    error = e
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.warning(f"LLM request failed ({error}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def stream_chat_async(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL,
+                                refresh_cache: bool = False, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+
+        Must run on the client's loop. Transient failures are retried only
+        until the first delta has been yielded; after that they propagate.
+        A cached response is yielded as a single delta, and a completed
+        stream is cached under the same key as chat_async() uses.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            refresh_cache: Skip the cached response (if any) and replace it
+            **kwargs: Extra arguments for the completion API
+        """
+        key = cache_key(model, messages, **kwargs) if self.cache is not None else None
+        cached = self._cached(key, refresh_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        client = self._ensure_client()
+        attempt = 0
+        while True:
+            yielded = False
+            parts = []
+            await self._bucket.acquire()
+            async with self._semaphore:
+                self.stats["requests"] += 1
+                try:
+                    stream = await client.chat.stream_async(model=model, messages=messages, **kwargs)
+                    async for event in stream:
+                        choices = event.data.choices
+                        delta = choices[0].delta.content if choices else None
+                        if delta:
+                            yielded = True
+                            parts.append(delta)
+                            yield delta
+                    if key is not None:
+                        self.cache.put(key, model, "".join(parts))
+                    return
+                except Exception as e:
+                    if yielded or attempt >= self.max_retries or not is_retryable(e):
+                        self.stats["failures"] += 1
+                        raise
+                    error = e
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.warning(f"LLM stream failed ({error}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def invalidate(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL, **kwargs: Any) -> None:
+        """Drop the cached response of a request, e.g. one the caller could not parse."""
+        if self.cache is not None:
+            self.cache.invalidate(cache_key(model, messages, **kwargs))
+
+    def run(self, coroutine: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the client's loop and wait for its result.
+
+        Args:
+            coroutine: Coroutine to run (may await chat_async() concurrently)
+            timeout: Seconds to wait (None for the remaining budget of the
+                enclosing call_with_deadline, if any, else no limit)
+
+        Returns:
+            The coroutine's result
+
+        Raises:
+            concurrent.futures.TimeoutError: If the timeout passes; the
+                coroutine is cancelled
+        """
+        if timeout is None:
+            timeout = remaining_budget()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def chat(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL, **kwargs: Any) -> str:
+        """
+        Synchronous chat completion (see chat_async()).
+
+        Returns:
+            Content of the first choice
+        """
+        with span("llm.chat", model=model):
+            return self.run(self.chat_async(messages, model=model, **kwargs))
+
+    def stream_chat(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL, **kwargs: Any) -> Iterator[str]:
+        """
+        Synchronous streaming chat completion (see stream_chat_async()).
+
+        Closing the iterator early cancels the request, and so does running
+        out of the budget of an enclosing call_with_deadline.
+
+        Yields:
+            Content deltas
+
+        Raises:
+            TimeoutError: If the budget runs out before the stream ends
+        """
+        deltas: "queue.Queue[Any]" = queue.Queue()
+        done = object()
+
+        async def pump() -> None:
+            try:
+                async for delta in self.stream_chat_async(messages, model=model, **kwargs):
+                    deltas.put(delta)
+            except Exception as e:
+                deltas.put(e)
+            finally:
+                deltas.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._ensure_loop())
+        try:
+            while True:
+                budget = remaining_budget()
+                try:
+                    item = deltas.get(timeout=budget)
+                except queue.Empty:
+                    raise TimeoutError("LLM stream exceeded its time budget") from None
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def close(self) -> None:
+        """Close the connection pool and stop the loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(5)
+        self._client = self._http = self._semaphore = self._bucket = None
+
+
+_clients: Dict[str, LLMClient] = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(api_key: Optional[str] = None) -> LLMClient:
+    """
+    Shared client for an API key (defaults to MISTRAL_API_KEY).
+
+    Raises:
+        ValueError: If no API key is available
+    """
+    api_key = api_key or os.environ.get("MISTRAL_API_KEY")
+    if not api_key:
+        raise ValueError("Mistral API key is required. Set MISTRAL_API_KEY environment variable or pass as argument.")
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = LLMClient(api_key)
+        return client
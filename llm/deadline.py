@@ -0,0 +1,142 @@
+"""
+deadline.py
+
+Deadline-bounded LLM calls.
+
+The LLM call runs in a thread pool of its own while the caller computes the
+rule-based fallback. The pool is separate from the pipeline pool so callers
+running on pipeline threads never queue their LLM calls behind themselves.
+The caller then waits for the LLM only until the deadline. If the LLM has
+not answered by then (or fails), the fallback result is returned
+immediately; an answer that lands later is handed to an optional callback so
+the caller can upgrade what it already returned.
+
+The LLM call itself is bounded too: LLMClient reads remaining_budget() and
+gives up (cancelling the request) once the deadline plus a grace period for
+late results has passed, so calls abandoned against a slow API free their
+worker instead of holding it for the whole retry schedule.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Default time budget for an LLM call, in seconds
+DEFAULT_LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "8"))
+
+# Threads waiting on LLM calls (see env.example)
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "32"))
+
+# Time an LLM call may keep running after its deadline, so a late answer
+# can still upgrade the result (see env.example)
+LLM_LATE_RESULT_GRACE_SECONDS = float(os.getenv("LLM_LATE_RESULT_GRACE_SECONDS", "10"))
+
+# perf_counter() time at which the current deadline-bounded call is given up
+_budget_expires_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "llm_budget_expires_at", default=None
+)
+
+
+@dataclass
+class RaceResult:
+    """Outcome of a deadline-bounded call."""
+    value: Any
+    source: str  # "llm" or "fallback"
+    elapsed_ms: float
+    timed_out: bool = False
+    error: Optional[str] = None
+    pending: Optional[Future] = None  # The still-running LLM call after a timeout
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for deadline-bounded LLM calls."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_EXECUTOR_WORKERS, thread_name_prefix="llm")
+    return _executor
+
+
+def remaining_budget() -> Optional[float]:
+    """
+    Seconds the current LLM call may still run, or None outside
+    call_with_deadline (no limit).
+    """
+    expires_at = _budget_expires_at.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.perf_counter())
+
+
+def call_with_deadline(primary: Callable[[], Any],
+                       fallback: Callable[[], Any],
+                       deadline_seconds: Optional[float] = None,
+                       on_late_result: Optional[Callable[[Any], None]] = None,
+                       executor: Optional[ThreadPoolExecutor] = None) -> RaceResult:
+    """
+    Race an LLM call against its fallback.
+
+    Args:
+        primary: The LLM call; may raise
+        fallback: Cheap fallback producing a result of the same shape
+        deadline_seconds: Time budget for the primary (defaults to
+            DEFAULT_LLM_DEADLINE_SECONDS; None or <= 0 also means the default)
+        on_late_result: Called with the primary's result if it succeeds after
+            the deadline has passed
+        executor: Thread pool for the primary (defaults to the LLM pool)
+
+    The primary runs with a budget of the deadline plus
+    LLM_LATE_RESULT_GRACE_SECONDS (see remaining_budget()).
+
+    Returns:
+        RaceResult with the primary's value if it answered in time, else the
+        fallback's
+    """
+    deadline = deadline_seconds if deadline_seconds and deadline_seconds > 0 else DEFAULT_LLM_DEADLINE_SECONDS
+    start = time.perf_counter()
+    context = contextvars.copy_context()
+    context.run(_budget_expires_at.set, start + deadline + LLM_LATE_RESULT_GRACE_SECONDS)
+    future = (executor or get_llm_executor()).submit(context.run, primary)
+
+    # Compute the fallback while the LLM call is in flight
+    with span("llm.fallback"):
+        fallback_value = fallback()
+
+    remaining = deadline - (time.perf_counter() - start)
+    try:
+        value = future.result(timeout=max(0.0, remaining))
+        return RaceResult(value, "llm", _elapsed_ms(start))
+    except FutureTimeoutError:
+        logger.warning(f"LLM call exceeded its {deadline:.1f}s deadline; using fallback result")
+        if on_late_result is not None:
+            future.add_done_callback(lambda f: _deliver_late_result(f, on_late_result))
+        return RaceResult(fallback_value, "fallback", _elapsed_ms(start), timed_out=True, pending=future)
+    except Exception as e:
+        logger.warning(f"LLM call failed ({e}); using fallback result")
+        return RaceResult(fallback_value, "fallback", _elapsed_ms(start), error=f"{type(e).__name__}: {e}")
+
+
+def _deliver_late_result(future: Future, callback: Callable[[Any], None]) -> None:
+    """Hand a late LLM result to the caller's callback."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        callback(future.result())
+    except Exception as e:
+        logger.error(f"Late LLM result callback failed: {e}")
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
@@ -0,0 +1,487 @@
+"""
+mock_server.py
+
+Local stand-in for the Mistral chat completions API, for load and
+throughput testing without API quota.
+
+The server speaks the protocol the mistralai client uses
+(POST /v1/chat/completions, with server-sent events when "stream" is set)
+and answers the prompts of this repository with rule-generated JSON:
+
+- call extraction (EmergencyCallProcessor): keyword rules and gazetteer
+- report classification, single and batched (ReportClassifier)
+- location geocoding (geocoding provider and eido.location_extractor)
+
+Other prompts get a short plain answer. Canned responses can override any
+prompt by substring. Latency (fixed, uniform, normal or lognormal), random
+server errors, random 429s and a hard request rate limit are configurable,
+so client retries and backoff are exercised too.
+
+Run it with:
+
+    python -m llm.mock_server --port 8765 --latency-ms 800 --jitter-ms 300
+
+and point the processors at it with MISTRAL_SERVER_URL=http://127.0.0.1:8765
+(any MISTRAL_API_KEY value is accepted). GET /stats returns request counts.
+"""
+
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+
+# Coordinates used for locations the gazetteer does not know
+CAMPUS_CENTER = (32.8801, -117.2340)
+UCSD_ADDRESS = "9500 Gilman Dr, La Jolla, CA 92093"
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+@dataclass
+class MockConfig:
+    """Behavior of the mock server."""
+    latency_ms: float = 500.0
+    jitter_ms: float = 200.0  # Spread of the latency distribution
+    distribution: str = "normal"
+    error_rate: float = 0.0  # Share of requests answered with a 500
+    rate_limit_rate: float = 0.0  # Share of requests answered with a 429
+    requests_per_second: float = 0.0  # Hard rate limit (0 for none); excess requests get a 429
+    stream_chunk_chars: int = 16
+    stream_chunk_delay_ms: float = 20.0
+    seed: Optional[int] = None
+    # (substring of the last user message, response content) pairs checked before the rules
+    canned: List[Tuple[str, str]] = field(default_factory=list)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Latency of one response, in seconds."""
+        if self.distribution == "fixed" or self.jitter_ms <= 0:
+            latency = self.latency_ms
+        elif self.distribution == "uniform":
+            latency = rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.distribution == "lognormal":
+            # Median latency_ms with a long tail; jitter_ms sets the spread
+            sigma = math.log1p(self.jitter_ms / max(self.latency_ms, 1.0))
+            latency = self.latency_ms * rng.lognormvariate(0.0, sigma)
+        else:
+            latency = rng.gauss(self.latency_ms, self.jitter_ms)
+        return max(0.0, latency) / 1000
+
+
+class MockResponder:
+    """
+    Generates answers for the prompts used in this repository.
+    """
+
+    def __init__(self, canned: Optional[List[Tuple[str, str]]] = None):
+        """
+        Initialize the responder. Keyword rules and the gazetteer are loaded
+        on first use.
+
+        Args:
+            canned: (substring, content) pairs answered verbatim
+        """
+        self.canned = canned or []
+        self._scanner = None
+        self._matcher = None
+
+    @property
+    def scanner(self):
+        if self._scanner is None:
+            from eido.keyword_rules import get_keyword_scanner
+            self._scanner = get_keyword_scanner()
+        return self._scanner
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            from geocoding.matcher import get_location_matcher
+            self._matcher = get_location_matcher()
+        return self._matcher
+
+    def respond(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Answer a chat request.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            Response content
+        """
+        prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        for needle, content in self.canned:
+            if needle in prompt:
+                return content
+
+        if "LOCATIONS TO GEOCODE:" in prompt:
+            answer: Any = self._geocode(prompt)
+        elif "TRANSCRIPT:" in prompt:
+            answer = self._extract_call(self._section(prompt, "TRANSCRIPT:", "Extract and return"))
+        elif "REPORT 1:" in prompt:
+            answer = self._classify_batch(prompt)
+        elif "REPORT TEXT:" in prompt:
+            answer = self._classify_report(self._section(prompt, "REPORT TEXT:", "Extract and return"))
+        else:
+            return "OK"
+        return "```json\n" + json.dumps(answer, indent=2) + "\n```"
+
+    def _section(self, prompt: str, start: str, end: str) -> str:
+        text = prompt.split(start, 1)[1]
+        return text.split(end, 1)[0].strip() if end in text else text.strip()
+
+    def _location(self, text: str) -> Tuple[str, str]:
+        """(location, details) mentioned in text."""
+        mention = self.matcher.best_match(text)
+        if mention and mention["specific"]:
+            return mention["name"], mention["text"]
+        match = re.search(r"^\s*Location:\s*([^,\n]+),?\s*(.*)$", text, re.M | re.I)
+        if match:
+            return match.group(1).strip(), match.group(2).strip()
+        match = re.search(r"\b(?:at|in|near)\s+(?:the\s+)?([A-Z][\w'&-]*(?:\s+[A-Z0-9][\w'&-]*)*)", text)
+        if match:
+            return match.group(1), ""
+        if mention:
+            return mention["name"], mention["text"]
+        return "Unknown location", ""
+
+    def _key_details(self, text: str) -> List[str]:
+        """Up to three sentences with the most keyword hits."""
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n", text) if s.strip()]
+        scored = []
+        for position, sentence in enumerate(sentences):
+            hits = self.scanner.scan(sentence)
+            score = sum(hits.matched(rule_set) for rule_set in
+                        ("call.incident_type", "report.incident_type", "weapons", "agent.victims"))
+            scored.append((-score, position, re.sub(r"^[A-Z][\w .'-]{0,30}:\s+", "", sentence)))
+        return [sentence for _, _, sentence in sorted(scored)[:3]]
+
+    def _extract_call(self, transcript: str) -> Dict[str, Any]:
+        hits = self.scanner.scan(transcript)
+        type_rule = hits.first("call.incident_type")
+        priority_rule = hits.first("call.priority")
+        priority = priority_rule["label"] if priority_rule else (2 if type_rule and type_rule["label"] == "fire" else 3)
+        location, details = self._location(transcript)
+        key_details = self._key_details(transcript)
+        caller_lines = [line.split(":", 1)[1].strip() for line in transcript.splitlines()
+                        if line.strip().lower().startswith("caller:")]
+        return {
+            "incident_type": type_rule["label"] if type_rule else "unknown",
+            "priority": priority,
+            "location": location,
+            "immediate_danger": priority <= 2,
+            "weapons_involved": hits.matched("weapons"),
+            "incident_subtype": "",
+            "location_details": details,
+            "reporter_info": "Caller",
+            "victim_count": 1 if hits.matched("agent.victims") else 0,
+            "victim_details": "",
+            "suspect_info": "",
+            "key_details": key_details,
+            "recommended_response": "Dispatch appropriate emergency services",
+            "quote": caller_lines[0] if caller_lines else (key_details[0] if key_details else "")
+        }
+
+    def _classify_report(self, report_text: str) -> Dict[str, Any]:
+        hits = self.scanner.scan(report_text)
+        type_rule = hits.first("report.incident_type")
+        severity_rule = hits.first("report.severity")
+        severity = severity_rule["label"] if severity_rule else 3
+        ongoing = not hits.matched("report.resolved")
+        location, details = self._location(report_text)
+        return {
+            "incident_type": type_rule["label"] if type_rule else "unknown",
+            "incident_subtype": "",
+            "severity": severity,
+            "location": location,
+            "location_details": details,
+            "time_occurred": "",
+            "time_reported": "",
+            "ongoing": ongoing,
+            "affected_area_size": 100 * severity,
+            "immediate_danger": ongoing and severity >= 4,
+            "evacuate": ongoing and severity >= 5,
+            "shelter_in_place": ongoing and hits.matched("weapons"),
+            "key_details": self._key_details(report_text),
+            "recommended_response": "Notify campus security"
+        }
+
+    def _classify_batch(self, prompt: str) -> List[Dict[str, Any]]:
+        reports = re.findall(r"REPORT (\d+):\n(.*?)(?=\n\s*REPORT \d+:\n|\n\s*Return ONLY|\Z)", prompt, re.S)
+        return [{"report_number": int(number), **self._classify_report(text)} for number, text in reports]
+
+    def _geocode(self, prompt: str) -> List[Dict[str, Any]]:
+        section = prompt.split("LOCATIONS TO GEOCODE:", 1)[1]
+        results = []
+        for location in re.findall(r"^\s*\d+\.\s+(.+?)\s*$", section, re.M):
+            mention = self.matcher.best_match(location)
+            if mention and mention["specific"]:
+                name, lat, lng = mention["name"], mention["lat"], mention["lng"]
+            else:
+                # Deterministic spot near campus for unknown places
+                offset = zlib.crc32(location.encode("utf-8"))
+                name = location.split(",")[0]
+                lat = CAMPUS_CENTER[0] + ((offset & 0xFFFF) / 0xFFFF - 0.5) * 0.01
+                lng = CAMPUS_CENTER[1] + ((offset >> 16) / 0xFFFF - 0.5) * 0.01
+            results.append({
+                "location": location,
+                "name": name,
+                "address": f"{name}, {UCSD_ADDRESS}",
+                "lat": round(lat, 6),
+                "lng": round(lng, 6)
+            })
+        return results
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """
+    HTTP server answering chat completion requests like the Mistral API.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: Optional[MockConfig] = None):
+        """
+        Args:
+            address: (host, port) to listen on; port 0 picks a free port
+            config: Latency, error and rate limit settings
+        """
+        super().__init__(address, MockRequestHandler)
+        self.config = config or MockConfig()
+        self.responder = MockResponder(self.config.canned)
+        self.stats = {"requests": 0, "completed": 0, "streamed": 0, "errors": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self) -> Tuple[Optional[int], float]:
+        """
+        Decide the fate of a request.
+
+        Returns:
+            (error status or None, latency in seconds)
+        """
+        config = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            latency = config.sample_latency(self._rng)
+            if config.requests_per_second > 0:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > config.requests_per_second:
+                    self.stats["rate_limited"] += 1
+                    return 429, 0.0
+            roll = self._rng.random()
+            if roll < config.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429, 0.0
+            if roll < config.rate_limit_rate + config.error_rate:
+                self.stats["errors"] += 1
+                return 500, latency
+            return None, latency
+
+    def record(self, streamed: bool) -> None:
+        with self._lock:
+            self.stats["streamed" if streamed else "completed"] += 1
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of MockLLMServer."""
+
+    server: MockLLMServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, dict(self.server.stats))
+        elif self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mistral-large-latest", "object": "model"}]})
+        else:
+            self._send_json(404, {"message": f"Not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"message": f"Not found: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request["messages"]
+        except (ValueError, KeyError) as e:
+            self._send_json(422, {"message": f"Invalid request: {e}"})
+            return
+
+        status, latency = self.server.admit()
+        if status == 429:
+            self._send_json(429, {"message": "Requests rate limit exceeded"}, {"Retry-After": "1"})
+            return
+        time.sleep(latency)
+        if status is not None:
+            self._send_json(status, {"message": "Internal server error (mock)"})
+            return
+
+        model = request.get("model", "mistral-large-latest")
+        content = self.server.responder.respond(messages)
+        if request.get("stream"):
+            self._stream(model, content)
+        else:
+            self._send_json(200, self._completion(model, messages, content))
+        self.server.record(bool(request.get("stream")))
+
+    def _completion(self, model: str, messages: List[Dict[str, Any]], content: str) -> Dict[str, Any]:
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": uuid.uuid4().hex,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "tool_calls": None},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _stream(self, model: str, content: str) -> None:
+        """Send the content as server-sent completion chunks."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = uuid.uuid4().hex
+        size = max(1, self.server.config.stream_chunk_chars)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                    "finish_reason": "stop" if last else None
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if not last:
+                time.sleep(self.server.config.stream_chunk_delay_ms / 1000)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_mock_server(config: Optional[MockConfig] = None, host: str = "127.0.0.1",
+                      port: int = 0) -> MockLLMServer:
+    """
+    Start a mock server on a background thread, e.g. inside a benchmark.
+
+    Args:
+        config: Server behavior
+        host: Interface to listen on
+        port: Port (0 picks a free one; see the server's url)
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    server = MockLLMServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+
+def load_canned(path: str) -> List[Tuple[str, str]]:
+    """
+    Load canned responses from a JSON file: a list of {"contains": ...,
+    "response": ...} objects. Non-string responses are sent as JSON.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [
+        (entry["contains"], entry["response"] if isinstance(entry["response"], str) else json.dumps(entry["response"]))
+        for entry in entries
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Mock Mistral chat completions server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Mean (median for lognormal) latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0, help="Spread of the latency distribution")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="normal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with 429")
+    parser.add_argument("--rps", type=float, default=0.0, help="Hard request rate limit (0 for none)")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--chunk-delay-ms", type=float, default=20.0, help="Delay between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--canned", default=None, help="JSON file of canned responses")
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        distribution=args.distribution,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        requests_per_second=args.rps,
+        stream_chunk_chars=args.chunk_chars,
+        stream_chunk_delay_ms=args.chunk_delay_ms,
+        seed=args.seed,
+        canned=load_canned(args.canned) if args.canned else []
+    ))
+    print(f"Mock LLM server listening on {server.url} (set MISTRAL_SERVER_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,145 @@
+"""
+streaming.py
+
+Incremental parsing of a JSON object streamed by an LLM.
+
+The parser is fed completion chunks as they arrive and reports each
+top-level field of the object as soon as its value is complete, so callers
+can act on early fields (e.g. incident type, priority, location) before the
+rest of the response has been generated. Text around the object, such as
+markdown code fences, is ignored.
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Streaming parser for a single top-level JSON object.
+
+    Only top-level fields are reported; nested objects and arrays are
+    reported whole once their closing bracket arrives.
+    """
+
+    def __init__(self):
+        """Initialize an empty parser."""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"  # "key", "colon", "value" or "comma" inside the object
+        self._key = None
+        self._token_start = None
+        self._scalar = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of the response.
+
+        Args:
+            chunk: Next piece of the response text
+
+        Returns:
+            (key, value) pairs of the top-level fields completed by this chunk
+        """
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self._text
+
+        i = self._pos
+        while i < len(text) and not self.complete:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_token(i + 1, completed)
+            elif self._depth == 0:
+                # Skip anything before the object
+                if c == "{":
+                    self._depth = 1
+            elif self._scalar and (c in ",}" or c.isspace()):
+                self._end_token(i, completed)
+                continue  # Re-examine the delimiter
+            elif self._scalar:
+                pass
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._start_token(i)
+            elif c in "{[":
+                if self._depth == 1:
+                    self._start_token(i)
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._end_token(i + 1, completed)
+                elif self._depth == 0:
+                    self.complete = True
+            elif self._depth == 1:
+                if c == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif c == "," and self._expect == "comma":
+                    self._expect = "key"
+                elif not c.isspace() and self._expect == "value":
+                    # Number, true, false or null
+                    self._start_token(i)
+                    self._scalar = True
+            i += 1
+
+        self._pos = i
+        return completed
+
+    def _start_token(self, index: int) -> None:
+        if self._expect in ("key", "value"):
+            self._token_start = index
+
+    def _end_token(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        if self._token_start is None:
+            return
+        raw = self._text[self._token_start:end]
+        self._token_start = None
+        self._scalar = False
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            # Malformed token; leave it to the caller's full parse
+            value = None
+            if self._expect == "key":
+                self._key = None
+                self._expect = "colon"
+                return
+        if self._expect == "key":
+            self._key = value
+            self._expect = "colon"
+        elif self._expect == "value":
+            if self._key is not None and (value is not None or raw.strip() == "null"):
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+            self._key = None
+            self._expect = "comma"
+
+    def result(self) -> Dict[str, Any]:
+        """
+        The parsed object.
+
+        Raises:
+            ValueError: If the object has not been closed yet
+        """
+        if not self.complete:
+            raise ValueError("Incomplete JSON object in LLM response")
+        return dict(self.fields)
@@ -0,0 +1,62 @@
+"""
+tokens.py
+
+Token estimates for budgeting LLM requests.
+
+The estimates are heuristic (no tokenizer is loaded): roughly four
+characters per token for English prose, with a floor based on the word
+count so that text made of many short words is not underestimated. They
+err on the high side, which is what a budget needs.
+"""
+
+import math
+import re
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+CHARS_PER_TOKEN = 4.0
+TOKENS_PER_WORD = 1.3
+
+_WORD_PATTERN = re.compile(r"\S+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated number of tokens in a text."""
+    if not text:
+        return 0
+    words = len(_WORD_PATTERN.findall(text))
+    return int(math.ceil(max(len(text) / CHARS_PER_TOKEN, words * TOKENS_PER_WORD)))
+
+
+def pack_batches(items: Sequence[T],
+                 cost: Callable[[T], int],
+                 budget: int,
+                 max_items: int) -> List[List[T]]:
+    """
+    Group items, in order, into batches whose summed cost fits a budget.
+
+    An item that exceeds the budget on its own gets a batch of its own.
+
+    Args:
+        items: Items to pack
+        cost: Token cost of one item (including any per-item output)
+        budget: Maximum summed cost of a batch
+        max_items: Maximum number of items per batch
+
+    Returns:
+        List of batches
+    """
+    batches: List[List[T]] = []
+    current: List[T] = []
+    used = 0
+    for item in items:
+        item_cost = cost(item)
+        if current and (used + item_cost > budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += item_cost
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,397 @@
+"""
+directory.py
+
+Campus-scale recipient directory for notification planning.
+
+Recipients are stored column by column (parallel arrays) with posting lists
+per group and a spatial grid over projected coordinates. Eligibility
+filtering for an incident is then a handful of set operations and tight
+loops over small integer columns instead of per-recipient object checks,
+which keeps a campus-wide plan for ~60k people well under a second.
+"""
+
+import logging
+import math
+import os
+import random
+import time
+from array import array
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+
+from notification.recipients import Recipient, RecipientManager
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+
+# Severity of an incident by priority (1 is highest)
+PRIORITY_SEVERITY = {
+    1: "critical",
+    2: "high",
+    3: "medium",
+    4: "low",
+    5: "low"
+}
+
+CHANNEL_IDS = ["sms", "email", "app_push", "phone", "radio"]
+CHANNEL_BITS = {channel: 1 << i for i, channel in enumerate(CHANNEL_IDS)}
+
+# Target groups resolved by distance from the incident rather than membership
+AREA_GROUPS = {"area_occupants", "building_occupants"}
+
+# Groups implied by a recipient's role
+ROLE_GROUPS = {
+    "student": ["all_students"],
+    "faculty": ["all_faculty"],
+    "staff": ["all_staff"],
+    "dean": ["all_faculty", "leadership"],
+    "campus_police": ["emergency_responders", "police"],
+    "campus_police_chief": ["emergency_responders", "police", "leadership"],
+    "security": ["emergency_responders", "security"],
+    "facilities": ["all_staff", "facilities"],
+    "health_services": ["all_staff", "health_services"],
+    "environmental_safety": ["all_staff", "environmental_safety"]
+}
+
+# RecipientManager group names that correspond to notification target groups
+GROUP_NAME_ALIASES = {
+    "students": "all_students",
+    "faculty": "all_faculty",
+    "staff": "all_staff",
+    "campus_leadership": "leadership"
+}
+
+# Reference point for the local metric projection (campus center)
+CAMPUS_CENTER = (32.8801, -117.2340)
+_METERS_PER_DEGREE_LAT = 110540.0
+_METERS_PER_DEGREE_LNG = 111320.0 * math.cos(math.radians(CAMPUS_CENTER[0]))
+
+
+def project(lat: float, lng: float) -> Tuple[float, float]:
+    """Project coordinates onto a local plane in meters around the campus center."""
+    return (
+        (lng - CAMPUS_CENTER[1]) * _METERS_PER_DEGREE_LNG,
+        (lat - CAMPUS_CENTER[0]) * _METERS_PER_DEGREE_LAT
+    )
+
+
+class RecipientDirectory:
+    """
+    Column-oriented store of notification recipients.
+    """
+
+    def __init__(self, cell_size_meters: float = 250):
+        """
+        Initialize an empty directory.
+
+        Args:
+            cell_size_meters: Edge length of the spatial grid cells
+        """
+        self.cell_size = cell_size_meters
+
+        # Columns, one entry per recipient row
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.roles: List[str] = []
+        self.xs = array("d")
+        self.ys = array("d")
+        self.severity_thresholds = array("b")
+        self.channel_masks = array("B")
+        self.quiet_start = array("b")  # -1 when the recipient has no quiet hours
+        self.quiet_end = array("b")
+        self.active = bytearray()
+
+        # Indexes
+        self.group_members: Dict[str, List[int]] = {}
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        self._rows_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self,
+            recipient_id: str,
+            name: str,
+            role: str,
+            lat: float,
+            lng: float,
+            groups: Iterable[str] = (),
+            channels: Iterable[str] = ("email", "app_push"),
+            severity_threshold: str = "medium",
+            quiet_hours: Tuple[Optional[int], Optional[int]] = (None, None),
+            active: bool = True) -> int:
+        """
+        Add a recipient.
+
+        Args:
+            recipient_id: Unique recipient ID
+            name: Display name
+            role: Role (student, faculty, staff, campus_police, ...)
+            lat, lng: Current or default location
+            groups: Group names in addition to those implied by the role
+            channels: Preferred channel IDs
+            severity_threshold: Lowest severity the recipient wants to receive
+            quiet_hours: (start hour, end hour) or (None, None)
+            active: Whether the recipient should receive notifications
+
+        Returns:
+            Row index of the recipient
+        """
+        if recipient_id in self._rows_by_id:
+            raise ValueError(f"Duplicate recipient ID: {recipient_id}")
+
+        row = len(self.ids)
+        x, y = project(lat, lng)
+
+        self.ids.append(recipient_id)
+        self.names.append(name)
+        self.roles.append(role)
+        self.xs.append(x)
+        self.ys.append(y)
+        threshold = severity_threshold.lower()
+        self.severity_thresholds.append(SEVERITY_LEVELS.index(threshold) if threshold in SEVERITY_LEVELS else 1)
+        mask = 0
+        for channel in channels:
+            mask |= CHANNEL_BITS.get(channel, 0)
+        self.channel_masks.append(mask)
+        start, end = quiet_hours
+        self.quiet_start.append(-1 if start is None else start)
+        self.quiet_end.append(-1 if end is None else end)
+        self.active.append(1 if active else 0)
+
+        for group in set(groups) | set(ROLE_GROUPS.get(role, [])):
+            self.group_members.setdefault(group, []).append(row)
+        self._grid.setdefault(self._cell(x, y), []).append(row)
+        self._rows_by_id[recipient_id] = row
+
+        return row
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        """Grid cell containing a projected point."""
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def row_of(self, recipient_id: str) -> Optional[int]:
+        """Row index of a recipient ID, or None."""
+        return self._rows_by_id.get(recipient_id)
+
+    def within_radius(self, lat: float, lng: float, radius_meters: float) -> List[int]:
+        """
+        Find rows located within a radius of a point.
+
+        Only grid cells overlapping the circle's bounding box are visited.
+        """
+        cx, cy = project(lat, lng)
+        radius_sq = radius_meters * radius_meters
+        min_cell = self._cell(cx - radius_meters, cy - radius_meters)
+        max_cell = self._cell(cx + radius_meters, cy + radius_meters)
+
+        xs = self.xs
+        ys = self.ys
+        rows = []
+        for gx in range(min_cell[0], max_cell[0] + 1):
+            for gy in range(min_cell[1], max_cell[1] + 1):
+                cell_rows = self._grid.get((gx, gy))
+                if cell_rows:
+                    rows.extend(r for r in cell_rows if (xs[r] - cx) ** 2 + (ys[r] - cy) ** 2 <= radius_sq)
+        return rows
+
+    def distance(self, row: int, lat: float, lng: float) -> float:
+        """Distance in meters between a recipient and a point."""
+        x, y = project(lat, lng)
+        return math.hypot(self.xs[row] - x, self.ys[row] - y)
+
+    def select(self,
+               lat: float,
+               lng: float,
+               radius_meters: float,
+               target_groups: Iterable[str],
+               priority: int,
+               hour: Optional[int] = None) -> List[int]:
+        """
+        Select the recipients to notify about an incident.
+
+        A recipient is selected when active, at or above their severity
+        threshold, outside quiet hours for non-urgent incidents (priority 3+),
+        and either a member of a target group or, when an area group such as
+        "area_occupants" is targeted, within the radius. Emergency responders
+        are always selected for priority 1-2.
+
+        Args:
+            lat, lng: Incident coordinates
+            radius_meters: Notification radius
+            target_groups: Target population groups
+            priority: Incident priority (1 is highest)
+            hour: Hour of day for quiet hours (defaults to now)
+
+        Returns:
+            Sorted row indices
+        """
+        target_groups = set(target_groups)
+
+        candidates: Set[int] = set()
+        for group in target_groups - AREA_GROUPS:
+            candidates.update(self.group_members.get(group, ()))
+        if target_groups & AREA_GROUPS:
+            candidates.update(self.within_radius(lat, lng, radius_meters))
+
+        severity_idx = SEVERITY_LEVELS.index(PRIORITY_SEVERITY.get(priority, "medium"))
+        active = self.active
+        thresholds = self.severity_thresholds
+        selected = {r for r in candidates if active[r] and thresholds[r] <= severity_idx}
+
+        if priority >= 3:
+            if hour is None:
+                hour = time.localtime().tm_hour
+            starts = self.quiet_start
+            ends = self.quiet_end
+            selected = {r for r in selected if not _in_quiet_hours(starts[r], ends[r], hour)}
+        else:
+            selected.update(r for r in self.group_members.get("emergency_responders", ()) if active[r])
+
+        return sorted(selected)
+
+    @classmethod
+    def from_recipients(cls, recipients: Iterable[Recipient], group_names: Optional[Dict[str, str]] = None) -> 'RecipientDirectory':
+        """
+        Build a directory from Recipient objects.
+
+        Args:
+            recipients: Recipients to add
+            group_names: Optional mapping from group ID to group name
+
+        Returns:
+            A populated directory
+        """
+        directory = cls()
+        group_names = group_names or {}
+        for recipient in recipients:
+            groups = []
+            for group in recipient.groups:
+                slug = group_names.get(group, group).lower().replace(" ", "_")
+                groups.append(GROUP_NAME_ALIASES.get(slug, slug))
+            preferences = recipient.notification_preferences
+            directory.add(
+                recipient.id,
+                recipient.name,
+                recipient.role,
+                recipient.location.get("latitude", CAMPUS_CENTER[0]),
+                recipient.location.get("longitude", CAMPUS_CENTER[1]),
+                groups=groups,
+                channels=preferences.channels,
+                severity_threshold=preferences.severity_threshold,
+                quiet_hours=(preferences.quiet_hours_start, preferences.quiet_hours_end),
+                active=recipient.active
+            )
+        return directory
+
+    @classmethod
+    def from_manager(cls, manager: RecipientManager) -> 'RecipientDirectory':
+        """Build a directory from a RecipientManager."""
+        group_names = {group.id: group.name for group in manager.get_all_groups()}
+        return cls.from_recipients(manager.get_all_recipients(), group_names)
+
+    @classmethod
+    def synthetic(cls, population: int = 60000, seed: int = 0) -> 'RecipientDirectory':
+        """
+        Build a directory with a synthetic campus population for demos and benchmarks.
+
+        Args:
+            population: Approximate number of students, faculty and staff
+            seed: Random seed
+
+        Returns:
+            A populated directory
+        """
+        rng = random.Random(seed)
+        directory = cls()
+
+        # Named responders and leadership, as in the original demo plan
+        for recipient_id, name, role, lat, lng, channels in [
+            ("r001", "Chief Roberts", "campus_police_chief", 32.8801, -117.2340, ["sms", "phone", "email", "app_push", "radio"]),
+            ("r002", "Officer Garcia", "campus_police", 32.8795, -117.2360, ["radio", "app_push", "sms"]),
+            ("r003", "Dr. Chen", "dean", 32.8785, -117.2330, ["email", "app_push", "sms"]),
+            ("r004", "Facilities Team", "facilities", 32.8788, -117.2410, ["sms", "radio", "email"]),
+            ("r005", "Campus Security", "security", 32.8801, -117.2345, ["sms", "radio", "app_push"]),
+            ("r006", "Student Health Center", "health_services", 32.8760, -117.2370, ["sms", "email", "phone"]),
+            ("r007", "Environmental Safety", "environmental_safety", 32.8770, -117.2330, ["sms", "email", "phone"]),
+        ]:
+            directory.add(recipient_id, name, role, lat, lng, channels=channels, severity_threshold="low")
+
+        # Where people spend their day: colleges, libraries and research areas
+        hubs = [
+            (32.8815, -117.2350), (32.8789, -117.2410), (32.8745, -117.2410),
+            (32.8806, -117.2325), (32.8836, -117.2425), (32.8851, -117.2408),
+            (32.8810, -117.2370), (32.8794, -117.2359), (32.8750, -117.2340),
+            (32.8869, -117.2406), (32.8782, -117.2392), (32.8662, -117.2546)
+        ]
+        roles = [("student", "s", 0.75), ("staff", "t", 0.20), ("faculty", "f", 0.05)]
+        student_channels = [["app_push", "sms"], ["app_push", "email"], ["sms", "email", "app_push"]]
+        staff_channels = [["email", "app_push"], ["email", "app_push", "sms"], ["email", "phone"]]
+
+        for role, prefix, share in roles:
+            for i in range(int(population * share)):
+                hub_lat, hub_lng = rng.choice(hubs)
+                lat = hub_lat + rng.gauss(0, 0.0025)
+                lng = hub_lng + rng.gauss(0, 0.0025)
+                if role == "student":
+                    channels = rng.choice(student_channels)
+                    quiet = (23, 7) if rng.random() < 0.15 else (None, None)
+                else:
+                    channels = rng.choice(staff_channels)
+                    quiet = (None, None)
+                directory.add(
+                    f"{prefix}{i:06d}",
+                    f"{role.capitalize()} {i}",
+                    role,
+                    lat,
+                    lng,
+                    channels=channels,
+                    severity_threshold=rng.choice(["low", "medium", "medium", "medium", "high"]),
+                    quiet_hours=quiet
+                )
+
+        logger.info(f"Generated synthetic directory with {len(directory)} recipients")
+        return directory
+
+
+def load_default_directory() -> RecipientDirectory:
+    """
+    Load the configured recipient directory.
+
+    Recipients come from the RecipientManager file named by
+    SAFE_CAMPUS_RECIPIENTS_PATH. A synthetic campus population is only
+    generated when SAFE_CAMPUS_SYNTHETIC_POPULATION is set, for benchmarks
+    and demos. With neither configured the directory is empty and no
+    recipients are notified.
+
+    Raises:
+        FileNotFoundError: If SAFE_CAMPUS_RECIPIENTS_PATH names a missing file
+    """
+    path = os.getenv("SAFE_CAMPUS_RECIPIENTS_PATH", "")
+    if path:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"SAFE_CAMPUS_RECIPIENTS_PATH does not exist: {path}")
+        return RecipientDirectory.from_manager(RecipientManager(path))
+
+    population = int(os.getenv("SAFE_CAMPUS_SYNTHETIC_POPULATION", "0") or 0)
+    if population > 0:
+        logger.warning(
+            f"Planning notifications against {population} SYNTHETIC recipients "
+            "(SAFE_CAMPUS_SYNTHETIC_POPULATION); use this for benchmarks and demos only"
+        )
+        return RecipientDirectory.synthetic(population)
+
+    logger.error(
+        "No recipient directory configured: set SAFE_CAMPUS_RECIPIENTS_PATH. "
+        "Notification plans will have NO recipients."
+    )
+    return RecipientDirectory()
+
+
+def _in_quiet_hours(start: int, end: int, hour: int) -> bool:
+    """Check an hour against a quiet-hours window (-1 means no window)."""
+    if start < 0 or end < 0:
+        return False
+    if start <= end:
+        return start <= hour <= end
+    return hour >= start or hour <= end
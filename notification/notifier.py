@@ -12,6 +12,8 @@ import math
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
+from notification.templates import CHANNEL_TEMPLATES, SEVERITY_NAMES
+
 @dataclass
 class Recipient:
     """Represents a notification recipient"""
@@ -116,7 +118,7 @@ class SafeCampusNotifier:
                 type="sms",
                 priority=1,  # Highest priority
                 rate_limit=300,  # No more than once per 5 minutes
-                template="ALERT: {incident_type} at {location}. {action_required}. More info: {details_url}"
+                template=CHANNEL_TEMPLATES["sms"]
             ),
             NotificationChannel(
                 id="app_push",
@@ -124,7 +126,7 @@ class SafeCampusNotifier:
                 type="app_push",
                 priority=2,
                 rate_limit=60,
-                template="🚨 {severity} ALERT: {summary}. {action_required}"
+                template=CHANNEL_TEMPLATES["app_push"]
             ),
             NotificationChannel(
                 id="email",
@@ -132,7 +134,7 @@ class SafeCampusNotifier:
                 type="email",
                 priority=3,
                 rate_limit=600,  # No more than once per 10 minutes
-                template="CAMPUS ALERT: {incident_type}\n\nLocation: {location}\n\nDetails: {description}\n\nRecommended action: {action_required}\n\nUpdates will be provided as available."
+                template=CHANNEL_TEMPLATES["email"]
             ),
             NotificationChannel(
                 id="phone",
@@ -140,7 +142,7 @@ class SafeCampusNotifier:
                 type="phone",
                 priority=1,  # Highest priority
                 rate_limit=1800,  # No more than once per 30 minutes
-                template="This is an automated emergency notification from UC San Diego. {summary}. {action_required}."
+                template=CHANNEL_TEMPLATES["phone"]
             ),
             NotificationChannel(
                 id="radio",
@@ -148,7 +150,7 @@ class SafeCampusNotifier:
                 type="radio",
                 priority=1,
                 rate_limit=120,
-                template="Attention all units. {incident_type} reported at {location}. {action_required}."
+                template=CHANNEL_TEMPLATES["radio"]
             )
         ]
     
@@ -523,14 +525,7 @@ class SafeCampusNotifier:
     
     def _map_priority_to_severity(self, priority: int) -> str:
         """Map numerical priority to text severity."""
-        severity_map = {
-            1: "CRITICAL",
-            2: "HIGH",
-            3: "MEDIUM",
-            4: "LOW",
-            5: "INFORMATION"
-        }
-        return severity_map.get(priority, "MEDIUM")
+        return SEVERITY_NAMES.get(priority, "MEDIUM")
     
     def _create_notification_plan(self, 
                                  recipients: List[Dict[str, Any]],
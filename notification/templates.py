@@ -0,0 +1,73 @@
+"""
+templates.py
+
+Message templates per notification channel and helpers to render them
+from an EIDO. This is the one copy of the templates and severity names;
+the notifier, the agent and the call processor all use it.
+"""
+
+from typing import Dict, Any, Iterable
+
+# Channel message templates; placeholders are filled from build_content()
+CHANNEL_TEMPLATES = {
+    "sms": "ALERT: {incident_type} at {location}. {action_required}. More info: {details_url}",
+    "app_push": "🚨 {severity} ALERT: {summary}. {action_required}",
+    "email": "CAMPUS ALERT: {incident_type}\n\nLocation: {location}\n\nDetails: {description}\n\nRecommended action: {action_required}\n\nUpdates will be provided as available.",
+    "phone": "This is an automated emergency notification from UC San Diego. {summary}. {action_required}.",
+    "radio": "Attention all units. {incident_type} reported at {location}. {action_required}."
+}
+
+SEVERITY_NAMES = {
+    1: "CRITICAL",
+    2: "HIGH",
+    3: "MEDIUM",
+    4: "LOW",
+    5: "INFORMATION"
+}
+
+
+def build_content(eido: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Extract the template fields from an EIDO.
+
+    Args:
+        eido: The EIDO object
+
+    Returns:
+        Dictionary of template fields
+    """
+    incident = eido["eido"]["incident"]
+    notification = eido["eido"]["notification"]
+    location = incident["location"]["address"]["fullAddress"]
+    incident_type = incident["incidentType"].upper()
+
+    return {
+        "incident_type": incident_type,
+        "location": location,
+        "summary": f"{incident_type}: {location}",
+        "description": incident["details"].get("description", ""),
+        "action_required": "; ".join(notification.get("recommendedActions", [])),
+        "details_url": f"https://alerts.ucsd.edu/details/{incident['incidentID'][-6:]}",
+        "severity": SEVERITY_NAMES.get(incident["priority"], "MEDIUM")
+    }
+
+
+def render_messages(content: Dict[str, str], channels: Iterable[str]) -> Dict[str, str]:
+    """
+    Render the message for each channel.
+
+    Args:
+        content: Template fields (see build_content)
+        channels: Channel IDs
+
+    Returns:
+        Dictionary mapping channel ID to message
+    """
+    messages = {}
+    for channel in channels:
+        try:
+            messages[channel] = CHANNEL_TEMPLATES[channel].format(**content)
+        except KeyError:
+            # Unknown channel or missing template field
+            messages[channel] = f"ALERT: {content['incident_type']} at {content['location']}. {content['action_required']}"
+    return messages
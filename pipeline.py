@@ -0,0 +1,220 @@
+# pipeline.py
+"""
+Dependency-graph execution of processing stages.
+
+Each stage declares the stages it depends on. Stages whose dependencies are
+satisfied run concurrently in a shared thread pool, so end-to-end latency
+approaches the slowest chain of stages rather than the sum of all of them.
+Stages can have a timeout and a fallback; a stage that fails or times out
+resolves to its fallback value so that the stages depending on it still run.
+
+A thread cannot be stopped, so a stage that times out keeps running in the
+background. Stages with a timeout therefore run in a separate, bounded pool:
+abandoned stages can only tie up that pool, never the shared one. Abandoned
+stages are counted (see abandoned_stages) and marked in the run report.
+
+Stages run in a copy of the caller's context, so tracing spans opened
+inside a stage are recorded in the caller's trace.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Threads for stages with a timeout (see env.example)
+TIMED_STAGE_WORKERS = int(os.getenv("PIPELINE_TIMED_STAGE_WORKERS", "8"))
+
+
+class StageError(Exception):
+    """Raised when a stage without a fallback fails or times out."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"Stage '{stage}' {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+@dataclass
+class Stage:
+    """
+    A pipeline stage.
+
+    fn receives a dictionary with the results of the stages it depends on.
+    fallback, if given, receives the same dictionary and the exception (a
+    TimeoutError on timeout) and returns the value used instead.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    fallback: Optional[Callable[[Dict[str, Any], BaseException], Any]] = None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for pipeline stages."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline")
+    return _executor
+
+
+_timed_executor = None
+
+def get_timed_executor() -> ThreadPoolExecutor:
+    """Thread pool for stages with a timeout, separate from the shared pool."""
+    global _timed_executor
+    with _executor_lock:
+        if _timed_executor is None:
+            _timed_executor = ThreadPoolExecutor(max_workers=TIMED_STAGE_WORKERS, thread_name_prefix="pipeline-timed")
+    return _timed_executor
+
+
+# Timed-out stages that are still running
+_abandoned: Set[Future] = set()
+_abandoned_lock = threading.Lock()
+
+def _abandon(future: Future) -> None:
+    """Track a timed-out stage until its thread finishes."""
+    with _abandoned_lock:
+        _abandoned.add(future)
+    future.add_done_callback(_release)
+
+def _release(future: Future) -> None:
+    with _abandoned_lock:
+        _abandoned.discard(future)
+
+def abandoned_stages() -> int:
+    """Number of timed-out stages whose threads are still running."""
+    with _abandoned_lock:
+        return len(_abandoned)
+
+
+class StageGraph:
+    """
+    Runs a set of stages in dependency order, concurrently where possible.
+    """
+
+    def __init__(self, stages: List[Stage], executor: Optional[ThreadPoolExecutor] = None,
+                 timed_executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Validate and store the stages.
+
+        Args:
+            stages: Stages in any order
+            executor: Thread pool to run stages without a timeout in
+                (defaults to the shared pool)
+            timed_executor: Thread pool to run stages with a timeout in
+                (defaults to get_timed_executor())
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+        self._check_acyclic()
+        self._executor = executor
+        self._timed_executor = timed_executor
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage dependency cycle through '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def run(self) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Run every stage.
+
+        Returns:
+            (results, report) where results maps stage names to values and
+            report maps stage names to {"status": "ok" | "fallback" | "timeout",
+            "duration_ms", "error" when the stage failed, and "abandoned"
+            when a timed-out stage was left running}
+
+        Raises:
+            StageError: If a stage without a fallback fails or times out
+        """
+        executor = self._executor or get_executor()
+        timed_executor = self._timed_executor or get_timed_executor()
+        results: Dict[str, Any] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+        pending = dict(self.stages)
+        running: Dict[Future, Tuple[Stage, float]] = {}
+
+        while pending or running:
+            # Start every stage whose dependencies have resolved
+            for name in [n for n, s in pending.items() if all(d in results for d in s.depends_on)]:
+                stage = pending.pop(name)
+                inputs = {d: results[d] for d in stage.depends_on}
+                context = contextvars.copy_context()
+                pool = executor if stage.timeout is None else timed_executor
+                future = pool.submit(context.run, stage.fn, inputs)
+                running[future] = (stage, time.perf_counter())
+
+            if not running:
+                break
+
+            now = time.perf_counter()
+            deadlines = [started + stage.timeout - now for stage, started in running.values() if stage.timeout is not None]
+            wait_timeout = max(0.0, min(deadlines)) if deadlines else None
+            finished, _ = wait(list(running), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                stage, started = running.pop(future)
+                duration_ms = round((time.perf_counter() - started) * 1000, 3)
+                try:
+                    results[stage.name] = future.result()
+                    report[stage.name] = {"status": "ok", "duration_ms": duration_ms}
+                except Exception as e:
+                    results[stage.name] = self._fall_back(stage, results, e)
+                    report[stage.name] = {"status": "fallback", "duration_ms": duration_ms, "error": f"{type(e).__name__}: {e}"}
+
+            # Resolve stages that ran past their timeout. A stage still queued
+            # is cancelled; a running one is left to finish in the background,
+            # counted as abandoned, and its result is discarded
+            now = time.perf_counter()
+            for future, (stage, started) in list(running.items()):
+                if stage.timeout is not None and now - started >= stage.timeout and not future.done():
+                    del running[future]
+                    error = TimeoutError(f"timed out after {stage.timeout}s")
+                    entry = {"status": "timeout", "duration_ms": round((now - started) * 1000, 3), "error": str(error)}
+                    if not future.cancel():
+                        _abandon(future)
+                        entry["abandoned"] = True
+                        logger.warning(f"Stage '{stage.name}' abandoned after {stage.timeout}s "
+                                       f"({abandoned_stages()} abandoned stages still running)")
+                    report[stage.name] = entry
+                    results[stage.name] = self._fall_back(stage, results, error)
+
+        return results, report
+
+    def _fall_back(self, stage: Stage, results: Dict[str, Any], error: BaseException) -> Any:
+        """Resolve a failed stage to its fallback value."""
+        if stage.fallback is None:
+            raise StageError(stage.name, f"failed: {error}") from error
+        logger.warning(f"Stage '{stage.name}' using fallback: {error}")
+        return stage.fallback({d: results[d] for d in stage.depends_on}, error)
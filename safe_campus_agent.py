@@ -6,7 +6,43 @@ import re
 import uuid
 import math
 import random
-from typing import Dict, Any, List
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from eido.utils import TTLCache, content_hash
+from pipeline import Stage, StageGraph, get_executor
+from tracing import span, trace
+from eido.keyword_rules import KeywordHits, get_keyword_scanner
+from eido.eido_schema import generate_eido_id, generate_incident_id
+from eido.incident_registry import IncidentRegistry
+from eido.incident_store import IncidentStore
+from geocoding.matcher import CAMPUS_PLACES, LocationMatcher, get_location_matcher
+from notification.directory import RecipientDirectory, load_default_directory
+from notification.planner import NotificationPlan, NotificationPlanner
+from notification.templates import SEVERITY_NAMES
+
+# Extraction patterns, applied only when the keyword scan finds victims or suspects
+VICTIM_COUNT_RE = re.compile(r'(\d+)\s+(?:person|people|individuals|victims)', re.I)
+SUSPECT_DESCRIPTION_RE = re.compile(r'wearing[^.]*', re.I)
+
+# SQLite database keeping every incident and its EIDO version history
+INCIDENT_DB_PATH = os.getenv(
+    "SAFE_CAMPUS_INCIDENT_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "incidents.db")
+)
+
+# Per-stage timeouts in seconds. Stages that time out resolve to their
+# fallback (see _process_text); stages without a timeout wait indefinitely.
+DEFAULT_STAGE_TIMEOUTS = {
+    "location_extraction": 5.0,
+    "classification": 10.0,
+    "persistence": 2.0
+}
+
+# Number of per-recipient entries included in notification results
+NOTIFICATION_PREVIEW_LIMIT = 100
 
 class SafeCampusAgent:
     """
@@ -15,25 +51,102 @@ class SafeCampusAgent:
     intelligent notification decisions.
     """
     
-    def __init__(self):
-        """Initialize the Safe Campus Agent."""
-        self.known_locations = self._load_known_locations()
+    def __init__(self, cache_size: int = 256, cache_ttl_seconds: float = 300,
+                 recipient_directory: Optional[RecipientDirectory] = None,
+                 incident_registry: Optional[IncidentRegistry] = None,
+                 incident_store: Optional[IncidentStore] = None,
+                 stage_timeouts: Optional[Dict[str, float]] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Initialize the Safe Campus Agent.
+        
+        Args:
+            cache_size: Maximum number of cached stage results
+            cache_ttl_seconds: Lifetime of cached stage results in seconds
+            recipient_directory: Recipients to plan notifications for
+                (defaults to load_default_directory(), loaded on first use)
+            incident_registry: Registry used to fold duplicate reports into
+                active incidents
+            incident_store: Store persisting incidents and their EIDO
+                versions (defaults to INCIDENT_DB_PATH, opened on first use)
+            stage_timeouts: Per-stage timeouts in seconds, overriding
+                DEFAULT_STAGE_TIMEOUTS
+            executor: Thread pool running pipeline stages without a timeout
+                (defaults to the shared pipeline pool; stages with a timeout
+                run in the pipeline's timed pool)
+        """
+        # Datasets are loaded on first use (see warm_up) to keep cold starts fast
+        self._recipient_directory = recipient_directory
+        self._incident_store = incident_store
+        
+        # Pipeline stages run concurrently where independent (see _process_text)
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS, **(stage_timeouts or {}))
+        self.executor = executor or get_executor()
+        self._notification_planner = None
+        
+        # Active incidents, so that repeated reports of one event notify once
+        self.incident_registry = incident_registry if incident_registry is not None else IncidentRegistry()
+        
+        # Stage results keyed by a hash of the normalized input text
+        self.result_cache = TTLCache(max_entries=cache_size, ttl_seconds=cache_ttl_seconds)
     
-    def _load_known_locations(self):
-        """Load known campus locations for geocoding."""
-        return {
-            "Geisel Library": {"lat": 32.8810, "lng": -117.2370, "name": "Geisel Library"},
-            "Price Center": {"lat": 32.8794, "lng": -117.2359, "name": "Price Center"},
-            "Warren College": {"lat": 32.8815, "lng": -117.2350, "name": "Warren College"},
-            "Warren Apartments": {"lat": 32.8825, "lng": -117.2355, "name": "Warren Apartments"},
-            "Sixth College": {"lat": 32.8806, "lng": -117.2325, "name": "Sixth College"},
-            "Muir College": {"lat": 32.8789, "lng": -117.2410, "name": "Muir College"},
-            "Revelle College": {"lat": 32.8745, "lng": -117.2410, "name": "Revelle College"},
-            "RIMAC Arena": {"lat": 32.8869, "lng": -117.2406, "name": "RIMAC Arena"},
-            "Library Walk": {"lat": 32.8794, "lng": -117.2370, "name": "Library Walk"},
-            "La Jolla": {"lat": 32.8328, "lng": -117.2712, "name": "La Jolla"},
-            "UC San Diego": {"lat": 32.8801, "lng": -117.2340, "name": "UC San Diego Campus"}
-        }
+    @property
+    def known_locations(self) -> Dict[str, Dict[str, Any]]:
+        """Curated campus locations (see geocoding.matcher.CAMPUS_PLACES)."""
+        return CAMPUS_PLACES
+    
+    @property
+    def location_matcher(self) -> LocationMatcher:
+        """
+        Matcher over the curated campus locations plus the full gazetteer,
+        shared process-wide and built once on first access.
+        """
+        return get_location_matcher()
+    
+    @property
+    def recipient_directory(self) -> RecipientDirectory:
+        """Recipient directory, loaded lazily on first access."""
+        if self._recipient_directory is None:
+            with span("recipient_directory.load"):
+                self._recipient_directory = load_default_directory()
+        return self._recipient_directory
+    
+    @property
+    def incident_store(self) -> IncidentStore:
+        """Incident store, opened lazily on first access."""
+        if self._incident_store is None:
+            self._incident_store = IncidentStore(INCIDENT_DB_PATH)
+        return self._incident_store
+    
+    @property
+    def notification_planner(self) -> NotificationPlanner:
+        """Planner over the recipient directory."""
+        if self._notification_planner is None:
+            self._notification_planner = NotificationPlanner(self.recipient_directory)
+        return self._notification_planner
+    
+    def start_live_call(self, call_id: Optional[str] = None) -> 'LiveCallSession':
+        """
+        Start incremental processing of a live call transcript.
+        
+        Args:
+            call_id: Optional call ID (generated if omitted)
+            
+        Returns:
+            LiveCallSession to feed transcript chunks into
+        """
+        from live_calls import LiveCallSession
+        return LiveCallSession(self, call_id=call_id)
+    
+    def warm_up(self) -> None:
+        """
+        Eagerly load datasets that are otherwise deferred until first use.
+        
+        Call this from a startup hook when the first request should not pay
+        the initialization cost.
+        """
+        self.location_matcher
+        self.notification_planner
     
     def process_emergency_call(self, transcript: str) -> Dict[str, Any]:
         """
@@ -45,76 +158,258 @@ class SafeCampusAgent:
         Returns:
             Dictionary with processing results
         """
-        start_time = time.time()
-        
-        # Extract location using simulated LLM
-        location_info = self._extract_location(transcript)
-        
-        # Classify incident using simulated LLM
-        classification = self._classify_incident(transcript)
+        return self._process_text(transcript, is_report=False)
+    
+    def process_incident_report(self, report: str) -> Dict[str, Any]:
+        """
+        Process a written incident report into a structured EIDO object.
         
-        # Generate EIDO object
-        eido = self._generate_eido(transcript, location_info, classification)
+        Args:
+            report: The incident report text
+            
+        Returns:
+            Dictionary with processing results
+        """
+        return self._process_text(report, is_report=True)
+    
+    def _process_text(self, text: str, is_report: bool = False) -> Dict[str, Any]:
+        """
+        Run the processing pipeline shared by calls and reports.
         
-        # Generate notification plan
-        notification_results = self._generate_notification_plan(eido)
+        Location, classification and EIDO stages are cached by a hash of the
+        whitespace-normalized text, so resubmissions of the same transcript
+        skip them. The EIDO is also keyed by its inputs, so an EIDO built
+        from stage fallbacks is never served with the real results that
+        arrive later. A cached EIDO is re-issued with fresh IDs and timestamps.
         
-        # Calculate processing times
-        processing_time = time.time() - start_time
-        notification_time = processing_time * 0.3  # Simulated notification planning time
+        Args:
+            text: The transcript or report text
+            is_report: Whether this is a report (vs. emergency call)
+            
+        Returns:
+            Dictionary with processing results
+        """
+        text_key = content_hash(text)
+        cached_stages = []
+        eido_stage = "eido_report" if is_report else "eido_call"
+        
+        def extract_location(inputs):
+            # Extract location using simulated LLM
+            with span("location_extraction") as stage_span:
+                location_info = self._run_cached_stage(
+                    "location", text_key, lambda: self._extract_location(text), cached_stages
+                )
+                stage_span.set_attribute("cached", "location" in cached_stages)
+            return location_info
+        
+        def classify(inputs):
+            # Classify incident using simulated LLM
+            with span("classification") as stage_span:
+                classification = self._run_cached_stage(
+                    "classification", text_key, lambda: self._classify_incident(text), cached_stages
+                )
+                stage_span.set_attribute("cached", "classification" in cached_stages)
+            return classification
+        
+        def generate_eido(inputs):
+            # Generate EIDO object
+            with span("eido_generation") as stage_span:
+                inputs_key = content_hash(json.dumps(
+                    [inputs["location_extraction"], inputs["classification"]], sort_keys=True, default=str
+                ))
+                eido = self._run_cached_stage(
+                    eido_stage,
+                    f"{text_key}:{inputs_key}",
+                    lambda: self._generate_eido(text, inputs["location_extraction"], inputs["classification"], is_report=is_report),
+                    cached_stages
+                )
+                if eido_stage in cached_stages:
+                    self._reissue_eido(eido, text)
+                stage_span.set_attribute("cached", eido_stage in cached_stages)
+            return eido
+        
+        def correlate(inputs):
+            # Fold reports of an already active incident into it
+            with span("correlation"):
+                return self._correlate_incident(inputs["eido_generation"], inputs["location_extraction"])
+        
+        def persist(inputs):
+            # Persist the new incident, or the new version of the folded one
+            with span("persistence"):
+                return self.incident_store.save(inputs["correlation"][0])
+        
+        def plan_notifications(inputs):
+            # Generate notification plan, unless this report changed nothing
+            # that the previous notifications did not already cover
+            eido, correlation = inputs["correlation"]
+            if not correlation["notify"]:
+                return self._suppressed_notification_results(eido, correlation)
+            with span("notification_planning"):
+                return self._generate_notification_plan(eido)
+        
+        timeouts = self.stage_timeouts
+        graph = StageGraph([
+            Stage("location_extraction", extract_location,
+                  timeout=timeouts.get("location_extraction"),
+                  fallback=lambda inputs, error: self._default_location()),
+            Stage("classification", classify,
+                  timeout=timeouts.get("classification"),
+                  fallback=lambda inputs, error: self._fallback_classification()),
+            Stage("eido_generation", generate_eido,
+                  depends_on=("location_extraction", "classification"),
+                  timeout=timeouts.get("eido_generation")),
+            Stage("correlation", correlate,
+                  depends_on=("eido_generation", "location_extraction"),
+                  timeout=timeouts.get("correlation"),
+                  fallback=lambda inputs, error: (inputs["eido_generation"], self._uncorrelated(inputs["eido_generation"]))),
+            Stage("persistence", persist,
+                  depends_on=("correlation",),
+                  timeout=timeouts.get("persistence"),
+                  fallback=lambda inputs, error: None),
+            Stage("notification_planning", plan_notifications,
+                  depends_on=("correlation",),
+                  timeout=timeouts.get("notification_planning"))
+        ], executor=self.executor)
+        
+        # Location and classification run concurrently; persistence and
+        # notification planning run concurrently once correlation is done
+        with trace() as request_trace:
+            stage_results, stage_report = graph.run()
+        
+        location_info = stage_results["location_extraction"]
+        classification = stage_results["classification"]
+        eido, correlation = stage_results["correlation"]
+        correlation["version"] = stage_results["persistence"]
+        notification_results = stage_results["notification_planning"]
+        
+        timings = request_trace.timings()
         
         # Assemble complete results
         results = {
             "eido": eido,
             "notification_results": notification_results,
-            "processing_time": round(processing_time, 2),
-            "notification_time": round(notification_time, 2),
+            "processing_time": round(timings["total_ms"] / 1000, 2),
+            "notification_time": round(timings["stages_ms"].get("notification_planning", 0.0) / 1000, 2),
+            "timings": timings,
             "location": location_info,
-            "classification": classification
+            "classification": classification,
+            "correlation": correlation,
+            "cached_stages": cached_stages,
+            "stages": stage_report
         }
         
         return results
     
-    def process_incident_report(self, report: str) -> Dict[str, Any]:
+    def _correlate_incident(self, eido: Dict[str, Any], location_info: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Process a written incident report into a structured EIDO object.
+        Match the EIDO against active incidents of the same type nearby.
+        
+        Reports without a recognized location or type are never folded, since
+        their default coordinates say nothing about where they happened.
         
         Args:
-            report: The incident report text
+            eido: EIDO generated for this report
+            location_info: Extracted location
             
         Returns:
-            Dictionary with processing results
+            (eido, correlation) where eido is the incident's merged EIDO when
+            the report was folded, and correlation describes the outcome
         """
-        # Similar to process_emergency_call but adapted for reports
-        start_time = time.time()
-        
-        # Extract location using simulated LLM
-        location_info = self._extract_location(report)
-        
-        # Classify incident using simulated LLM
-        classification = self._classify_incident(report)
+        incident = eido["eido"]["incident"]
+        correlation = self._uncorrelated(eido)
         
-        # Generate EIDO object
-        eido = self._generate_eido(report, location_info, classification, is_report=True)
+        if location_info.get("span") is None or incident["incidentType"] == "unknown":
+            return eido, correlation
         
-        # Generate notification plan
-        notification_results = self._generate_notification_plan(eido)
+        coordinates = incident["location"]["coordinates"]
+        match, changes = self.incident_registry.match_or_register(
+            copy.deepcopy(eido), incident["incidentType"], coordinates["latitude"], coordinates["longitude"]
+        )
+        if changes is None:
+            return eido, correlation
+        
+        correlation.update({
+            "incident_id": match.incident_id,
+            "duplicate": True,
+            "report_count": match.report_count,
+            "changes": changes,
+            "notify": bool(changes)
+        })
+        return copy.deepcopy(match.eido), correlation
+    
+    def _uncorrelated(self, eido: Dict[str, Any]) -> Dict[str, Any]:
+        """Correlation outcome for a report treated as a new incident."""
+        return {
+            "incident_id": eido["eido"]["incident"]["incidentID"],
+            "duplicate": False,
+            "report_count": 1,
+            "changes": [],
+            "notify": True
+        }
+    
+    def _suppressed_notification_results(self, eido: Dict[str, Any], correlation: Dict[str, Any]) -> Dict[str, Any]:
+        """Notification results for a report that needs no new notifications."""
+        scope = eido["eido"]["notification"]["recommendedNotificationScope"]
+        return {
+            "incident_id": correlation["incident_id"],
+            "timestamp": datetime.datetime.now().isoformat(),
+            "notification_radius_meters": scope["radius_meters"],
+            "target_groups": scope["population"],
+            "recipients_count": 0,
+            "deliveries_count": 0,
+            "channels": {},
+            "notification_plan": [],
+            "notification_plan_truncated": False,
+            "suppressed": True,
+            "suppressed_reason": f"Duplicate report of active incident {correlation['incident_id']} with no material change"
+        }
+    
+    def _run_cached_stage(self, stage: str, text_key: str, compute, cached_stages: List[str]) -> Dict[str, Any]:
+        """
+        Return a stage result from the cache, or compute and cache it.
         
-        # Calculate processing times
-        processing_time = time.time() - start_time
-        notification_time = processing_time * 0.3  # Simulated notification planning time
+        Args:
+            stage: Stage name, part of the cache key
+            text_key: Hash of the normalized input text (for the EIDO, also of
+                the stage inputs)
+            compute: Zero-argument callable producing the stage result
+            cached_stages: List collecting the names of stages served from cache
+            
+        Returns:
+            A private copy of the stage result
+        """
+        cached = self.result_cache.get((stage, text_key))
+        if cached is not None:
+            cached_stages.append(stage)
+            return copy.deepcopy(cached)
+        
+        result = compute()
+        self.result_cache.set((stage, text_key), copy.deepcopy(result))
+        return result
+    
+    def _reissue_eido(self, eido: Dict[str, Any], text: str) -> None:
+        """
+        Give a cached EIDO new IDs and timestamps so it reads as a new submission.
         
-        # Assemble complete results
-        results = {
-            "eido": eido,
-            "notification_results": notification_results,
-            "processing_time": round(processing_time, 2),
-            "notification_time": round(notification_time, 2),
-            "location": location_info,
-            "classification": classification
-        }
+        Args:
+            eido: Copy of the cached EIDO, updated in place
+            text: The text as submitted this time
+        """
+        incident_id, eido_id = self._new_ids()
+        timestamp = datetime.datetime.now().isoformat()
         
-        return results
+        eido["eido"]["eidoID"] = eido_id
+        eido["eido"]["timestamp"] = timestamp
+        incident = eido["eido"]["incident"]
+        incident["incidentID"] = incident_id
+        incident["createdAt"] = timestamp
+        for entry in incident["details"]["timeline"]:
+            entry["timestamp"] = timestamp
+        incident["details"]["rawReport"] = text
+    
+    def _new_ids(self) -> Tuple[str, str]:
+        """Generate a new (incident ID, EIDO ID) pair."""
+        return generate_incident_id(), generate_eido_id()
     
     def _extract_location(self, text: str) -> Dict[str, Any]:
         """
@@ -126,102 +421,106 @@ class SafeCampusAgent:
         Returns:
             Dictionary with location data
         """
-        text_lower = text.lower()
+        # Single pass over the text for every gazetteer name
+        return self._location_from_mentions(self.location_matcher.find_all(text))
+    
+    def _location_from_mentions(self, mentions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build location information from the location mentions in a text.
         
-        # Check for known locations
-        for keyword, loc_data in self.known_locations.items():
-            if keyword.lower() in text_lower:
-                return {
-                    "lat": loc_data["lat"],
-                    "lng": loc_data["lng"],
-                    "name": loc_data["name"],
-                    "source": f"LLM extracted \"{keyword}\" from the text",
-                    "confidence": 0.92
-                }
+        Args:
+            mentions: Mentions found by the location matcher
+            
+        Returns:
+            Dictionary with location data
+        """
+        best = LocationMatcher.select_best(mentions)
+        
+        if best:
+            return {
+                "lat": best["lat"],
+                "lng": best["lng"],
+                "name": best["name"],
+                "source": f"LLM extracted \"{best['text']}\" from the text",
+                "confidence": 0.92,
+                "span": [best["start"], best["end"]],
+                "mentions": [
+                    {"name": m["name"], "text": m["text"], "start": m["start"], "end": m["end"]}
+                    for m in mentions
+                ]
+            }
         
         # Default to UCSD campus
+        return self._default_location()
+    
+    def _default_location(self, source: str = "Default location (no specific location found)") -> Dict[str, Any]:
+        """Location used when no specific location is known: the UCSD campus."""
         return {
             "lat": 32.8801,
             "lng": -117.2340,
             "name": "UC San Diego Campus",
-            "source": "Default location (no specific location found)",
-            "confidence": 0.6
+            "source": source,
+            "confidence": 0.6,
+            "span": None,
+            "mentions": []
         }
     
-    def _classify_incident(self, text: str) -> Dict[str, Any]:
+    def _classify_incident(self, text: str, hits: Optional[KeywordHits] = None,
+                           first_match: Optional[Callable[[re.Pattern], Optional[re.Match]]] = None) -> Dict[str, Any]:
         """
         Classify incident type and details from text (simulated LLM).
         
         Args:
             text: The text to analyze
+            hits: Keyword hits already collected for the text (e.g. by an
+                incremental scan); the text is scanned if omitted
+            first_match: Returns the first match of a detail pattern in the
+                text when already known (e.g. from an incremental scan); the
+                text is searched if omitted
             
         Returns:
             Dictionary with classification data
         """
-        text_lower = text.lower()
+        # One scan of the text scores every keyword rule set
+        if hits is None:
+            hits = get_keyword_scanner().scan(text)
+        if first_match is None:
+            first_match = lambda pattern: pattern.search(text)
         
         # Incident type classification based on keywords
         incident_type = "unknown"
         priority = 3
         confidence = 0.7
         
-        if re.search(r'fire|burning|flames|smoke', text_lower):
-            incident_type = "fire"
-            priority = 1
-            confidence = 0.95
-        elif re.search(r'gas leak|gas smell|fume|strong smell', text_lower):
-            incident_type = "hazard"
-            priority = 1
-            confidence = 0.93
-        elif re.search(r'suspicious|theft|steal|threat|weapon|gun', text_lower):
-            incident_type = "crime"
-            priority = 2
-            confidence = 0.88
-        elif re.search(r'injured|hurt|medical|ambulance|blood', text_lower):
-            incident_type = "medical"
-            priority = 2
-            confidence = 0.91
-        elif re.search(r'leak|chemical|hazard|spill', text_lower):
-            incident_type = "hazard"
-            priority = 1
-            confidence = 0.89
-        elif re.search(r'power|outage|electricity', text_lower):
-            incident_type = "infrastructure"
-            priority = 3
-            confidence = 0.85
+        type_rule = hits.first("agent.incident_type")
+        if type_rule:
+            incident_type = type_rule["label"]
+            priority = type_rule["priority"]
+            confidence = type_rule["confidence"]
         
         # Determine subtype
         subtype = ""
+        subtype_rule = None
         if incident_type == "crime":
-            if re.search(r'theft|steal|took|missing', text_lower):
-                subtype = "theft"
-            elif re.search(r'suspicious|strange|odd', text_lower):
-                subtype = "suspicious_person"
-            elif re.search(r'assault|attack|hit|punch', text_lower):
-                subtype = "assault"
-            elif re.search(r'break|broke|breaking', text_lower):
-                subtype = "break_in"
+            subtype_rule = hits.first("agent.crime_subtype")
         elif incident_type == "hazard":
-            if re.search(r'gas|smell', text_lower):
-                subtype = "gas_leak"
-            elif re.search(r'chemical|spill', text_lower):
-                subtype = "chemical_spill"
-            elif re.search(r'water|flood', text_lower):
-                subtype = "flooding"
+            subtype_rule = hits.first("agent.hazard_subtype")
+        if subtype_rule:
+            subtype = subtype_rule["label"]
         
         # Extract victim info
         victim_count = 0
         victim_details = ""
-        if re.search(r'injured|hurt|victim|bleeding', text_lower):
-            victim_match = re.search(r'(\d+)\s+(?:person|people|individuals|victims)', text_lower)
+        if hits.matched("agent.victims"):
+            victim_match = first_match(VICTIM_COUNT_RE)
             victim_count = int(victim_match.group(1)) if victim_match else 1
             victim_details = "Details extracted from text"
         
         # Extract suspect info
         suspect_info = ""
-        weapons_involved = bool(re.search(r'weapon|gun|knife|armed', text_lower))
-        if re.search(r'suspect|suspicious|man|woman|person|wearing', text_lower):
-            description_match = re.search(r'wearing[^.]*', text, re.I)
+        weapons_involved = hits.matched("weapons")
+        if hits.matched("agent.suspects"):
+            description_match = first_match(SUSPECT_DESCRIPTION_RE)
             if description_match:
                 suspect_info = description_match.group(0)
             else:
@@ -253,6 +552,21 @@ class SafeCampusAgent:
             "analysis": f"LLM classified this as a {incident_type} incident with {confidence:.2f} confidence."
         }
     
+    def _fallback_classification(self) -> Dict[str, Any]:
+        """Classification used when the classification stage fails or times out."""
+        return {
+            "incidentType": "unknown",
+            "subtype": "",
+            "priority": 3,
+            "confidence": 0.0,
+            "victimCount": 0,
+            "victimDetails": "",
+            "suspectInfo": "",
+            "weaponsInvolved": False,
+            "keyDetails": ["Incident reported", "Details pending"],
+            "analysis": "Classification unavailable; using defaults."
+        }
+    
     def _generate_eido(self, text: str, location: Dict[str, Any], classification: Dict[str, Any], is_report=False) -> Dict[str, Any]:
         """
         Generate a standardized EIDO object from processed information.
@@ -266,24 +580,9 @@ class SafeCampusAgent:
         Returns:
             EIDO object dictionary
         """
-        incident_id = f"INC-{int(time.time())}"
-        eido_id = f"EIDO-{int(time.time())}"
+        incident_id, eido_id = self._new_ids()
         timestamp = datetime.datetime.now().isoformat()
         
-        # Get recommended actions based on incident type and priority
-        recommended_actions = self._get_recommended_actions(
-            classification["incidentType"], 
-            classification["priority"]
-        )
-        
-        # Determine notification scope
-        notification_scope = {
-            "geographic": self._get_geographic_scope(classification["incidentType"], classification["priority"]),
-            "radius_meters": self._get_notification_radius(classification["incidentType"], classification["priority"]),
-            "population": self._get_target_population(classification["incidentType"], classification["priority"]),
-            "notify_authorities": True
-        }
-        
         # Create the EIDO object
         eido = {
             "eido": {
@@ -333,16 +632,25 @@ class SafeCampusAgent:
                         "rawReport": text
                     }
                 },
-                "notification": {
-                    "recommendedActions": recommended_actions,
-                    "recommendedNotificationScope": notification_scope,
-                    "updateFrequency": "as_needed"
-                }
+                "notification": self._notification_recommendations(classification["incidentType"], classification["priority"])
             }
         }
         
         return eido
     
+    def _notification_recommendations(self, incident_type: str, priority: int) -> Dict[str, Any]:
+        """Build the notification section of an EIDO for an incident type and priority."""
+        return {
+            "recommendedActions": self._get_recommended_actions(incident_type, priority),
+            "recommendedNotificationScope": {
+                "geographic": self._get_geographic_scope(incident_type, priority),
+                "radius_meters": self._get_notification_radius(incident_type, priority),
+                "population": self._get_target_population(incident_type, priority),
+                "notify_authorities": True
+            },
+            "updateFrequency": "as_needed"
+        }
+    
     def _generate_notification_plan(self, eido: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a notification plan based on the EIDO.
@@ -367,16 +675,21 @@ class SafeCampusAgent:
         }
         
         # Create notification plan
-        notification_plan = self._create_notification_plan(eido)
+        plan = self._create_notification_plan(eido)
         
-        # Assemble notification results
+        # Assemble notification results; the plan itself can cover the whole
+        # campus, so only a preview of per-recipient entries is included
         notification_results = {
             "incident_id": incident["incidentID"],
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": plan.timestamp,
             "notification_radius_meters": notification_recommendations["recommendedNotificationScope"]["radius_meters"],
             "target_groups": notification_recommendations["recommendedNotificationScope"]["population"],
-            "recipients_count": len(notification_plan),
-            "notification_plan": notification_plan,
+            "recipients_count": plan.recipients_count,
+            "deliveries_count": plan.deliveries_count,
+            "channels": plan.channel_counts(),
+            "notification_plan": plan.entries(limit=NOTIFICATION_PREVIEW_LIMIT),
+            "notification_plan_truncated": plan.deliveries_count > NOTIFICATION_PREVIEW_LIMIT,
+            "planning_time_ms": round(plan.planning_time_ms, 2),
             "content": content
         }
         
@@ -442,63 +755,30 @@ class SafeCampusAgent:
     
     def _map_priority_to_severity(self, priority: int) -> str:
         """Map numerical priority to text severity."""
-        severity_map = {
-            1: "CRITICAL",
-            2: "HIGH",
-            3: "MEDIUM",
-            4: "LOW",
-            5: "INFORMATION"
-        }
-        return severity_map.get(priority, "MEDIUM")
+        return SEVERITY_NAMES.get(priority, "MEDIUM")
     
-    def _create_notification_plan(self, eido: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _create_notification_plan(self, eido: Dict[str, Any]) -> NotificationPlan:
         """
-        Create a detailed notification plan based on the EIDO.
+        Create a notification plan for the EIDO against the recipient directory.
         
         Args:
             eido: The EIDO object
             
         Returns:
-            List of notification instructions
-        """
-        channels = ["sms", "email", "app_push", "phone"]
-        plan = []
-        
-        # Sample recipients
-        recipients = [
-            {"id": "r001", "name": "Chief Roberts", "role": "campus_police_chief"},
-            {"id": "r002", "name": "Officer Garcia", "role": "campus_police"},
-            {"id": "r003", "name": "Dr. Chen", "role": "dean"},
-            {"id": "r004", "name": "Facilities Team", "role": "facilities"},
-            {"id": "r005", "name": "Campus Security", "role": "security"},
-            {"id": "r006", "name": "Student Health Center", "role": "health_services"},
-            {"id": "r007", "name": "Environmental Safety", "role": "environmental_safety"},
-            {"id": "s001", "name": "Alex Smith", "role": "student"},
-            {"id": "s002", "name": "Jordan Lee", "role": "student"},
-            {"id": "s003", "name": "Taylor Wilson", "role": "student"}
-        ]
-        
-        # Determine which channels to use based on priority
-        priority = eido["eido"]["incident"]["priority"]
-        channels_to_use = []
-        
-        if priority == 1:
-            channels_to_use = channels  # Use all channels for highest priority
-        elif priority == 2:
-            channels_to_use = ["sms", "app_push", "email"]  # Use most channels for high priority
-        else:
-            channels_to_use = ["app_push", "email"]  # Use fewer channels for lower priority
-        
-        # Create notification entries
-        for recipient in recipients:
-            for channel in channels_to_use:
-                plan.append({
-                    "recipient_id": recipient["id"],
-                    "recipient_name": recipient["name"],
-                    "channel": channel,
-                    "message": f"{eido['eido']['incident']['incidentType'].upper()} ALERT: Incident at {eido['eido']['incident']['location']['address']['fullAddress']}. {eido['eido']['notification']['recommendedActions'][0]}",
-                    "priority": priority,
-                    "timestamp": datetime.datetime.now().isoformat()
-                })
-        
-        return plan
\ No newline at end of file
+            NotificationPlan batching the selected recipients by channel
+        """
+        incident = eido["eido"]["incident"]
+        notification = eido["eido"]["notification"]
+        coordinates = incident["location"]["coordinates"]
+        scope = notification["recommendedNotificationScope"]
+        
+        message = f"{incident['incidentType'].upper()} ALERT: Incident at {incident['location']['address']['fullAddress']}. {notification['recommendedActions'][0]}"
+        
+        return self.notification_planner.plan(
+            coordinates["latitude"],
+            coordinates["longitude"],
+            scope["radius_meters"],
+            scope["population"],
+            incident["priority"],
+            message
+        )
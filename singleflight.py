@@ -0,0 +1,66 @@
+# singleflight.py
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each running it. This prevents thundering-herd spikes when many
+dashboard clients request the same expensive result at the same moment,
+e.g. right after the data file is reloaded.
+"""
+
+import asyncio
+import functools
+from typing import Any, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one computation.
+
+    The computation runs in the default thread pool so that waiting callers
+    keep the event loop free. Results are not cached: once the computation
+    finishes, the next call with the same key starts a new one.
+    """
+
+    def __init__(self):
+        """Initialize the single-flight group."""
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"executed": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) once for all concurrent callers using the same key.
+
+        Args:
+            key: Hashable identity of the computation
+            fn: Synchronous function to run
+            *args, **kwargs: Arguments passed to fn
+
+        Returns:
+            The shared result. Exceptions are propagated to every waiting caller.
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(loop.run_in_executor(None, functools.partial(fn, *args, **kwargs)))
+            self._in_flight[key] = future
+            future.add_done_callback(functools.partial(self._finish, key))
+            self.stats["executed"] += 1
+        else:
+            self.stats["shared"] += 1
+
+        # Every caller (including the one that started the computation) waits
+        # through a shield, so a disconnecting client never cancels the work
+        # that other callers are waiting on
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        """Forget a finished computation so the next call starts a new one."""
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    def in_flight(self) -> int:
+        """Number of computations currently running."""
+        return len(self._in_flight)
@@ -0,0 +1,164 @@
+# startup.py
+"""
+Import-time report for the Safe Campus Agent.
+
+Measures the cold import cost of the application modules in fresh
+interpreters (using ``python -X importtime``) and optionally enforces a
+startup budget, so regressions in cold-start time fail CI or a deploy check.
+
+Usage:
+    python startup.py                         # report for the default modules
+    python startup.py --budget-ms 400         # exit 1 if any module exceeds 400 ms
+    python startup.py app --top 15 --json     # detailed JSON report for app.py
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional
+
+# Modules imported by the web app and the CLI tools
+DEFAULT_MODULES = [
+    "app",
+    "safe_campus_agent",
+    "eido.emergency_call_processor",
+    "eido.report_classifier",
+    "geocoding.geocode",
+]
+
+def measure_import_time(module: str, python: str = sys.executable) -> Dict[str, Any]:
+    """
+    Measure the cold import time of a module in a fresh interpreter.
+
+    Args:
+        module: Dotted module name to import
+        python: Python executable to use
+
+    Returns:
+        Dictionary with the total import time and the per-module breakdown
+    """
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+    # "import a.b" imports "a" and then "a.b" at the top level; everything the
+    # interpreter imported on its own during startup is excluded from the total
+    parts = module.split(".")
+    targets = {".".join(parts[:i]) for i in range(1, len(parts) + 1)}
+
+    entries = []
+    group = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            entry = {
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2
+            }
+        except ValueError:
+            continue
+
+        # Entries are reported children-first, so a top-level entry closes its group
+        group.append(entry)
+        if entry["depth"] == 0:
+            if entry["module"] in targets:
+                entries.extend(group)
+                total_us += int(cumulative_us)
+            group = []
+
+    result = {
+        "module": module,
+        "total_ms": round(total_us / 1000, 2),
+        "imports": entries
+    }
+
+    if proc.returncode != 0:
+        # Keep the last line of the traceback, e.g. "ModuleNotFoundError: ..."
+        errors = [line for line in proc.stderr.splitlines() if line and not line.startswith("import time:")]
+        result["error"] = errors[-1] if errors else f"exit code {proc.returncode}"
+
+    return result
+
+def build_import_report(modules: List[str], top: int = 10, budget_ms: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Build an import-time report for several modules.
+
+    Args:
+        modules: Modules to measure
+        top: Number of heaviest imports to list per module
+        budget_ms: Optional per-module budget in milliseconds
+
+    Returns:
+        Report dictionary with an overall "ok" flag
+    """
+    report = {"budget_ms": budget_ms, "modules": [], "ok": True}
+
+    for module in modules:
+        measurement = measure_import_time(module)
+        heaviest = sorted(measurement["imports"], key=lambda e: e["self_ms"], reverse=True)[:top]
+
+        over_budget = budget_ms is not None and measurement["total_ms"] > budget_ms
+        failed = "error" in measurement
+        if over_budget or failed:
+            report["ok"] = False
+
+        entry = {
+            "module": module,
+            "total_ms": measurement["total_ms"],
+            "over_budget": over_budget,
+            "heaviest": [{"module": e["module"], "self_ms": e["self_ms"]} for e in heaviest]
+        }
+        if failed:
+            entry["error"] = measurement["error"]
+        report["modules"].append(entry)
+
+    return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print an import-time report in a human readable form."""
+    budget = report["budget_ms"]
+    print(f"Import-time report (budget: {f'{budget:.0f} ms' if budget is not None else 'none'})")
+
+    for entry in report["modules"]:
+        status = "OVER BUDGET" if entry["over_budget"] else "ok"
+        if "error" in entry:
+            status = f"FAILED ({entry['error']})"
+        print(f"\n{entry['module']}: {entry['total_ms']:.1f} ms [{status}]")
+        for heavy in entry["heaviest"]:
+            print(f"    {heavy['self_ms']:8.1f} ms  {heavy['module']}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Report and enforce module import times.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to measure")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ["STARTUP_IMPORT_BUDGET_MS"]) if os.environ.get("STARTUP_IMPORT_BUDGET_MS") else None,
+        help="Fail if any module takes longer than this to import (default: $STARTUP_IMPORT_BUDGET_MS)"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to show")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = build_import_report(args.modules, top=args.top, budget_ms=args.budget_ms)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    return 0 if report["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
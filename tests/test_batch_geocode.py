@@ -0,0 +1,106 @@
+"""Tests for batch geocoding and the remote (LLM) geocoding tier."""
+
+import pytest
+
+import geocoding.geocode as geocode
+import geocoding.providers.mistral as mistral_provider
+from geocoding.cache import DEFAULT_TIER, GeocodeCache
+from geocoding.locations import LocationDatabase
+
+GEISEL = (32.8810, -117.2370)
+SAN_DIEGO = (32.7157, -117.1611)
+
+
+@pytest.fixture
+def geocoder(monkeypatch, tmp_path):
+    cache = GeocodeCache(str(tmp_path / "geocode_cache.db"))
+    monkeypatch.setattr(geocode, "get_geocode_cache", lambda: cache)
+    monkeypatch.setattr(geocode, "_location_db", LocationDatabase())
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Fake Mistral provider recording every batch it is asked to place."""
+    answers = {}
+    calls = []
+
+    def fake_geocode(location_texts):
+        calls.append(list(location_texts))
+        return {text: answers[text] for text in location_texts if text in answers}
+
+    monkeypatch.setattr(mistral_provider, "geocode_unknown_locations_with_mistral", fake_geocode)
+    return answers, calls
+
+
+def near(coordinates, base, tolerance=0.001):
+    return abs(coordinates["lat"] - base[0]) < tolerance and abs(coordinates["lng"] - base[1]) < tolerance
+
+
+def test_inputs_are_normalized_and_resolved_once(geocoder, monkeypatch):
+    resolved = []
+    resolve_location = geocode.resolve_location
+
+    def counting_resolve(key):
+        resolved.append(key)
+        return resolve_location(key)
+
+    monkeypatch.setattr(geocode, "resolve_location", counting_resolve)
+
+    results = geocode.batch_geocode(["Geisel Library", "  geisel   LIBRARY ", "Geisel Library", "", "Price Center"])
+
+    assert resolved == ["geisel library", "price center"]
+    assert set(results) == {"Geisel Library", "  geisel   LIBRARY ", "Price Center"}
+    assert near(results["  geisel   LIBRARY "], GEISEL)
+
+
+def test_each_text_is_jittered_separately(geocoder):
+    results = geocode.batch_geocode(["Geisel Library", "geisel library"])
+
+    assert results["Geisel Library"] != results["geisel library"]
+    assert near(results["Geisel Library"], GEISEL)
+    assert near(results["geisel library"], GEISEL)
+
+
+def test_unresolved_texts_get_default_coordinates_without_remote(geocoder, provider):
+    _, calls = provider
+
+    results = geocode.batch_geocode(["xyzzy blorp"])
+
+    assert calls == []
+    assert near(results["xyzzy blorp"], SAN_DIEGO, tolerance=0.02)
+    assert geocoder.get("xyzzy blorp", geocode._cache_generation()).tier == DEFAULT_TIER
+
+
+def test_remote_places_only_unresolved_texts_and_caches_them(geocoder, provider):
+    answers, calls = provider
+    answers["Torrey Pines Gliderport"] = {"lat": 32.8899, "lng": -117.2517}
+
+    results = geocode.batch_geocode(["Geisel Library", "Torrey Pines Gliderport", "torrey pines  gliderport"],
+                                    remote=True)
+
+    # First spelling of each unresolved location only
+    assert calls == [["Torrey Pines Gliderport"]]
+    assert near(results["Torrey Pines Gliderport"], (32.8899, -117.2517))
+    assert near(results["torrey pines  gliderport"], (32.8899, -117.2517))
+
+    entry = geocoder.get("torrey pines gliderport", geocode._cache_generation())
+    assert (entry.lat, entry.lng, entry.tier) == (32.8899, -117.2517, geocode.REMOTE_TIER)
+
+    # Served from the cache afterwards
+    geocode.batch_geocode(["Torrey Pines Gliderport"], remote=True)
+    assert len(calls) == 1
+
+
+def test_remote_fallback_coordinates_count_as_unresolved(geocoder, provider):
+    answers, calls = provider
+    answers["xyzzy blorp"] = {"lat": geocode.REMOTE_FALLBACK_COORDINATES[0],
+                              "lng": geocode.REMOTE_FALLBACK_COORDINATES[1]}
+
+    results = geocode.batch_geocode(["xyzzy blorp", "nowhere at all"], remote=True)
+
+    assert calls == [["xyzzy blorp", "nowhere at all"]]
+    assert near(results["xyzzy blorp"], SAN_DIEGO, tolerance=0.02)
+    assert near(results["nowhere at all"], SAN_DIEGO, tolerance=0.02)
+    assert geocoder.get("xyzzy blorp", geocode._cache_generation()).tier == DEFAULT_TIER
@@ -0,0 +1,167 @@
+"""Tests for deadline-bounded LLM calls under concurrency."""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import eido.emergency_call_processor as ecp
+import geocoding.geocode as geocode
+from eido.emergency_call_processor import EmergencyCallProcessor
+from geocoding.cache import GeocodeCache
+from geocoding.locations import LocationDatabase
+import llm.deadline
+from llm.client import LLMClient
+from llm.deadline import call_with_deadline, remaining_budget
+from notification.directory import RecipientDirectory
+from notification.planner import NotificationPlanner
+from pipeline import get_executor
+
+TRANSCRIPT = """Dispatcher: 911, what is your emergency?
+Caller: There's smoke coming out of the third floor of Geisel Library.
+Dispatcher: Is anyone hurt?
+Caller: I don't think so, people are leaving the building."""
+
+
+class SlowClient:
+    """Fake LLM client answering after a fixed delay."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def chat(self, messages, model=None, **kwargs):
+        time.sleep(self.delay)
+        return json.dumps({
+            "incident_type": "fire",
+            "priority": 2,
+            "location": "Geisel Library",
+            "immediate_danger": True,
+            "weapons_involved": False,
+            "incident_subtype": "smoke",
+            "key_details": ["smoke on the third floor"]
+        })
+
+    def invalidate(self, messages, model=None, **kwargs):
+        pass
+
+
+@pytest.fixture
+def isolated_geocoding(monkeypatch, tmp_path):
+    # Keep the geocode cache and location storage out of the repository's data/
+    cache = GeocodeCache(str(tmp_path / "geocode_cache.db"))
+    monkeypatch.setattr(geocode, "get_geocode_cache", lambda: cache)
+    monkeypatch.setattr(geocode, "_location_db", LocationDatabase())
+    yield
+    cache.close()
+
+
+def test_call_with_deadline_from_pipeline_threads_is_not_starved():
+    # More concurrent callers than pipeline workers, each waiting on an LLM call
+    def call():
+        return call_with_deadline(lambda: time.sleep(0.3) or "llm", lambda: "fallback", deadline_seconds=2)
+
+    futures = [get_executor().submit(call) for _ in range(16)]
+    races = [future.result(timeout=10) for future in futures]
+
+    assert [race.source for race in races] == ["llm"] * 16
+    assert not any(race.timed_out for race in races)
+
+
+def test_call_with_deadline_falls_back_on_timeout_and_delivers_late_result():
+    late = []
+    race = call_with_deadline(lambda: time.sleep(0.3) or "llm", lambda: "fallback",
+                              deadline_seconds=0.05, on_late_result=late.append)
+
+    assert race.source == "fallback"
+    assert race.value == "fallback"
+    assert race.timed_out
+    race.pending.result(timeout=5)
+    assert late == ["llm"]
+
+
+def test_call_with_deadline_falls_back_on_error():
+    def fail():
+        raise RuntimeError("boom")
+
+    race = call_with_deadline(fail, lambda: "fallback", deadline_seconds=2)
+
+    assert race.source == "fallback"
+    assert "boom" in race.error
+
+
+class HangingClient(LLMClient):
+    """LLM client whose requests never answer; records cancellations."""
+
+    def __init__(self):
+        super().__init__(api_key="test")
+        self.cancelled = []
+
+    async def chat_async(self, messages, model=None, **kwargs):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled.append("chat")
+            raise
+
+    async def stream_chat_async(self, messages, model=None, **kwargs):
+        yield "{"
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled.append("stream")
+            raise
+
+
+def test_abandoned_llm_calls_free_their_worker(monkeypatch):
+    monkeypatch.setattr(llm.deadline, "LLM_LATE_RESULT_GRACE_SECONDS", 0.2)
+    client = HangingClient()
+    messages = [{"role": "user", "content": "hello"}]
+
+    def stream():
+        return "".join(client.stream_chat(messages))
+
+    races = [call_with_deadline(lambda: client.chat(messages), lambda: "fallback", deadline_seconds=0.1),
+             call_with_deadline(stream, lambda: "fallback", deadline_seconds=0.1)]
+
+    assert [race.source for race in races] == ["fallback", "fallback"]
+    # The workers give up once the deadline and grace period have passed
+    for race in races:
+        assert isinstance(race.pending.exception(timeout=2), TimeoutError)
+    time.sleep(0.05)
+    assert sorted(client.cancelled) == ["chat", "stream"]
+    client.close()
+
+
+def test_calls_outside_a_deadline_have_no_budget():
+    assert remaining_budget() is None
+    race = call_with_deadline(remaining_budget, lambda: None, deadline_seconds=1)
+    assert 1 < race.value <= 1 + llm.deadline.LLM_LATE_RESULT_GRACE_SECONDS
+
+
+def test_concurrent_calls_use_the_llm_result(monkeypatch, isolated_geocoding):
+    sources = []
+
+    def recording_call_with_deadline(*args, **kwargs):
+        race = call_with_deadline(*args, **kwargs)
+        sources.append(race.source)
+        return race
+
+    monkeypatch.setattr(ecp, "call_with_deadline", recording_call_with_deadline)
+    processor = EmergencyCallProcessor(
+        api_key="test",
+        notification_planner=NotificationPlanner(RecipientDirectory.synthetic(200)),
+        llm_deadline_seconds=2,
+        streaming=False,
+        tiered=False
+    )
+    processor.client = SlowClient(0.3)
+
+    with ThreadPoolExecutor(max_workers=16) as callers:
+        results = list(callers.map(processor.process_call_with_notifications, [TRANSCRIPT] * 16))
+
+    assert sources == ["llm"] * 16
+    for result in results:
+        assert result["eido"]["eido"]["incident"]["priority"] == 2
+        assert result["speculation"]["speculative_plan_ready_ms"] is not None
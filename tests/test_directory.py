@@ -0,0 +1,52 @@
+"""Tests for loading the notification recipient directory."""
+
+import logging
+
+import pytest
+
+from notification.directory import RecipientDirectory, load_default_directory
+from notification.planner import NotificationPlanner
+from notification.recipients import RecipientManager
+
+
+@pytest.fixture(autouse=True)
+def no_directory_configured(monkeypatch):
+    monkeypatch.delenv("SAFE_CAMPUS_RECIPIENTS_PATH", raising=False)
+    monkeypatch.delenv("SAFE_CAMPUS_SYNTHETIC_POPULATION", raising=False)
+
+
+def test_unconfigured_directory_is_empty_and_logged(caplog):
+    with caplog.at_level(logging.ERROR, logger="notification.directory"):
+        directory = load_default_directory()
+
+    assert len(directory) == 0
+    assert "No recipient directory configured" in caplog.text
+    plan = NotificationPlanner(directory).plan(32.8812, -117.2376, 1000, ["all_students"], 1, "Test alert", hour=12)
+    assert plan.recipients_count == 0
+
+
+def test_synthetic_population_requires_opt_in(monkeypatch, caplog):
+    monkeypatch.setenv("SAFE_CAMPUS_SYNTHETIC_POPULATION", "200")
+    with caplog.at_level(logging.WARNING, logger="notification.directory"):
+        directory = load_default_directory()
+
+    assert len(directory) > 0
+    assert "SYNTHETIC" in caplog.text
+
+
+def test_recipients_file_is_loaded(monkeypatch, tmp_path):
+    path = str(tmp_path / "recipients.json")
+    manager = RecipientManager(path)
+    monkeypatch.setenv("SAFE_CAMPUS_RECIPIENTS_PATH", path)
+    monkeypatch.setenv("SAFE_CAMPUS_SYNTHETIC_POPULATION", "200")
+
+    directory = load_default_directory()
+
+    assert len(directory) == len(manager.get_all_recipients()) > 0
+
+
+def test_missing_recipients_file_fails(monkeypatch, tmp_path):
+    monkeypatch.setenv("SAFE_CAMPUS_RECIPIENTS_PATH", str(tmp_path / "missing.json"))
+
+    with pytest.raises(FileNotFoundError):
+        load_default_directory()
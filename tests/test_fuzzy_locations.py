@@ -0,0 +1,51 @@
+"""Tests for fuzzy, typo-tolerant location lookup."""
+
+import pytest
+
+from geocoding.locations import LocationDatabase, LocationTokenIndex, edit_distance
+
+
+@pytest.fixture(scope="module")
+def database():
+    return LocationDatabase()
+
+
+@pytest.mark.parametrize("text, name", [
+    ("Giesel Library", "Geisel Library"),
+    ("Prize Center", "Price Center"),
+    ("Pepper Cyn", "Pepper Canyon"),
+    ("Rimac", "RIMAC Arena"),
+    ("near the giesel libary", "Geisel Library")
+])
+def test_misspelled_names_are_found(database, text, name):
+    assert database.fuzzy_lookup(text)["name"] == name
+
+
+def test_unrelated_text_has_no_match(database):
+    assert database.fuzzy_lookup("xyzzy blorp") is None
+
+
+def test_edit_distance_stops_at_the_limit():
+    assert edit_distance("prize", "price", 1) == 1
+    # A transposition is one edit
+    assert edit_distance("giesel", "geisel", 2) == 1
+    assert edit_distance("library", "canyon", 2) > 2
+
+
+def test_short_tokens_are_not_corrected():
+    index = LocationTokenIndex({"Price Center": {"lat": 32.8794, "lng": -117.2359}})
+
+    assert index.spellings("price") == [("price", 1.0)]
+    assert index.spellings("pce") == []
+    assert index.lookup("pce") is None
+
+
+def test_rare_tokens_outrank_common_ones():
+    index = LocationTokenIndex({
+        "York Hall": {"lat": 1.0, "lng": 1.0},
+        "Galbraith Hall": {"lat": 2.0, "lng": 2.0},
+        "Mandeville Center": {"lat": 3.0, "lng": 3.0}
+    })
+
+    assert index.lookup("the hall near galbraith")["name"] == "Galbraith Hall"
+    assert [match["name"] for match in index.search("hall")] == ["York Hall", "Galbraith Hall"]
@@ -0,0 +1,90 @@
+"""Tests for the two-level geocode cache."""
+
+import pytest
+
+import geocoding.cache
+import geocoding.geocode as geocode
+from geocoding.cache import DEFAULT_TIER, GeocodeCache, normalize_location_text
+from geocoding.locations import LocationDatabase
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(geocoding.cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_keys_ignore_case_and_whitespace():
+    assert normalize_location_text("  Geisel\n Library ") == normalize_location_text("geisel library")
+
+
+def test_disk_entries_survive_the_memory_level(tmp_path):
+    path = str(tmp_path / "geocode.db")
+    cache = GeocodeCache(path, max_memory_entries=1)
+    cache.put("geisel library", 32.881, -117.237, "campus", "g1")
+    cache.put("price center", 32.879, -117.236, "campus", "g1")
+
+    # Evicted from memory, still on disk
+    assert cache.get("geisel library", "g1").lat == 32.881
+    assert cache.stats["disk_hits"] == 1
+    cache.close()
+
+    reopened = GeocodeCache(path)
+    assert reopened.get("price center", "g1").tier == "campus"
+    reopened.close()
+
+
+def test_entries_from_another_generation_are_ignored():
+    cache = GeocodeCache(":memory:")
+    cache.put("geisel library", 32.881, -117.237, "campus", "g1")
+
+    assert cache.get("geisel library", "g2") is None
+    assert cache.stats["misses"] == 1
+
+
+def test_negative_entries_expire_sooner(clock):
+    cache = GeocodeCache(None, ttl_seconds=100, negative_ttl_seconds=10)
+    cache.put("found", 32.881, -117.237, "fuzzy", "g1")
+    cache.put("nowhere", None, None, DEFAULT_TIER, "g1")
+
+    assert cache.get("nowhere", "g1").negative
+    assert cache.stats["negative_hits"] == 1
+    clock[0] += 11
+    assert cache.get("nowhere", "g1") is None
+    assert cache.get("found", "g1") is not None
+    clock[0] += 90
+    assert cache.get("found", "g1") is None
+
+
+@pytest.fixture
+def geocoder(monkeypatch):
+    cache = GeocodeCache(":memory:")
+    monkeypatch.setattr(geocode, "get_geocode_cache", lambda: cache)
+    monkeypatch.setattr(geocode, "_location_db", LocationDatabase())
+    return cache
+
+
+def test_resolved_locations_are_cached_and_jittered_per_lookup(geocoder):
+    assert geocode.resolve_location("Geisel Library") == ((32.8810, -117.2370), "campus")
+    assert geocode.resolve_location("geisel  LIBRARY") == ((32.8810, -117.2370), "campus")
+    assert geocoder.stats["memory_hits"] == 1
+
+    first = geocode.geocode_location("Geisel Library")
+    second = geocode.geocode_location("Geisel Library")
+    assert first != second
+    assert abs(first["lat"] - 32.8810) < 0.001
+
+
+def test_unknown_locations_are_cached_as_negative(geocoder):
+    assert geocode.resolve_location("xyzzy blorp") == (None, DEFAULT_TIER)
+    assert geocode.resolve_location("xyzzy blorp") == (None, DEFAULT_TIER)
+    assert geocoder.stats["negative_hits"] == 1
+
+
+def test_changing_the_location_data_invalidates_entries(geocoder):
+    geocode.resolve_location("Pepper Canyon")
+    geocode.get_location_database().revision += 1
+    geocode.get_location_database().known_locations["Pepper Canyon"]["lat"] = 32.0
+
+    assert geocode.resolve_location("Pepper Canyon")[0][0] == 32.0
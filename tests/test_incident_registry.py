@@ -0,0 +1,149 @@
+"""Tests for folding duplicate reports into active incidents."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from eido.eido_schema import create_empty_eido
+from eido.incident_registry import IncidentRegistry
+from eido.incident_store import IncidentStore
+from notification.directory import RecipientDirectory
+from safe_campus_agent import SafeCampusAgent
+
+GEISEL = (32.8812, -117.2376)
+NOW = 1_000_000.0
+
+
+def make_eido(incident_type="fire", lat=GEISEL[0], lng=GEISEL[1], priority=3, victims=0, weapons=False, raw=""):
+    eido = create_empty_eido()
+    incident = eido["eido"]["incident"]
+    incident["incidentType"] = incident_type
+    incident["priority"] = priority
+    incident["location"]["coordinates"] = {"latitude": lat, "longitude": lng}
+    incident["details"]["victims"]["count"] = victims
+    incident["details"]["suspects"]["weaponsInvolved"] = weapons
+    incident["details"]["rawReport"] = raw
+    return eido
+
+
+@pytest.fixture
+def registry():
+    return IncidentRegistry(match_radius_meters=250, window_seconds=900)
+
+
+def test_nearby_report_of_the_same_type_matches(registry):
+    record = registry.register(make_eido(), when=NOW)
+
+    # About 100m away, a few minutes later
+    assert registry.find_match("fire", GEISEL[0] + 0.0009, GEISEL[1], when=NOW + 300) is record
+
+
+def test_other_type_place_or_time_does_not_match(registry):
+    registry.register(make_eido(), when=NOW)
+
+    assert registry.find_match("medical", *GEISEL, when=NOW + 60) is None
+    # About 1km away
+    assert registry.find_match("fire", GEISEL[0] + 0.009, GEISEL[1], when=NOW + 60) is None
+    assert registry.find_match("fire", *GEISEL, when=NOW + 901) is None
+
+
+def test_nearest_incident_wins(registry):
+    registry.register(make_eido(lat=GEISEL[0] + 0.0015), when=NOW)
+    near = registry.register(make_eido(lat=GEISEL[0] + 0.0002), when=NOW)
+
+    assert registry.find_match("fire", *GEISEL, when=NOW + 10) is near
+
+
+def test_confirming_report_is_folded_without_renotifying(registry):
+    record = registry.register(make_eido(), when=NOW)
+    changes = registry.fold(record, make_eido(raw="I see smoke too"), when=NOW + 60)
+
+    assert changes == []
+    assert record.report_count == 2
+    assert record.eido["eido"]["incident"]["details"]["reportCount"] == 2
+    assert record.eido["eido"]["incident"]["details"]["timeline"][-1]["notes"] == "I see smoke too"
+    assert registry.stats == {"created": 1, "folded": 1, "updated": 0, "renotified": 0}
+
+
+def test_material_changes_renotify_and_priority_only_escalates(registry):
+    record = registry.register(make_eido(priority=3), when=NOW)
+    escalation = make_eido(priority=1, victims=2, weapons=True)
+    escalation["eido"]["notification"]["recommendedNotificationScope"]["radius_meters"] = 500
+
+    changes = registry.fold(record, escalation, when=NOW + 60)
+    assert set(changes) == {"priority", "radius", "weapons", "victims"}
+    incident = record.eido["eido"]["incident"]
+    assert incident["priority"] == 1
+    assert incident["incidentID"] == record.incident_id
+
+    # A later, lower-priority report changes nothing
+    assert registry.fold(record, make_eido(priority=4), when=NOW + 120) == []
+    assert record.eido["eido"]["incident"]["priority"] == 1
+    assert registry.stats["renotified"] == 1
+
+
+def test_update_merges_without_counting_a_report(registry):
+    record = registry.register(make_eido(), when=NOW)
+
+    assert registry.update(record, make_eido(victims=1), when=NOW + 5) == ["victims"]
+    assert record.report_count == 1
+    assert "reportCount" not in record.eido["eido"]["incident"]["details"]
+    assert registry.stats["updated"] == 1
+
+
+def test_activity_keeps_an_incident_matchable(registry):
+    record = registry.register(make_eido(), when=NOW)
+    registry.fold(record, make_eido(), when=NOW + 800)
+
+    assert registry.find_match("fire", *GEISEL, when=NOW + 1500) is record
+
+
+def test_stale_incidents_are_pruned(registry):
+    registry.register(make_eido(), when=NOW)
+    registry.register(make_eido(lat=32.8797, lng=-117.2362, incident_type="medical"), when=NOW + 2000)
+
+    assert len(registry) == 1
+
+
+def test_concurrent_reports_create_one_incident(registry):
+    barrier = threading.Barrier(16)
+    outcomes = []
+
+    def report():
+        barrier.wait()
+        outcomes.append(registry.match_or_register(make_eido(), "fire", *GEISEL, when=NOW))
+
+    threads = [threading.Thread(target=report) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(registry) == 1
+    assert sum(changes is None for _, changes in outcomes) == 1
+    assert len({record.incident_id for record, _ in outcomes}) == 1
+    assert registry.stats["created"] == 1
+    assert registry.stats["folded"] == 15
+
+
+def test_concurrent_agent_reports_notify_once(monkeypatch):
+    agent = SafeCampusAgent(recipient_directory=RecipientDirectory.synthetic(200), incident_store=IncidentStore())
+    registry = agent.incident_registry
+    find_match = registry.find_match
+
+    def slow_find_match(*args, **kwargs):
+        # Widen the window between a lookup and acting on its result
+        match = find_match(*args, **kwargs)
+        time.sleep(0.05)
+        return match
+
+    monkeypatch.setattr(registry, "find_match", slow_find_match)
+    text = "There is a fire with flames and smoke at Geisel Library, this is an emergency."
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: agent.process_incident_report(text), range(8)))
+
+    assert len(agent.incident_registry) == 1
+    assert sum(result["correlation"]["notify"] for result in results) == 1
+    assert sum(not result["notification_results"].get("suppressed", False) for result in results) == 1
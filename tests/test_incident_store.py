@@ -0,0 +1,78 @@
+"""Tests for the SQLite incident store and ULID incident IDs."""
+
+import re
+
+import pytest
+
+from eido.eido_schema import create_empty_eido, generate_incident_id, generate_ulid, update_eido
+from eido.incident_store import IncidentStore
+
+ULID_RE = re.compile(r"^[0-9A-HJKMNP-TV-Z]{26}$")
+
+
+def make_eido(incident_type="fire", priority=3, status="active", lat=32.8812, lng=-117.2376):
+    eido = create_empty_eido()
+    incident = eido["eido"]["incident"]
+    incident["incidentType"] = incident_type
+    incident["priority"] = priority
+    incident["status"] = status
+    incident["location"]["coordinates"] = {"latitude": lat, "longitude": lng}
+    return eido
+
+
+@pytest.fixture
+def store():
+    store = IncidentStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_ulids_are_unique_and_sortable_by_creation():
+    ids = [generate_ulid() for _ in range(2000)]
+
+    assert all(ULID_RE.match(ulid) for ulid in ids)
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert generate_incident_id().startswith("INC-")
+
+
+def test_versions_are_appended_to_the_history(store):
+    eido = make_eido()
+    incident_id = eido["eido"]["incident"]["incidentID"]
+    assert store.save(eido) == 1
+
+    updated = update_eido(eido, {"priority": 1})
+    assert store.save(updated) == 2
+
+    assert store.get(incident_id)["eido"]["incident"]["priority"] == 1
+    history = store.get_history(incident_id)
+    assert [entry["version"] for entry in history] == [1, 2]
+    assert history[0]["eido"]["eido"]["incident"]["priority"] == 3
+    assert store.count() == 1
+
+
+def test_unknown_incident(store):
+    assert store.get("INC-missing") is None
+    assert store.get_history("INC-missing") == []
+
+
+def test_listing_filters_and_orders_newest_first(store):
+    first = make_eido("fire", priority=1)
+    second = make_eido("medical", priority=2, lat=32.8797, lng=-117.2362)
+    third = make_eido("fire", priority=3, status="resolved", lat=32.70, lng=-117.16)
+    for eido in (first, second, third):
+        store.save(eido)
+
+    def ids(listing):
+        return [entry["incidentID"] for entry in listing]
+
+    def incident_id(eido):
+        return eido["eido"]["incident"]["incidentID"]
+
+    assert ids(store.list_incidents()) == [incident_id(e) for e in (third, second, first)]
+    assert ids(store.list_incidents(incident_type="fire")) == [incident_id(third), incident_id(first)]
+    assert ids(store.list_incidents(status="active", priority=2)) == [incident_id(second)]
+    assert ids(store.list_incidents(bounds={"south": 32.85, "west": -117.25, "north": 32.90, "east": -117.20})) == \
+        [incident_id(second), incident_id(first)]
+    assert ids(store.list_incidents(limit=1, offset=1)) == [incident_id(second)]
+    assert store.count("resolved") == 1
@@ -0,0 +1,86 @@
+"""Tests for incremental live call processing."""
+
+import re
+
+import pytest
+
+import safe_campus_agent
+from eido.incident_store import IncidentStore
+from live_calls import FirstMatchStream
+from notification.directory import RecipientDirectory
+from safe_campus_agent import SafeCampusAgent
+
+CHUNKS = [
+    "There is a man with a gun ",
+    "at Geisel Library. ",
+    "He is wearing a red ",
+    "jacket. ",
+    "I think 3 peo",
+    "ple are hurt. ",
+    "Someone is bleeding."
+]
+
+
+@pytest.fixture
+def agent():
+    return SafeCampusAgent(recipient_directory=RecipientDirectory.synthetic(300), incident_store=IncidentStore())
+
+
+def test_chunks_after_the_alert_do_not_count_as_reports(agent):
+    session = agent.start_live_call()
+    for chunk in CHUNKS:
+        session.feed(chunk)
+
+    incident = session.eido["eido"]["incident"]
+    assert session.alerted
+    assert incident["details"].get("reportCount", 1) == 1
+    assert agent.incident_registry.stats["folded"] == 0
+    assert agent.incident_registry.stats["created"] == 1
+    assert all(entry["action"] != "Related report received" for entry in incident["details"]["timeline"])
+    # Details that arrived after the alert still reach the incident
+    assert incident["details"]["victims"]["count"] == 3
+    assert agent.incident_registry.get(session.incident_id).report_count == 1
+
+
+def test_details_are_found_without_rescanning_the_transcript(agent):
+    searched = []
+
+    class RecordingPattern:
+        def __init__(self, pattern):
+            self.pattern = pattern
+
+        def search(self, text, pos=0):
+            searched.append(len(text) - pos)
+            return self.pattern.search(text, pos)
+
+    session = agent.start_live_call()
+    stream = session._patterns[safe_campus_agent.VICTIM_COUNT_RE]
+    stream.pattern = RecordingPattern(stream.pattern)
+    session.feed("Someone is hurt near Price Center. ")
+    for _ in range(50):
+        session.feed("They are still lying on the ground and not moving. ")
+    session.feed("I count 2 people hurt.")
+
+    # Each chunk is searched once, with a short overlap, not the whole transcript
+    assert sum(searched) < 2 * len(session.text)
+    assert session.classification["victimCount"] == 2
+
+
+def test_first_match_stream_finds_a_match_split_across_chunks():
+    stream = FirstMatchStream(re.compile(r"(\d+)\s+(?:person|people)", re.I))
+    text = ""
+    for chunk in ["Filler text. " * 10, "There are 1", "2 peo", "ple here. And 5 people there."]:
+        text += chunk
+        stream.feed(text)
+
+    assert stream.match.group(0) == "12 people"
+
+
+def test_first_match_stream_extends_an_open_match():
+    stream = FirstMatchStream(re.compile(r"wearing[^.]*", re.I))
+
+    assert stream.feed("He is wearing a red ")
+    assert stream.match.group(0) == "wearing a red "
+    assert stream.feed("He is wearing a red jacket. He ran off")
+    assert stream.match.group(0) == "wearing a red jacket"
+    assert not stream.feed("He is wearing a red jacket. He ran off wearing nothing.")
@@ -0,0 +1,107 @@
+"""Tests for the persistent LLM response cache."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import llm.cache
+from llm.cache import CacheMissError, LLMCache, cache_key, get_llm_cache
+from llm.client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Classify: fire at Geisel Library"}]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache():
+    cache = LLMCache(":memory:", ttl_seconds=60, max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_cache_is_off_by_default():
+    env = {key: value for key, value in os.environ.items() if key != "LLM_CACHE"}
+    output = subprocess.run(
+        [sys.executable, "-c", "from llm.cache import get_llm_cache; print(get_llm_cache())"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.strip() == "None"
+
+
+def test_unknown_mode_is_rejected(monkeypatch):
+    monkeypatch.setattr(llm.cache, "LLM_CACHE_MODE", "sometimes")
+
+    with pytest.raises(ValueError):
+        get_llm_cache()
+
+
+def test_cache_key_covers_model_messages_and_arguments():
+    key = cache_key("model", MESSAGES, temperature=0.1)
+
+    assert key == cache_key("model", [dict(MESSAGES[0])], temperature=0.1)
+    assert key != cache_key("other", MESSAGES, temperature=0.1)
+    assert key != cache_key("model", MESSAGES, temperature=0.2)
+    assert key != cache_key("model", MESSAGES + [{"role": "user", "content": "again"}], temperature=0.1)
+
+
+def test_hit_miss_and_invalidate(cache):
+    key = cache_key("model", MESSAGES)
+    assert cache.get(key) is None
+
+    cache.put(key, "model", "fire")
+    assert cache.get(key) == "fire"
+    assert (cache.stats["hits"], cache.stats["misses"]) == (1, 1)
+
+    cache.invalidate(key)
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm.cache.time, "time", lambda: now[0])
+    cache.put("key", "model", "fire")
+
+    now[0] += 59
+    assert cache.get("key") == "fire"
+    now[0] += 2
+    assert cache.get("key") is None
+    assert cache.stats["expired"] == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm.cache.time, "time", lambda: now[0])
+    for key in ["a", "b", "c"]:
+        cache.put(key, "model", key)
+        now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.put("d", "model", "d")
+
+    assert len(cache) == 3
+    assert cache.stats["evictions"] == 1
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ["a", "c", "d"]] == ["a", "c", "d"]
+
+
+def test_replay_fails_on_a_miss_and_writes_nothing():
+    replay = LLMCache(":memory:", replay=True)
+
+    replay.put("key", "model", "fire")
+    with pytest.raises(CacheMissError):
+        replay.get("key")
+    assert len(replay) == 0
+
+
+def test_client_answers_cached_requests_without_the_network(cache):
+    cache.put(cache_key("model", MESSAGES), "model", "fire")
+    client = LLMClient(api_key="test", cache=cache)
+
+    assert client.chat(MESSAGES, model="model") == "fire"
+    assert client.stats["cache_hits"] == 1
+    assert client.stats["requests"] == 0
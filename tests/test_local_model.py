@@ -0,0 +1,84 @@
+"""Tests for the local incident model and its use in the rule-based fallbacks."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from eido.emergency_call_processor import EmergencyCallProcessor
+from eido.local_model import EXAMPLES_DIR, LOCAL_MODEL_PATH, train
+from eido.report_classifier import ReportClassifier
+from notification.directory import RecipientDirectory
+from notification.planner import NotificationPlanner
+
+# Every example has the same priority and no subtype, so only the
+# incident_type head is trained
+NARROW_CORPUS = [
+    {"text": "Fire and smoke in the building", "incident_type": "fire", "priority": 2},
+    {"text": "Flames coming out of the lab window", "incident_type": "fire", "priority": 2},
+    {"text": "A student collapsed and is not breathing", "incident_type": "medical", "priority": 2},
+    {"text": "Someone fainted and needs an ambulance", "incident_type": "medical", "priority": 2}
+]
+
+
+@pytest.fixture(scope="module")
+def narrow_model():
+    return train(NARROW_CORPUS, epochs=5)
+
+
+def test_untrained_heads_are_missing_from_predictions(narrow_model):
+    predictions = narrow_model.predict("There is smoke and fire")
+
+    assert predictions["incident_type"][0] == "fire"
+    assert "priority" not in predictions
+    assert "incident_subtype" not in predictions
+
+
+def test_call_fallback_keeps_rule_based_values_for_missing_heads(narrow_model):
+    processor = EmergencyCallProcessor(
+        api_key="test",
+        notification_planner=NotificationPlanner(RecipientDirectory.synthetic(200)),
+        tiered=True,
+        confidence_threshold=0.5,
+        local_model=narrow_model,
+        preprocessor=None
+    )
+    text = "There is fire and smoke at Geisel Library, this is an emergency."
+    info = processor._fallback_extraction(text)
+
+    assert info["incident_type"] == "fire"
+    assert info["priority"] == 1
+    assert info["incident_subtype"] == ""
+
+    # Tiering falls back to the keyword confidence of the missing priority head
+    local, escalation = processor._local_extraction(text)
+    assert escalation is None
+    assert local["priority"] == 1
+
+
+def test_report_fallback_keeps_rule_based_values_for_missing_heads(narrow_model):
+    classifier = ReportClassifier(api_key="test", tiered=True, confidence_threshold=0.5, local_model=narrow_model,
+                                  preprocessor=None)
+    text = "A fire with flames and smoke at Price Center. It is severe."
+    classification = classifier._fallback_classification(text)
+
+    assert classification["incident_type"] == "fire"
+    assert classification["severity"] == 5
+
+    local, escalation = classifier._classify_locally(text)
+    assert escalation is None
+    assert local["severity"] == 5
+
+
+def test_model_loads_from_any_working_directory(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "LOCAL_MODEL_PATH"}
+    env["PYTHONPATH"] = root
+    output = subprocess.run(
+        [sys.executable, "-c", "from eido.local_model import get_local_model; print(get_local_model() is not None)"],
+        cwd=str(tmp_path), env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert os.path.isabs(LOCAL_MODEL_PATH) and os.path.isabs(EXAMPLES_DIR)
+    assert output.strip() == str(os.path.exists(LOCAL_MODEL_PATH))
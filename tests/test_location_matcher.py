@@ -0,0 +1,120 @@
+"""Tests for Aho-Corasick location matching."""
+
+import threading
+
+import pytest
+
+from geocoding import matcher as matcher_module
+from geocoding.matcher import AhoCorasick, LocationMatcher, derive_aliases, get_location_matcher
+
+LOCATIONS = {
+    "Geisel Library": {"lat": 32.8812, "lng": -117.2376},
+    "Engineering Building Unit II (EBU II), UC San Diego": {"lat": 32.8818, "lng": -117.2332},
+    "Price Center": {"lat": 32.8797, "lng": -117.2362, "aliases": ["PC"]},
+    "RIMAC": {"lat": 32.8853, "lng": -117.2397},
+    "RIMAC Arena": {"lat": 32.8853, "lng": -117.2397},
+    "UC San Diego": {"lat": 32.8801, "lng": -117.2340}
+}
+
+
+@pytest.fixture
+def matcher():
+    return LocationMatcher(LOCATIONS)
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick()
+    for pattern in ["he", "she", "his", "hers"]:
+        automaton.add(pattern, pattern)
+
+    matches = sorted(automaton.search("ushers"))
+    assert matches == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_automaton_resumes_across_chunks():
+    automaton = AhoCorasick()
+    automaton.add("price center", "pc")
+
+    matches, state = automaton.scan("smoke at pri")
+    assert matches == []
+    matches, _ = automaton.scan("ce center now", state, offset=12)
+    assert matches == [(9, 21, "pc")]
+
+
+def test_aliases_are_derived_from_names():
+    assert derive_aliases("Engineering Building Unit II (EBU II), UC San Diego") == [
+        "Engineering Building Unit II (EBU II), UC San Diego",
+        "Engineering Building Unit II (EBU II)",
+        "Engineering Building Unit II",
+        "EBU II"
+    ]
+
+
+def test_mentions_are_case_insensitive_and_on_word_boundaries(matcher):
+    mentions = matcher.find_all("Smoke near geisel library, not at RIMACS or at the PCs.")
+
+    assert [mention["name"] for mention in mentions] == ["Geisel Library"]
+    assert mentions[0]["text"] == "geisel library"
+
+
+def test_specific_and_longer_mentions_win(matcher):
+    assert matcher.best_match("Someone at UC San Diego, near EBU II")["name"] == \
+        "Engineering Building Unit II (EBU II), UC San Diego"
+    assert matcher.best_match("Fight outside RIMAC Arena")["name"] == "RIMAC Arena"
+    assert matcher.best_match("Something at UC San Diego")["specific"] is False
+    assert matcher.best_match("nothing known here") is None
+
+
+def test_stream_matches_names_split_across_chunks(matcher):
+    stream = matcher.stream()
+    stream.feed("Smoke at Pri")
+    stream.feed("ce Center, near RIMAC")
+    assert [mention["name"] for mention in stream.mentions] == ["Price Center", "RIMAC"]
+
+    # A provisional match at the end of a chunk is retracted if the word goes on
+    stream.feed("S")
+    assert [mention["name"] for mention in stream.mentions] == ["Price Center"]
+    assert stream.best_match()["name"] == "Price Center"
+
+
+def test_shared_matcher_is_built_once_under_concurrent_first_use(monkeypatch):
+    monkeypatch.setattr(matcher_module, "_location_matcher", None)
+    builds = []
+    original_init = LocationMatcher.__init__
+
+    def counting_init(self, locations):
+        builds.append(len(locations))
+        original_init(self, locations)
+
+    monkeypatch.setattr(LocationMatcher, "__init__", counting_init)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def first_use():
+        barrier.wait()
+        results.append(get_location_matcher())
+
+    threads = [threading.Thread(target=first_use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_agent_preprocessor_tiering_and_mock_server_share_one_matcher():
+    from eido.preprocessing import TranscriptPreprocessor
+    from eido.tiering import find_known_location
+    from llm.mock_server import MockResponder
+    from safe_campus_agent import SafeCampusAgent
+
+    shared = get_location_matcher()
+    assert SafeCampusAgent().location_matcher is shared
+    assert TranscriptPreprocessor().location_matcher is shared
+    assert MockResponder().matcher is shared
+
+    # Curated short names win over gazetteer entries
+    assert shared.best_match("smoke near RIMAC")["name"] == "RIMAC Arena"
+    assert find_known_location("someone collapsed outside Geisel")["name"] == "Geisel Library"
@@ -0,0 +1,135 @@
+"""Round trips through the mock LLM server with the real Mistral client."""
+
+import threading
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("mistralai")
+
+import geocoding.geocode as geocode
+import llm.client
+from eido.emergency_call_processor import EmergencyCallProcessor
+from eido.report_classifier import ReportClassifier
+from geocoding.cache import GeocodeCache
+from geocoding.locations import LocationDatabase
+from llm.client import LLMClient
+from llm.mock_server import MockConfig, MockLLMServer
+
+API_KEY = "mock-server-test"
+
+TRANSCRIPT = """Dispatcher: 911, what is your emergency?
+Caller: There's a fire on the second floor of Geisel Library, smoke is filling the stairwell.
+Dispatcher: Is anyone hurt?
+Caller: One person is injured, they inhaled a lot of smoke."""
+
+REPORTS = [
+    "A student reported a theft of a laptop at Price Center this afternoon.",
+    "There is a gas leak near Warren College, the area is being evacuated.",
+    "Someone collapsed outside RIMAC Arena and is not breathing."
+]
+
+
+class ScriptedServer(MockLLMServer):
+    """Mock server answering its first requests with the scripted error statuses."""
+
+    def __init__(self, address, config=None):
+        super().__init__(address, config)
+        self.script = []
+
+    def admit(self):
+        status, latency = super().admit()
+        with self._lock:
+            if self.script:
+                status = self.script.pop(0)
+                self.stats["rate_limited" if status == 429 else "errors"] += 1
+        return status, latency
+
+
+@pytest.fixture(autouse=True)
+def isolated_geocoding(monkeypatch, tmp_path):
+    # Keep the geocode cache and location storage out of the repository's data/
+    cache = GeocodeCache(str(tmp_path / "geocode_cache.db"))
+    monkeypatch.setattr(geocode, "get_geocode_cache", lambda: cache)
+    monkeypatch.setattr(geocode, "_location_db", LocationDatabase())
+    yield
+    cache.close()
+
+
+@pytest.fixture
+def server():
+    server = ScriptedServer(("127.0.0.1", 0), MockConfig(latency_ms=0, jitter_ms=0, stream_chunk_delay_ms=0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    """
+    Shared client for API_KEY pointed at the mock server (what setting
+    MISTRAL_SERVER_URL does at startup), without backoff pauses.
+    """
+    client = LLMClient(API_KEY, requests_per_second=0, server_url=server.url)
+    monkeypatch.setitem(llm.client._clients, API_KEY, client)
+    monkeypatch.setattr(llm.client, "backoff_delay", lambda attempt: 0.0)
+    yield client
+    client.close()
+
+
+def test_call_processor_parses_completions(server, client):
+    processor = EmergencyCallProcessor(api_key=API_KEY, streaming=False, tiered=False, llm_deadline_seconds=10)
+
+    extracted = processor._call_llm(TRANSCRIPT)
+    assert extracted["incident_type"] == "fire"
+    assert extracted["location"] == "Geisel Library"
+
+    eido = processor.process_call(TRANSCRIPT)
+    assert "fallback" not in " ".join(eido["eido"]["incident"]["details"]["keyFacts"])
+    assert server.stats["completed"] == 2
+
+
+def test_call_processor_parses_streamed_completions(server, client):
+    processor = EmergencyCallProcessor(api_key=API_KEY, streaming=True, tiered=False, llm_deadline_seconds=10)
+    fields = {}
+
+    extracted = processor._call_llm(TRANSCRIPT, on_field=fields.__setitem__)
+
+    assert extracted["incident_type"] == "fire"
+    assert fields == extracted
+    assert server.stats["streamed"] == 1
+
+
+def test_report_classifier_parses_single_and_batched_answers(server, client):
+    classifier = ReportClassifier(api_key=API_KEY, tiered=False, llm_deadline_seconds=10)
+
+    alert = classifier.classify_report(REPORTS[1])
+    assert alert["classification_tier"] == "llm"
+    assert alert["classification"]["recommended_response"] == "Notify campus security"
+
+    alerts = classifier.classify_reports(REPORTS, max_batch_size=2)
+    assert [a["classification"]["recommended_response"] for a in alerts] == ["Notify campus security"] * 3
+    assert alerts[2]["classification"]["location"] == "RIMAC Arena"
+    # One single request plus two batches
+    assert server.stats["completed"] == 3
+
+
+def test_client_retries_rate_limits_and_server_errors(server, client):
+    server.script = [429, 500]
+    processor = EmergencyCallProcessor(api_key=API_KEY, streaming=False, tiered=False, llm_deadline_seconds=10)
+
+    assert processor._call_llm(TRANSCRIPT)["incident_type"] == "fire"
+    assert client.stats["retries"] == 2
+    assert server.stats["rate_limited"] == 1
+    assert server.stats["errors"] == 1
+    assert server.stats["completed"] == 1
+
+
+def test_streams_are_retried_before_the_first_delta(server, client):
+    server.script = [500, 429]
+    processor = EmergencyCallProcessor(api_key=API_KEY, streaming=True, tiered=False, llm_deadline_seconds=10)
+
+    assert processor._call_llm(TRANSCRIPT)["incident_type"] == "fire"
+    assert client.stats["retries"] == 2
+    assert server.stats["streamed"] == 1
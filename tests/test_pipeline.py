@@ -0,0 +1,108 @@
+"""Tests for dependency-graph stage execution."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import Stage, StageError, StageGraph, abandoned_stages
+
+
+def test_independent_stages_run_concurrently():
+    def slow(value):
+        def fn(inputs):
+            time.sleep(0.2)
+            return value
+        return fn
+
+    graph = StageGraph([
+        Stage("a", slow(1)),
+        Stage("b", slow(2)),
+        Stage("sum", lambda inputs: inputs["a"] + inputs["b"], depends_on=("a", "b"))
+    ])
+    start = time.perf_counter()
+    results, report = graph.run()
+
+    assert results["sum"] == 3
+    assert time.perf_counter() - start < 0.35
+    assert all(entry["status"] == "ok" for entry in report.values())
+
+
+def test_failed_stage_resolves_to_its_fallback():
+    def fail(inputs):
+        raise RuntimeError("boom")
+
+    results, report = StageGraph([
+        Stage("a", fail, fallback=lambda inputs, error: "fallback"),
+        Stage("b", lambda inputs: inputs["a"] + "!", depends_on=("a",))
+    ]).run()
+
+    assert results["b"] == "fallback!"
+    assert report["a"]["status"] == "fallback"
+    assert "RuntimeError" in report["a"]["error"]
+
+
+def test_failed_stage_without_fallback_raises():
+    def fail(inputs):
+        raise RuntimeError("boom")
+
+    with pytest.raises(StageError):
+        StageGraph([Stage("a", fail)]).run()
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda inputs: 1, depends_on=("missing",))])
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda inputs: 1, depends_on=("b",)),
+                    Stage("b", lambda inputs: 1, depends_on=("a",))])
+
+
+def test_timed_out_stage_is_abandoned_without_blocking_the_shared_pool():
+    release = threading.Event()
+    shared = ThreadPoolExecutor(max_workers=1)
+    timed = ThreadPoolExecutor(max_workers=2)
+
+    def hang(inputs):
+        release.wait(5)
+        return "late"
+
+    try:
+        graph = StageGraph([
+            Stage("slow", hang, timeout=0.1, fallback=lambda inputs, error: "fallback"),
+            Stage("after", lambda inputs: inputs["slow"], depends_on=("slow",))
+        ], executor=shared, timed_executor=timed)
+        results, report = graph.run()
+
+        assert results["after"] == "fallback"
+        assert report["slow"]["status"] == "timeout"
+        assert report["slow"]["abandoned"]
+        assert abandoned_stages() >= 1
+        # The abandoned thread holds a timed worker, not the shared one
+        assert shared.submit(lambda: "free").result(timeout=1) == "free"
+    finally:
+        release.set()
+        shared.shutdown(wait=True)
+        timed.shutdown(wait=True)
+
+    assert abandoned_stages() == 0
+
+
+def test_queued_timed_stage_is_cancelled_not_abandoned():
+    release = threading.Event()
+    timed = ThreadPoolExecutor(max_workers=1)
+    blocker = timed.submit(release.wait, 5)
+
+    try:
+        results, report = StageGraph([
+            Stage("queued", lambda inputs: "ran", timeout=0.1, fallback=lambda inputs, error: "fallback")
+        ], timed_executor=timed).run()
+
+        assert results["queued"] == "fallback"
+        assert report["queued"]["status"] == "timeout"
+        assert "abandoned" not in report["queued"]
+    finally:
+        release.set()
+        blocker.result()
+        timed.shutdown(wait=True)
@@ -0,0 +1,75 @@
+"""Tests for token-budgeted transcript preprocessing."""
+
+from eido.preprocessing import TranscriptPreprocessor
+from llm.tokens import estimate_tokens
+
+QA_TRANSCRIPT = """Dispatcher: 911, what is your emergency?
+Caller: There's a fire in Geisel Library.
+Dispatcher: Is anyone trapped on the 3rd floor?
+Caller: Yes.
+Dispatcher: Is the fire spreading to the stairwell?
+Caller: No.
+Dispatcher: Is anyone injured?
+Caller: Yes."""
+
+
+def long_transcript(repeats: int = 30) -> str:
+    lines = ["Dispatcher: 911, what is your emergency?",
+             "Caller: Um, there's a fire on the the third floor of Geisel Library."]
+    for i in range(repeats):
+        lines.append("Dispatcher: Okay. Please stay on the line.")
+        lines.append(f"Caller: The smoke is getting really thick near the north stairwell. I can see {i} people outside.")
+        lines.append("Caller: There's a fire on the third floor of Geisel Library.")
+    return "\n".join(lines)
+
+
+def test_text_within_budget_is_unchanged():
+    result = TranscriptPreprocessor(token_budget=1500).preprocess(QA_TRANSCRIPT)
+
+    assert result.text == QA_TRANSCRIPT
+    assert not result.truncated
+    assert result.dropped_sentences == 0
+    assert result.compression_ratio == 1.0
+
+
+def test_no_budget_leaves_text_unchanged():
+    text = long_transcript()
+
+    assert TranscriptPreprocessor(token_budget=0).preprocess(text).text == text
+
+
+def test_short_answers_survive_dedupe_across_turns():
+    # Over budget, but just barely: boilerplate goes, the answers stay
+    budget = estimate_tokens(QA_TRANSCRIPT) - 5
+    result = TranscriptPreprocessor(token_budget=budget).preprocess(QA_TRANSCRIPT)
+
+    assert "Is anyone trapped on the 3rd floor?\nCaller: Yes." in result.text
+    assert result.text.count("Yes.") == 2
+    assert "Caller: No." in result.text
+    assert "what is your emergency" not in result.text
+
+
+def test_long_repeats_are_deduplicated_across_turns():
+    result = TranscriptPreprocessor(token_budget=estimate_tokens(long_transcript()) - 1).preprocess(long_transcript())
+
+    assert result.text.count("fire on the third floor of Geisel Library") == 1
+    assert "Please stay on the line" not in result.text
+    assert "Um" not in result.text
+    assert "the the" not in result.text
+
+
+def test_repeats_within_one_turn_are_deduplicated():
+    text = "Caller: " + "Help. Help. Help. There is a man with a knife at Price Center. " * 20
+    result = TranscriptPreprocessor(token_budget=estimate_tokens(text) - 1).preprocess(text)
+
+    assert result.text == "Caller: Help. There is a man with a knife at Price Center."
+
+
+def test_output_fits_the_budget_and_keeps_hazard_sentences():
+    text = long_transcript(200)
+    result = TranscriptPreprocessor(token_budget=80).preprocess(text)
+
+    assert result.truncated
+    assert result.tokens <= 80
+    assert result.tokens < result.original_tokens
+    assert "fire on the third floor of Geisel Library" in result.text
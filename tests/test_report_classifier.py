@@ -0,0 +1,109 @@
+"""Tests for token-budgeted batch classification of reports."""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+from eido.report_classifier import ReportClassifier
+from llm.cache import CacheMissError
+from llm.tokens import estimate_tokens, pack_batches
+
+REPORTS = [f"Report {i}: a water leak was reported in room {i} of the Price Center." for i in range(8)]
+
+
+class FakeBatchClient:
+    """Fake LLM client answering batch prompts; records the batch size of every request."""
+
+    def __init__(self, answer=None, error=None):
+        self.requests = []
+        self.invalidated = 0
+        self.answer = answer
+        self.error = error
+
+    async def chat_async(self, messages, model=None, **kwargs):
+        count = len(re.findall(r"\bREPORT \d+:", messages[-1]["content"]))
+        self.requests.append(count)
+        if self.error is not None:
+            raise self.error
+        if self.answer is not None:
+            return self.answer(count)
+        return json.dumps([self.item(number) for number in range(1, count + 1)])
+
+    @staticmethod
+    def item(number):
+        return {"report_number": number, "incident_type": "infrastructure", "severity": 2,
+                "recommended_response": "from the LLM"}
+
+    def invalidate(self, messages, model=None, **kwargs):
+        self.invalidated += 1
+
+    def run(self, coroutine, timeout=None):
+        return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def classifier():
+    return ReportClassifier(api_key="test", tiered=False, preprocessor=None)
+
+
+def from_llm(alerts):
+    return [alert["classification"].get("recommended_response") == "from the LLM" for alert in alerts]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    # Many short words are not underestimated
+    assert estimate_tokens("a b c d e f g h") >= 8
+
+
+def test_pack_batches_respects_budget_and_item_limit():
+    assert pack_batches([3, 3, 3, 3], lambda x: x, budget=7, max_items=10) == [[3, 3], [3, 3]]
+    assert pack_batches([1] * 5, lambda x: x, budget=100, max_items=2) == [[1, 1], [1, 1], [1]]
+    # An item over the budget gets a batch of its own, order is kept
+    assert pack_batches([2, 50, 2], lambda x: x, budget=10, max_items=10) == [[2], [50], [2]]
+    assert pack_batches([], lambda x: x, budget=10, max_items=10) == []
+
+
+def test_batch_is_answered_in_one_request(classifier):
+    classifier.client = FakeBatchClient()
+    alerts = classifier.classify_reports(REPORTS, max_batch_size=8)
+
+    assert classifier.client.requests == [8]
+    assert all(from_llm(alerts))
+
+
+def test_partial_answer_splits_the_missing_reports(classifier):
+    # Every answer for more than two reports drops the last one
+    def drop_last(count):
+        items = [FakeBatchClient.item(number) for number in range(1, count + 1)]
+        return json.dumps(items[:-1] if count > 2 else items)
+
+    classifier.client = FakeBatchClient(answer=drop_last)
+    alerts = classifier.classify_reports(REPORTS[:4], max_batch_size=4)
+
+    assert classifier.client.requests == [4, 1]
+    assert all(from_llm(alerts))
+    assert classifier.client.invalidated == 1
+
+
+def test_unparseable_answer_is_split_down_to_single_reports(classifier):
+    classifier.client = FakeBatchClient(answer=lambda count: "not json")
+    alerts = classifier.classify_reports(REPORTS[:4], max_batch_size=4)
+
+    assert sorted(classifier.client.requests) == [1, 1, 1, 1, 2, 2, 4]
+    assert not any(from_llm(alerts))
+    assert len(alerts) == 4
+
+
+@pytest.mark.parametrize("error", [RuntimeError("401 Unauthorized"), ConnectionError("retries exhausted"),
+                                   CacheMissError("no cached response")])
+def test_request_errors_fall_back_without_splitting(classifier, error):
+    classifier.client = FakeBatchClient(error=error)
+    alerts = classifier.classify_reports(REPORTS, max_batch_size=8)
+
+    assert classifier.client.requests == [8]
+    assert len(alerts) == 8
+    assert not any(from_llm(alerts))
@@ -0,0 +1,89 @@
+"""Tests for caching stage results by normalized text."""
+
+import threading
+import time
+
+import pytest
+
+import eido.utils
+from eido.incident_store import IncidentStore
+from eido.utils import TTLCache, content_hash
+from notification.directory import RecipientDirectory
+from safe_campus_agent import SafeCampusAgent
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(eido.utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_content_hash_ignores_whitespace_only_differences():
+    assert content_hash("Fire at  Geisel\nLibrary ") == content_hash("Fire at Geisel Library")
+    assert content_hash("Fire at Geisel Library") != content_hash("Fire at Price Center")
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(max_entries=4, ttl_seconds=10)
+    cache.set("key", "value")
+
+    clock[0] += 9
+    assert cache.get("key") == "value"
+    clock[0] += 1
+    assert cache.get("key", "missing") == "missing"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_entries=2, ttl_seconds=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_repeated_report_is_served_from_the_cache():
+    agent = SafeCampusAgent(recipient_directory=RecipientDirectory.synthetic(200), incident_store=IncidentStore())
+    first = agent.process_incident_report("A water leak was reported at Price Center.")
+    second = agent.process_incident_report("A water  leak was reported at\nPrice Center.")
+
+    assert first["cached_stages"] == []
+    assert {"location", "classification"} <= set(second["cached_stages"])
+    assert second["classification"] == first["classification"]
+    # Cached results are private copies
+    second["classification"]["incidentType"] = "changed"
+    assert agent.process_incident_report("A water leak was reported at Price Center.")["classification"] == first["classification"]
+
+
+def test_eido_built_from_fallbacks_is_not_reused_with_real_results():
+    agent = SafeCampusAgent(recipient_directory=RecipientDirectory.synthetic(200), incident_store=IncidentStore(),
+                            stage_timeouts={"classification": 0.05})
+    classify = agent._classify_incident
+    finished = threading.Event()
+
+    def slow_classify(text):
+        time.sleep(0.2)
+        try:
+            return classify(text)
+        finally:
+            finished.set()
+
+    agent._classify_incident = slow_classify
+    text = "There is a fire with flames and smoke at Geisel Library, this is an emergency."
+    first = agent.process_incident_report(text)
+    assert first["stages"]["classification"]["status"] == "timeout"
+
+    # The abandoned stage caches the real classification once it finishes
+    assert finished.wait(2)
+    time.sleep(0.05)
+    second = agent.process_incident_report(text)
+
+    assert "classification" in second["cached_stages"]
+    incident = second["eido"]["eido"]["incident"]
+    assert incident["incidentType"] == second["classification"]["incidentType"] != "unknown"
+    assert incident["priority"] == second["classification"]["priority"]
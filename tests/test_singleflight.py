@@ -0,0 +1,81 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    group = SingleFlight()
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", compute, 21) for _ in range(10)))
+
+    assert asyncio.run(main()) == [42] * 10
+    assert calls == [21]
+    assert group.stats == {"executed": 1, "shared": 9}
+    assert group.in_flight() == 0
+
+
+def test_results_are_not_cached_between_flights():
+    group = SingleFlight()
+    calls = []
+
+    async def main():
+        await group.do("key", calls.append, 1)
+        await group.do("key", calls.append, 2)
+
+    asyncio.run(main())
+    assert calls == [1, 2]
+
+
+def test_different_keys_run_separately():
+    group = SingleFlight()
+
+    async def main():
+        return await asyncio.gather(group.do("a", lambda: "a"), group.do("b", lambda: "b"))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert group.stats["executed"] == 2
+
+
+def test_errors_reach_every_caller():
+    group = SingleFlight()
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError("data file unreadable")
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert group.stats["executed"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_computation():
+    group = SingleFlight()
+    release = threading.Event()
+
+    async def main():
+        first = asyncio.ensure_future(group.do("key", lambda: release.wait(5) and "done"))
+        second = asyncio.ensure_future(group.do("key", lambda: "unused"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,78 @@
+"""Tests for the confidence gate of tiered classification."""
+
+import pytest
+
+from eido.emergency_call_processor import EmergencyCallProcessor
+from eido.keyword_rules import get_keyword_scanner
+from eido.tiering import assess_local, find_known_location
+from notification.directory import RecipientDirectory
+from notification.planner import NotificationPlanner
+
+
+def assess(text, rule_set="call.incident_type", priority_rule_set="call.priority"):
+    hits = get_keyword_scanner().scan(text)
+    return assess_local(hits, rule_set, find_known_location(text), priority_rule_set=priority_rule_set)[1]
+
+
+def test_confident_type_priority_and_place_skip_the_llm():
+    assert assess("Fire, flames and smoke at Geisel Library, this is an emergency.") is None
+
+
+def test_missing_priority_keyword_escalates():
+    assert assess("There is a fire, flames and smoke at Geisel Library.") == "no_priority"
+
+
+def test_report_severity_gates_reports():
+    text = "A fire with flames and smoke at Price Center."
+    assert assess(text, "report.incident_type", "report.severity") == "no_priority"
+    assert assess(text + " It is severe.", "report.incident_type", "report.severity") is None
+
+
+def test_at_inside_a_word_is_not_a_location():
+    assert find_known_location("Fire and smoke, I think that it is spreading, emergency.") is None
+    assert assess("Fire, flames and smoke, emergency, I think that it is spreading.") == "no_location"
+
+
+def test_regional_names_are_not_a_location():
+    assert assess("Fire, flames and smoke at UC San Diego, emergency.") == "no_location"
+
+
+def test_weapons_escalate():
+    assert assess("Fire and smoke at Price Center, emergency, a man there is armed.") == "weapons"
+
+
+class FailingClient:
+    def chat(self, *args, **kwargs):
+        raise AssertionError("the LLM must not be called")
+
+    def invalidate(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def processor():
+    processor = EmergencyCallProcessor(
+        api_key="test",
+        notification_planner=NotificationPlanner(RecipientDirectory.synthetic(200)),
+        llm_deadline_seconds=2,
+        streaming=False,
+        tiered=True,
+        local_model=None
+    )
+    processor.client = FailingClient()
+    return processor
+
+
+def test_local_extraction_uses_the_matched_place(processor):
+    info, escalation = processor._local_extraction("Fire, flames and smoke at Geisel Library, this is an emergency.")
+
+    assert escalation is None
+    assert info["location"] == "Geisel Library"
+    assert info["priority"] == 1
+
+
+def test_local_extraction_escalates_without_priority(processor):
+    info, escalation = processor._local_extraction("There is a fire, flames and smoke at Geisel Library.")
+
+    assert info is None
+    assert escalation == "no_priority"
@@ -0,0 +1,157 @@
+# tracing.py
+"""
+Lightweight timing spans for the processing pipeline.
+
+Code under measurement opens spans with `span("name")`. Spans are timed with
+the monotonic clock, collected into the current Trace (if one is active in
+this context) and reported to the installed tracer when they end. Tracers
+are pluggable: the default discards spans, LoggingTracer logs them, and any
+object with an `on_span_end(span)` method can be installed with set_tracer.
+"""
+
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A timed operation."""
+
+    def __init__(self, name: str, parent: Optional['Span'] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        """Duration in milliseconds (up to now if the span is still open)."""
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+
+class Trace:
+    """Spans recorded while processing one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+
+    def timings(self) -> Dict[str, Any]:
+        """
+        Summarize the trace.
+
+        Returns:
+            Dictionary with "total_ms", per-name durations in "stages_ms"
+            (summed when a name occurs more than once) and the individual
+            "spans" with offsets relative to the start of the trace
+        """
+        stages: Dict[str, float] = {}
+        spans = []
+        for span in sorted(self.spans, key=lambda s: s.start):
+            stages[span.name] = stages.get(span.name, 0.0) + span.duration_ms
+            entry = {
+                "name": span.name,
+                "start_ms": round((span.start - self.start) * 1000, 3),
+                "duration_ms": round(span.duration_ms, 3),
+                "parent": span.parent.name if span.parent else None
+            }
+            if span.attributes:
+                entry["attributes"] = span.attributes
+            if span.error:
+                entry["error"] = span.error
+            spans.append(entry)
+
+        return {
+            "total_ms": round(((self.end or time.perf_counter()) - self.start) * 1000, 3),
+            "stages_ms": {name: round(ms, 3) for name, ms in stages.items()},
+            "spans": spans
+        }
+
+
+class Tracer:
+    """Receives finished spans. The base tracer discards them."""
+
+    def on_span_end(self, span: Span) -> None:
+        pass
+
+
+class LoggingTracer(Tracer):
+    """Logs every finished span."""
+
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def on_span_end(self, span: Span) -> None:
+        status = f" error={span.error}" if span.error else ""
+        logger.log(self.level, f"span {span.name} {span.duration_ms:.2f}ms {span.attributes or ''}{status}")
+
+
+_tracer: Tracer = Tracer()
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """Install the tracer that receives finished spans (None restores the default)."""
+    global _tracer
+    _tracer = tracer if tracer is not None else Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the installed tracer."""
+    return _tracer
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """Collect the spans opened in this context into a new Trace."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block of code.
+
+    Args:
+        name: Span name, e.g. "classification" or "llm.chat"
+        **attributes: Attributes recorded with the span
+
+    Yields:
+        The open Span, so callers can add attributes
+    """
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        active_trace = _current_trace.get()
+        if active_trace is not None:
+            active_trace.spans.append(current)
+        try:
+            _tracer.on_span_end(current)
+        except Exception as e:
+            logger.warning(f"Tracer failed on span {name}: {e}")